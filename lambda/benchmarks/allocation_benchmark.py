@@ -0,0 +1,58 @@
+"""
+Times question allocation with the previous round-robin loop against the apportionment methods in
+utils/allocation, and counts the notes each leaves without questions. The sum and cap invariants are checked by
+tests/test_allocation.py.
+    python -m benchmarks.allocation_benchmark [--notes 10 100 1000 5000] [--questions 100]
+"""
+import argparse
+import random
+import time
+from utils.allocation import SAINTE_LAGUE, calculate_questions_per_note
+
+def legacy_calculate_questions_per_note(note_scores, total_questions):
+    note_scores.sort(key=lambda x: x[1], reverse=True)
+    total_score = sum(score for _, score in note_scores)
+    if total_score == 0:
+        questions_per_note = [(note_key, total_questions // len(note_scores)) for note_key, _ in note_scores]
+    else:
+        questions_per_note = [(note_key, int((score / total_score) * total_questions)) for note_key, score in note_scores]
+    remaining_questions = total_questions - sum(questions for _, questions in questions_per_note)
+    index = 0
+    while remaining_questions > 0:
+        note_key, questions = questions_per_note[index]
+        questions_per_note[index] = (note_key, questions + 1)
+        remaining_questions -= 1
+        index = (index + 1) % len(questions_per_note)
+    return questions_per_note
+
+def random_scores(rng: random.Random, count: int) -> list:
+    return [(f'note-{i}', int(rng.lognormvariate(7, 1.5)) if rng.random() > 0.05 else 0) for i in range(count)]
+
+def time_call(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+
+    print(f"{'notes':>8} {'legacy (ms)':>12} {'hamilton (ms)':>14} {'sainte-lague (ms)':>18} {'zero-question notes':>22}")
+    for count in args.notes:
+        note_scores = random_scores(rng, count)
+        legacy = time_call(lambda: legacy_calculate_questions_per_note(list(note_scores), args.questions), args.repeat)
+        hamilton = time_call(lambda: calculate_questions_per_note(note_scores, args.questions), args.repeat)
+        sainte_lague = time_call(
+            lambda: calculate_questions_per_note(note_scores, args.questions, SAINTE_LAGUE), args.repeat)
+        legacy_zero = sum(1 for _, n in legacy_calculate_questions_per_note(list(note_scores), args.questions) if not n)
+        new_zero = sum(1 for _, n in calculate_questions_per_note(note_scores, args.questions) if not n)
+        print(f"{count:>8} {legacy:>12.3f} {hamilton:>14.3f} {sainte_lague:>18.3f} {f'{legacy_zero} -> {new_zero}':>22}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Runs a quiz job end to end in-process, first through synchronous quizGeneration invocations and then through the
+work queue, against an in-memory S3 and SQS. Reports how long the orchestrator runs (and is billed) in each mode
+and the time until quizzes/{job_id}.json exists. With --broken, that many notes always fail, so the queued run
+also exercises redelivery and the failed parts of the assembled job.
+    python -m benchmarks.async_pipeline_benchmark [--notes 20] [--latency 0.2] [--broken 1]
+"""
+import argparse
+import json
+import time
+from benchmarks.support import quiet
+from tests.fakes import FakeLambdaClient, FakeLLM, FakeS3Client, FakeSQSClient, load_lambda_function
+import utils.lambda_utils as lambda_utils
+import utils.s3_utils as s3_utils
+import utils.sqs_utils as sqs_utils
+from utils.note_stats import compute_note_stats
+
+OCR_BUCKET = 'spellbook-imagestore-ocr-results'
+QUIZ_BUCKET = 'spellbook-generated-quizzes'
+
+class BrokenNoteLLM(FakeLLM):
+    def generate_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None) -> dict:
+        if any(note.startswith('broken') for note in notes):
+            self._respond('')
+            raise ValueError("Model returned invalid JSON")
+        return super().generate_quiz(notes, num_questions, topics, exclude)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notes', type=int, default=20)
+    parser.add_argument('--questions', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--broken', type=int, default=1)
+    args = parser.parse_args()
+
+    orchestrator = load_lambda_function('quizGenerationOrchestrator')
+    worker = load_lambda_function('quizGeneration')
+    llm = BrokenNoteLLM(latency=args.latency)
+    worker.get_llm_provider = lambda provider_name: llm
+
+    note_keys = [f'note-{i}' for i in range(args.notes)]
+    print(f"{'mode':>6} {'orchestrator (s)':>17} {'quiz ready (s)':>15} {'questions':>10} {'failed notes':>13} {'deliveries':>11}")
+    quizzes = {}
+    for mode in ['sync', 'queue']:
+        s3 = FakeS3Client()
+        s3_utils.s3_client = s3
+        s3_utils.note_cache.clear()
+        for i, note_key in enumerate(note_keys):
+            text = ('broken ' if i < args.broken else '') + ' '.join(f'word{i}' for _ in range(500))
+            s3.put_object(Bucket=OCR_BUCKET, Key=f'processed/{note_key}', Body=text, Metadata=compute_note_stats(text, 1))
+        lambda_utils.lambda_client = FakeLambdaClient(lambda payload: worker.lambda_handler(payload, None))
+        sqs = FakeSQSClient()
+        sqs_utils.get_sqs_client = lambda: sqs
+        orchestrator.QUIZ_WORK_QUEUE_URL = 'local-queue' if mode == 'queue' else None
+
+        job_id = f'benchmark-{mode}'
+        event = {'Records': [{'body': json.dumps({
+            'noteKeys': note_keys, 'numQuestions': args.questions, 'jobUuid': job_id, 'topics': []
+        })}]}
+        with quiet():
+            start = time.perf_counter()
+            response = orchestrator.lambda_handler(event, None)
+            orchestrator_time = time.perf_counter() - start
+            sqs.drain(worker.lambda_handler, batch_size=1, max_workers=args.notes)
+            ready_time = time.perf_counter() - start
+
+        quiz = json.loads(s3.objects[(QUIZ_BUCKET, f'quizzes/{job_id}.json')]['Body'])
+        quizzes[mode] = quiz
+        if mode == 'queue':
+            failed_notes = json.loads(s3.objects[(QUIZ_BUCKET, f'quizzes/{job_id}/job.json')]['Body'])['failedNotes']
+        else:
+            failed_notes = response['failedNotes']
+        print(f"{mode:>6} {orchestrator_time:>17.3f} {ready_time:>15.3f} {len(quiz['questions']):>10} "
+              f"{len(failed_notes):>13} {sqs.deliveries:>11}")
+
+    assert quizzes['sync'] == quizzes['queue'], "both modes must assemble the same quiz"
+
+if __name__ == '__main__':
+    main()
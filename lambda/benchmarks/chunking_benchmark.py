@@ -0,0 +1,41 @@
+"""
+Shows quiz generation latency as notes grow, single prompt versus chunked map-reduce, against a fake LLM whose
+response time grows with the prompt length.
+    python -m benchmarks.chunking_benchmark [--latency-per-1k 0.05]
+"""
+import argparse
+import time
+from benchmarks.support import quiet
+from tests.fakes import FakeLLM
+from utils.chunking import chunk_token_budget, generate_quiz_chunked
+from utils.note_stats import estimate_tokens
+
+SENTENCE = 'The mitochondria is the membrane-bound organelle that produces most of the cell\'s ATP. '
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--latency-per-1k', type=float, default=0.05)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'tokens':>8} {'calls':>6} {'questions':>10} {'single (s)':>11} {'chunked (s)':>12}")
+    for paragraphs in [10, 50, 200, 800]:
+        note = '\n\n'.join(f'Paragraph {i}. ' + SENTENCE * 8 for i in range(paragraphs))
+        llm = FakeLLM(args.latency, args.latency_per_1k)
+
+        start = time.perf_counter()
+        llm.generate_quiz([note], args.questions, [])
+        single = time.perf_counter() - start
+
+        llm.calls = 0
+        with quiet():
+            start = time.perf_counter()
+            quiz = generate_quiz_chunked(llm, [note], args.questions, [], max_workers=args.workers)
+            chunked = time.perf_counter() - start
+        print(f"{estimate_tokens(note):>8} {llm.calls:>6} {len(quiz['questions']):>10} {single:>11.3f} {chunked:>12.3f}")
+    print(f"(chunk budget for {FakeLLM.MODEL}: {chunk_token_budget(FakeLLM.MODEL)} tokens)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Measures per-invocation client setup time: building fresh clients on every call (the old behavior) versus the
+container-wide registry in utils/clients, for the first (cold) and later (warm) invocations.
+Document AI is included when GOOGLE_APPLICATION_CREDENTIALS_JSON is set.
+    python -m benchmarks.client_setup_benchmark [--invocations 20]
+"""
+import argparse
+import os
+import statistics
+import time
+from benchmarks.support import LAMBDA_ROOT  # noqa: F401 (puts utils on sys.path)
+from utils import clients
+
+def time_call(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--invocations', type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault('GROQ_API_KEY', 'benchmark')
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    factories = {
+        'groq': (clients.create_groq_client, clients.get_groq_client),
+        'openai': (clients.create_openai_client, clients.get_openai_client),
+        's3': (lambda: clients.create_boto3_client('s3'), lambda: clients.get_boto3_client('s3'))
+    }
+    if os.environ.get('GOOGLE_APPLICATION_CREDENTIALS_JSON'):
+        factories['documentai'] = (clients.create_documentai_client, clients.get_documentai_client)
+
+    print(f"{'client':>11} {'fresh p50 (ms)':>15} {'cold (ms)':>10} {'warm p50 (ms)':>14}")
+    for name, (create, get) in factories.items():
+        create()  # import the SDK first so module import time is not counted as setup
+        fresh = [time_call(create) for _ in range(args.invocations)]
+        clients.reset_clients()
+        cold = time_call(get)
+        warm = [time_call(get) for _ in range(args.invocations)]
+        print(f"{name:>11} {statistics.median(fresh) * 1000:>15.2f} {cold * 1000:>10.2f} "
+              f"{statistics.median(warm) * 1000:>14.4f}")
+
+if __name__ == '__main__':
+    main()
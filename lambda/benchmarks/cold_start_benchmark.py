@@ -0,0 +1,94 @@
+"""
+Cold-start profile of every function image: imports each lambda_function in a fresh interpreter under
+`-X importtime` and reports the init duration plus the slowest top-level imports.
+    python -m benchmarks.cold_start_benchmark [--runs 5] [--top 8] [--output cold_start.json] [--baseline old.json]
+Pass an earlier --output file as --baseline to print the change for every function.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from benchmarks.support import LAMBDA_ROOT
+
+FUNCTIONS = ['notesOcrJob', 'quizGeneration', 'quizGenerationOrchestrator', 'topicExtraction']
+
+INIT_SCRIPT = """
+import sys, time
+sys.path[:0] = [{function_dir!r}, {lambda_root!r}]
+start = time.perf_counter()
+import lambda_function
+print(time.perf_counter() - start)
+"""
+
+def parse_import_times(stderr: str) -> dict:
+    """
+    Returns {module: cumulative microseconds} for every module imported while loading lambda_function, at any
+    depth, from -X importtime output. Interpreter start-up imports are left out.
+    """
+    pending = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            # -X importtime prints children before their parent, so everything pending belongs to this entry.
+            if name == 'lambda_function':
+                return pending
+            pending = {}
+        else:
+            pending[name] = max(pending.get(name, 0), int(cumulative))
+    return {}
+
+def profile_function(function_name: str) -> tuple:
+    function_dir = os.path.join(LAMBDA_ROOT, 'functions', function_name)
+    env = dict(os.environ)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', INIT_SCRIPT.format(function_dir=function_dir, lambda_root=LAMBDA_ROOT)],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {function_name} failed:\n{result.stderr[-2000:]}")
+    return float(result.stdout.strip().splitlines()[-1]), parse_import_times(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    report = {}
+    for function_name in FUNCTIONS:
+        runs = [profile_function(function_name) for _ in range(args.runs)]
+        init_ms = statistics.median(seconds for seconds, _ in runs) * 1000
+        modules = {}
+        for _, times in runs:
+            for name, micros in times.items():
+                modules.setdefault(name, []).append(micros / 1000)
+        module_ms = {name: statistics.median(values) for name, values in modules.items()}
+        top = sorted(module_ms.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        report[function_name] = {'initMs': round(init_ms, 2), 'imports': {name: round(ms, 2) for name, ms in top}}
+
+        previous = baseline.get(function_name, {}).get('initMs')
+        change = f" ({init_ms - previous:+.1f} ms vs baseline)" if previous is not None else ''
+        print(f"{function_name}: init {init_ms:.1f} ms{change}")
+        for name, ms in top:
+            print(f"    {ms:>9.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Times utils/quiz_dedup on combined quizzes of increasing size, with a share of injected near-duplicates (another
+note's question reworded: a word dropped, swapped or added) and of low-quality questions. Reports the time taken,
+how many injected duplicates were caught, questions wrongly removed, and the same check done pairwise in Python
+for comparison. Then replays refine_quiz with a top-up that answers with fresh questions, to show each part ends
+up with the count it asked for.
+    python -m benchmarks.dedup_benchmark [--sizes 100,1000,5000] [--duplicate-rate 0.15]
+"""
+import argparse
+import random
+import time
+from benchmarks.support import quiet
+from utils.quiz_dedup import QUIZ_DEDUP_THRESHOLD, find_duplicates, question_words, refine_quiz
+
+VOCABULARY = [f'term{i}' for i in range(3000)]
+FILLERS = ['process', 'main', 'role', 'primary', 'effect', 'key', 'function', 'result']
+
+def make_question(rng: random.Random) -> dict:
+    words = rng.sample(VOCABULARY, rng.randint(7, 12))
+    return {'question': f"What is the {' '.join(words)}?",
+            'answers': [f'{rng.choice(VOCABULARY)} {j}' for j in range(4)], 'correctAnswerIndex': rng.randrange(4)}
+
+def reword(question: dict, rng: random.Random) -> dict:
+    words = question['question'][len('What is the '):-1].split()
+    change = rng.choice(['drop', 'swap', 'add'])
+    if change == 'drop':
+        words.pop(rng.randrange(len(words)))
+    elif change == 'swap':
+        i = rng.randrange(len(words) - 1)
+        words[i], words[i + 1] = words[i + 1], words[i]
+    else:
+        words.insert(rng.randrange(len(words)), rng.choice(FILLERS))
+    return dict(question, question=f"Which is the {' '.join(words)}?")
+
+def make_quiz(size: int, duplicate_rate: float, low_quality_rate: float, rng: random.Random) -> tuple:
+    """
+    Returns (questions, indexes of injected duplicates, indexes of low-quality questions).
+    """
+    questions = []
+    duplicates = set()
+    low_quality = set()
+    for i in range(size):
+        roll = rng.random()
+        if questions and roll < duplicate_rate:
+            questions.append(reword(rng.choice([q for j, q in enumerate(questions) if j not in duplicates]), rng))
+            duplicates.add(i)
+        elif roll < duplicate_rate + low_quality_rate:
+            question = make_question(rng)
+            question['question'] = f"According to the notes, {question['question'].lower()}"
+            questions.append(question)
+            low_quality.add(i)
+        else:
+            questions.append(make_question(rng))
+    return questions, duplicates, low_quality
+
+def pairwise_duplicates(questions: list, threshold: float) -> set:
+    word_sets = [question_words(question) for question in questions]
+    duplicates = set()
+    for j in range(len(word_sets)):
+        for i in range(j):
+            if i not in duplicates and len(word_sets[i] & word_sets[j]) / len(word_sets[i] | word_sets[j]) >= threshold:
+                duplicates.add(j)
+                break
+    return duplicates
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='100,1000,5000')
+    parser.add_argument('--duplicate-rate', type=float, default=0.15)
+    parser.add_argument('--low-quality-rate', type=float, default=0.03)
+    parser.add_argument('--pairwise-limit', type=int, default=2000, help='skip the pairwise check above this size')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"threshold {QUIZ_DEDUP_THRESHOLD}, {args.duplicate_rate:.0%} near-duplicates, "
+          f"{args.low_quality_rate:.0%} low quality")
+    find_duplicates(make_quiz(50, args.duplicate_rate, 0, random.Random(args.seed))[0])  # warm-up
+    print(f"{'questions':>9} {'dedup (ms)':>11} {'caught':>10} {'wrongly removed':>16} {'pairwise (ms)':>14} {'same':>5}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        questions, injected, _ = make_quiz(size, args.duplicate_rate, 0, rng)
+        start = time.perf_counter()
+        found = find_duplicates(questions)
+        elapsed = (time.perf_counter() - start) * 1000
+        pairwise_ms, same = '-', '-'
+        if size <= args.pairwise_limit:
+            start = time.perf_counter()
+            expected = pairwise_duplicates(questions, QUIZ_DEDUP_THRESHOLD)
+            pairwise_ms = f'{(time.perf_counter() - start) * 1000:.1f}'
+            same = 'yes' if expected == found else 'no'
+        print(f"{size:>9} {elapsed:>11.1f} {len(found & injected):>4}/{len(injected):<5} {len(found - injected):>16} "
+              f"{pairwise_ms:>14} {same:>5}")
+
+    # Ten notes asked for 20 questions each; the top-up answers with fresh questions, as a model told to avoid
+    # the existing ones would.
+    parts = []
+    for _ in range(10):
+        questions, _, _ = make_quiz(20, args.duplicate_rate, args.low_quality_rate, rng)
+        parts.append((20, questions))
+    with quiet():
+        quiz, stats = refine_quiz(parts, lambda index, n, exclude: [make_question(rng) for _ in range(n)])
+    print(f"refine_quiz: {sum(n for n, _ in parts)} requested, {stats['questionsRemoved']} removed, "
+          f"{stats['topUpAddedQuestions']}/{stats['topUpRequestedQuestions']} topped up, "
+          f"{len(quiz['questions'])} delivered")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""
+End-to-end offline benchmark of all four functions. Every workload uploads N notes, runs notesOcrJob and
+topicExtraction over them in S3-event batches, then submits one quiz job to the orchestrator, whose quizGeneration
+invocations run in-process. S3, Lambda, Document AI and the LLM are fakes with configurable latency and error
+rates (errors are drawn from seeded generators, so runs repeat). Reports throughput, p50/p99 latency per handler
+and peak traced Python memory, breaks the time down by traced downstream call, and can save the results as JSON
+and compare them with an earlier run. --trace-output writes every invocation's spans as JSON Lines.
+    python -m benchmarks.e2e_benchmark [--workloads 1:5 10:20 100:100] [--runs 3] [--output e2e.json] [--baseline old.json]
+                                       [--trace-output traces.jsonl]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from benchmarks.support import quiet
+from tests.fakes import FakeDocumentAIClient, FakeLambdaClient, FakeLLM, FakeS3Client, load_lambda_function
+import utils.lambda_utils as lambda_utils
+import utils.retry as retry
+import utils.s3_utils as s3_utils
+from utils.concurrency import map_concurrently
+from utils.tracing import InMemoryExporter, JsonLinesExporter, add_exporter
+
+UPLOAD_BUCKET = 'spellbook-imagestore'
+OCR_BUCKET = 'spellbook-imagestore-ocr-results'
+RETRY_SERVICES = ['s3', 'lambda', 'llm', 'documentai', 'sqs', 'default']
+HANDLERS = ['notesOcrJob', 'topicExtraction', 'quizGenerationOrchestrator', 'quizGeneration']
+DEFAULT_WORKLOADS = ['1:5', '10:20', '100:100']
+TOP_SPANS = 8
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class Harness:
+    """
+    Loads the handlers once and runs workloads against fresh fakes, timing every handler invocation.
+    """
+    def __init__(self, args):
+        self.args = args
+        os.environ['LLM_CACHE_BACKEND'] = 'none'
+        try:
+            self.ocr = load_lambda_function('notesOcrJob')
+        except ImportError as e:
+            print(f"notesOcrJob skipped, its notes are seeded directly: {e}")
+            self.ocr = None
+        self.topics = load_lambda_function('topicExtraction')
+        self.orchestrator = load_lambda_function('quizGenerationOrchestrator')
+        self.worker = load_lambda_function('quizGeneration')
+        self.orchestrator.QUIZ_WORK_QUEUE_URL = None
+        self.latencies = {}
+        self.failures = {}
+        self._lock = threading.Lock()
+        self.traces = InMemoryExporter()
+        add_exporter(self.traces)
+        if args.trace_output:
+            add_exporter(JsonLinesExporter(args.trace_output))
+
+    def timed(self, name: str, handler, event):
+        start = time.perf_counter()
+        try:
+            return handler(event, None)
+        except Exception:
+            with self._lock:
+                self.failures[name] = self.failures.get(name, 0) + 1
+            raise
+        finally:
+            with self._lock:
+                self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+
+    def reset(self, seed: int):
+        args = self.args
+        self.latencies = {}
+        self.failures = {}
+        self.traces.clear()
+        retry._circuit_breakers.clear()
+        retry._policies.clear()
+        for service in RETRY_SERVICES:
+            retry._policies[service] = retry.RetryPolicy(service, base_delay=args.retry_base_delay,
+                                                         max_delay=args.retry_max_delay, rng=random.Random(seed))
+        s3_utils.note_cache.clear()
+
+        self.s3 = FakeS3Client(latency=args.s3_latency, error_rate=args.s3_error_rate, seed=seed)
+        s3_utils.s3_client = self.s3
+        self.documentai = FakeDocumentAIClient(latency=args.documentai_latency, error_rate=args.documentai_error_rate,
+                                               seed=seed, words_per_page=args.words)
+        if self.ocr is not None:
+            self.ocr.get_documentai_client = lambda: self.documentai
+        self.llm = FakeLLM(latency=args.llm_latency, latency_per_1k_tokens=args.llm_latency_per_1k_tokens,
+                           error_rate=args.llm_error_rate, seed=seed)
+        self.topics.get_llm_provider = lambda provider_name: self.llm
+        self.worker.get_llm_provider = lambda provider_name: self.llm
+        self.lambda_client = FakeLambdaClient(lambda payload: self.timed('quizGeneration', self.worker.lambda_handler, payload),
+                                              latency=args.lambda_latency, error_rate=args.lambda_error_rate, seed=seed)
+        lambda_utils.lambda_client = self.lambda_client
+
+    def run_s3_events(self, name: str, handler, bucket: str, keys: list) -> None:
+        batches = [keys[i:i + self.args.records_per_event] for i in range(0, len(keys), self.args.records_per_event)]
+        events = [{'Records': [{'s3': {'bucket': {'name': bucket}, 'object': {'key': key}}} for key in batch]}
+                  for batch in batches]
+        map_concurrently(lambda event: self.timed(name, handler, event), events, self.args.lambda_concurrency)
+
+    def run_workload(self, num_notes: int, num_questions: int, seed: int) -> dict:
+        self.reset(seed)
+        note_keys = [f'bench-{seed}-note-{i}' for i in range(num_notes)]
+        for i, note_key in enumerate(note_keys):
+            if self.ocr is not None:
+                size = self.args.upload_bytes
+                body = random.Random(seed * 100003 + i).getrandbits(size * 8).to_bytes(size, 'little')
+                self.s3.objects[(UPLOAD_BUCKET, note_key)] = {'Body': body, 'ContentType': 'image/jpeg', 'Metadata': {}}
+            else:
+                text = ' '.join(f'word{(i + j * 7919) % 997}' for j in range(self.args.words))
+                self.s3.objects[(OCR_BUCKET, f'processed/{note_key}')] = {'Body': text.encode(), 'ContentType': 'application/json', 'Metadata': {}}
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with quiet():
+            if self.ocr is not None:
+                self.run_s3_events('notesOcrJob', self.ocr.lambda_handler, UPLOAD_BUCKET, note_keys)
+            self.run_s3_events('topicExtraction', self.topics.lambda_handler, OCR_BUCKET,
+                               [f'processed/{note_key}' for note_key in note_keys])
+            event = {'Records': [{'body': json.dumps({
+                'noteKeys': note_keys, 'numQuestions': num_questions, 'jobUuid': f'bench-{seed}', 'topics': []
+            })}]}
+            try:
+                response = self.timed('quizGenerationOrchestrator', self.orchestrator.lambda_handler, event)
+                delivered = response['totalActualQuestions']
+            except Exception:
+                delivered = 0
+        wall = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'wall': wall,
+            'peakMemoryMB': peak / 1e6,
+            'delivered': delivered,
+            'latencies': self.latencies,
+            'failures': self.failures,
+            'spans': self.traces.summary(),
+            'injectedErrors': {
+                's3': self.s3.injected_errors,
+                'lambda': self.lambda_client.injected_errors,
+                'documentai': self.documentai.injected_errors,
+                'llm': self.llm.injected_errors
+            }
+        }
+
+def summarize(num_notes: int, num_questions: int, runs: list) -> dict:
+    wall = statistics.median(run['wall'] for run in runs)
+    delivered = statistics.mean(run['delivered'] for run in runs)
+    handlers = {}
+    for name in HANDLERS:
+        latencies = [latency for run in runs for latency in run['latencies'].get(name, [])]
+        if not latencies:
+            continue
+        handlers[name] = {
+            'invocations': len(latencies),
+            'failedInvocations': sum(run['failures'].get(name, 0) for run in runs),
+            'p50Ms': percentile(latencies, 0.5) * 1000,
+            'p99Ms': percentile(latencies, 0.99) * 1000
+        }
+    spans = {}
+    for run in runs:
+        for name, stats in run['spans'].items():
+            entry = spans.setdefault(name, {'calls': 0, 'errors': 0, 'retries': 0, 'totalMs': 0.0, 'p99Ms': 0.0})
+            for key in ('calls', 'errors', 'retries', 'totalMs'):
+                entry[key] += stats[key]
+            entry['p99Ms'] = max(entry['p99Ms'], stats['p99Ms'])
+    injected = {}
+    for run in runs:
+        for service, count in run['injectedErrors'].items():
+            injected[service] = injected.get(service, 0) + count
+    return {
+        'notes': num_notes,
+        'questions': num_questions,
+        'runs': len(runs),
+        'wallSeconds': wall,
+        'notesPerSecond': num_notes / wall,
+        'questionsPerSecond': delivered / wall,
+        'questionsDelivered': delivered,
+        'peakMemoryMB': max(run['peakMemoryMB'] for run in runs),
+        'handlers': handlers,
+        'spans': spans,
+        'injectedErrors': injected
+    }
+
+def print_summary(name: str, summary: dict, baseline: dict) -> None:
+    def change(current, previous):
+        if previous in (None, 0):
+            return ''
+        return f" ({(current - previous) / previous * 100:+.0f}%)"
+
+    previous = baseline.get(name, {})
+    print(f"\n{name}: {summary['notes']} notes, {summary['questions']} questions, {summary['runs']} runs")
+    print(f"  wall {summary['wallSeconds']:.3f} s{change(summary['wallSeconds'], previous.get('wallSeconds'))}, "
+          f"{summary['notesPerSecond']:.1f} notes/s, {summary['questionsPerSecond']:.1f} questions/s "
+          f"({summary['questionsDelivered']:.0f} delivered), peak memory {summary['peakMemoryMB']:.1f} MB"
+          f"{change(summary['peakMemoryMB'], previous.get('peakMemoryMB'))}")
+    print(f"  {'handler':>28} {'calls':>6} {'failed':>7} {'p50 (ms)':>15} {'p99 (ms)':>15}")
+    for handler, stats in summary['handlers'].items():
+        before = previous.get('handlers', {}).get(handler, {})
+        print(f"  {handler:>28} {stats['invocations']:>6} {stats['failedInvocations']:>7} "
+              f"{stats['p50Ms']:>8.1f}{change(stats['p50Ms'], before.get('p50Ms')):>7} "
+              f"{stats['p99Ms']:>8.1f}{change(stats['p99Ms'], before.get('p99Ms')):>7}")
+    spans = sorted(summary['spans'].items(), key=lambda item: item[1]['totalMs'], reverse=True)[:TOP_SPANS]
+    if spans:
+        print(f"  {'span':>44} {'calls':>6} {'retries':>8} {'errors':>7} {'total (ms)':>11} {'p99 (ms)':>9}")
+    for name, stats in spans:
+        print(f"  {name:>44} {stats['calls']:>6} {stats['retries']:>8} {stats['errors']:>7} "
+              f"{stats['totalMs']:>11.1f} {stats['p99Ms']:>9.1f}")
+    if any(summary['injectedErrors'].values()):
+        print(f"  injected errors: {summary['injectedErrors']}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workloads', nargs='+', default=DEFAULT_WORKLOADS, help='notes:questions pairs')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--trace-output', help='JSON Lines file for the spans of every invocation')
+    parser.add_argument('--words', type=int, default=400, help='OCR words per note')
+    parser.add_argument('--upload-bytes', type=int, default=64 * 1024)
+    parser.add_argument('--records-per-event', type=int, default=10)
+    parser.add_argument('--lambda-concurrency', type=int, default=10)
+    parser.add_argument('--s3-latency', type=float, default=0.005)
+    parser.add_argument('--s3-error-rate', type=float, default=0.0)
+    parser.add_argument('--lambda-latency', type=float, default=0.01)
+    parser.add_argument('--lambda-error-rate', type=float, default=0.0)
+    parser.add_argument('--documentai-latency', type=float, default=0.2)
+    parser.add_argument('--documentai-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-latency', type=float, default=0.3)
+    parser.add_argument('--llm-latency-per-1k-tokens', type=float, default=0.05)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    # Shorter backoff than production so runs with injected errors finish quickly.
+    parser.add_argument('--retry-base-delay', type=float, default=0.05)
+    parser.add_argument('--retry-max-delay', type=float, default=1.0)
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('workloads', {})
+
+    harness = Harness(args)
+    workloads = {}
+    for workload in args.workloads:
+        num_notes, num_questions = (int(value) for value in workload.split(':'))
+        runs = [harness.run_workload(num_notes, num_questions, seed) for seed in range(args.runs)]
+        name = f'{num_notes}x{num_questions}'
+        workloads[name] = summarize(num_notes, num_questions, runs)
+        print_summary(name, workloads[name], baseline)
+
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key not in ('output', 'baseline', 'trace_output')}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': config, 'workloads': workloads}, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Measures how the orchestrator's quizGeneration fan-out scales with the concurrency cap, using a stubbed Lambda
+client with a fixed per-invocation latency.
+    python -m benchmarks.fanout_benchmark [--notes 20] [--latency 0.2]
+"""
+import argparse
+import time
+from benchmarks.support import quiet
+from tests.fakes import FakeLambdaClient, fake_quiz_response, load_lambda_function
+import utils.lambda_utils as lambda_utils
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notes', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--caps', type=int, nargs='+', default=[1, 2, 5, 10, 20])
+    args = parser.parse_args()
+
+    orchestrator = load_lambda_function('quizGenerationOrchestrator')
+    questions_per_note = [(f'note-{i}', 2) for i in range(args.notes)]
+    expected_order = [f'note-{i} question {j + 1}' for i in range(args.notes) for j in range(2)]
+
+    print(f"{'cap':>5} {'wall (s)':>10} {'speedup':>9} {'in flight':>10}")
+    baseline = None
+    for cap in args.caps:
+        client = FakeLambdaClient(fake_quiz_response, latency=args.latency)
+        lambda_utils.lambda_client = client
+        with quiet():
+            start = time.perf_counter()
+            results, failures = orchestrator.generate_quizzes_concurrently(questions_per_note, [], max_concurrency=cap)
+            elapsed = time.perf_counter() - start
+
+        questions = [q['question'] for _, _, response in results for q in response['body']['questions']]
+        assert not failures and questions == expected_order, "fan-out must keep the note order"
+        baseline = baseline or elapsed
+        print(f"{cap:>5} {elapsed:>10.3f} {baseline / elapsed:>8.1f}x {client.max_in_flight:>10}")
+
+if __name__ == '__main__':
+    main()
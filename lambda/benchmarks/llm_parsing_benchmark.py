@@ -0,0 +1,104 @@
+"""
+Replays quiz responses damaged the way models damage them (text around the JSON, a truncated final question,
+correctAnswerIndex as a string, an invalid question) through two strategies: the old one, where json.loads either
+accepts a response whole or the quiz is regenerated from scratch, and utils/llm_parsing with top-ups for only the
+missing questions. Reports LLM calls, questions generated (a proxy for completion tokens), usable questions
+delivered (the old strategy passed on questions with an unusable correctAnswerIndex; they are not counted) and the
+parse time of clean responses.
+    python -m benchmarks.llm_parsing_benchmark [--quizzes 1000] [--questions 8] [--damage-rate 0.2]
+"""
+import argparse
+import itertools
+import json
+import random
+import time
+from benchmarks.support import quiet
+from utils.chunking import generate_with_top_up
+from utils.llm_parsing import parse_quiz
+
+DAMAGES = ['trailing_text', 'truncated', 'string_index', 'invalid_question']
+
+def make_question(i: int) -> dict:
+    return {'question': f'Which statement about concept {i} is correct?',
+            'answers': [f'Statement {i}-{j}' for j in range(4)], 'correctAnswerIndex': i % 4}
+
+class DamagingModel:
+    """
+    Writes quiz responses as text, damaging each with probability damage_rate. Like a model at temperature 0 it
+    writes the same questions for the same prompt: the first num_questions not listed in exclude. Counts calls and
+    questions written, and remembers whether the last response was damaged.
+    """
+    def __init__(self, damage_rate: float, seed: int):
+        self.damage_rate = damage_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.generated = 0
+        self.last_damaged = False
+
+    def respond(self, num_questions: int, exclude: list = None) -> str:
+        self.calls += 1
+        self.generated += num_questions
+        excluded = set(exclude or [])
+        candidates = (make_question(i) for i in itertools.count())
+        questions = list(itertools.islice((q for q in candidates if q['question'] not in excluded), num_questions))
+        self.last_damaged = self.rng.random() < self.damage_rate
+        if not self.last_damaged:
+            return json.dumps({'questions': questions})
+        damage = self.rng.choice(DAMAGES)
+        if damage == 'string_index':
+            questions[0]['correctAnswerIndex'] = str(questions[0]['correctAnswerIndex'])
+        elif damage == 'invalid_question':
+            questions[-1]['correctAnswerIndex'] = 7
+        content = json.dumps({'questions': questions})
+        if damage == 'trailing_text':
+            return f"Here is your quiz:\n{content}\nLet me know if you need more questions!"
+        if damage == 'truncated':
+            return content[:len(content) - len(json.dumps(questions[-1])) // 2]
+        return content
+
+def old_strategy(model: DamagingModel, num_questions: int) -> int:
+    for _ in range(2):
+        try:
+            quiz = json.loads(model.respond(num_questions))
+            return sum(1 for question in quiz['questions'] if isinstance(question.get('correctAnswerIndex'), int)
+                       and 0 <= question['correctAnswerIndex'] < len(question['answers']))
+        except ValueError:
+            continue
+    return 0
+
+def new_strategy(model: DamagingModel, num_questions: int) -> int:
+    try:
+        quiz = generate_with_top_up(lambda n, exclude: parse_quiz(model.respond(n, exclude), n), num_questions)
+    except ValueError:
+        return 0
+    delivered = len(quiz['questions'])
+    # A clean top-up must make up the whole shortfall; if it repeats kept questions, the merge drops them.
+    assert delivered == num_questions or model.last_damaged, "a clean top-up left the quiz short"
+    return delivered
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quizzes', type=int, default=1000)
+    parser.add_argument('--questions', type=int, default=8)
+    parser.add_argument('--damage-rate', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.quizzes} quizzes of {args.questions} questions, {args.damage_rate:.0%} of responses damaged")
+    print(f"{'strategy':>9} {'LLM calls':>10} {'generated':>10} {'delivered':>10} {'failed quizzes':>15}")
+    for name, strategy in (('old', old_strategy), ('repair', new_strategy)):
+        model = DamagingModel(args.damage_rate, args.seed)
+        with quiet():
+            delivered = [strategy(model, args.questions) for _ in range(args.quizzes)]
+        print(f"{name:>9} {model.calls:>10} {model.generated:>10} {sum(delivered):>10} "
+              f"{sum(1 for count in delivered if count == 0):>15}")
+
+    clean = json.dumps({'questions': [make_question(i) for i in range(args.questions)]})
+    for name, parse in (('json.loads', json.loads), ('parse_quiz', lambda content: parse_quiz(content, args.questions))):
+        start = time.perf_counter()
+        for _ in range(10000):
+            parse(clean)
+        print(f"{name:>10}: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us per clean response")
+
+if __name__ == '__main__':
+    main()
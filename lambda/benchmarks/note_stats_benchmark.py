@@ -0,0 +1,45 @@
+"""
+Compares what the orchestrator downloads to allocate questions when notes carry the statistics metadata written
+by notesOcrJob against legacy notes that have to be downloaded and counted.
+    python -m benchmarks.note_stats_benchmark [--notes 50] [--words 100000]
+"""
+import argparse
+import time
+from benchmarks.support import quiet
+from tests.fakes import FakeS3Client, load_lambda_function
+import utils.s3_utils as s3_utils
+from utils.note_stats import compute_note_stats
+
+OCR_BUCKET = 'spellbook-imagestore-ocr-results'
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notes', type=int, default=50)
+    parser.add_argument('--words', type=int, default=100000)
+    args = parser.parse_args()
+
+    orchestrator = load_lambda_function('quizGenerationOrchestrator')
+    note_keys = [f'note-{i}' for i in range(args.notes)]
+
+    print(f"{'notes':>8} {'GETs':>6} {'HEADs':>6} {'downloaded':>12} {'wall (s)':>10}")
+    for with_stats in [False, True]:
+        s3 = FakeS3Client()
+        s3_utils.s3_client = s3
+        s3_utils.note_cache.clear()
+        for note_key in note_keys:
+            text = ' '.join(['lorem'] * args.words)
+            metadata = compute_note_stats(text, 1) if with_stats else None
+            s3.put_object(Bucket=OCR_BUCKET, Key=f'processed/{note_key}', Body=text, Metadata=metadata)
+
+        with quiet():
+            start = time.perf_counter()
+            note_scores, _ = orchestrator.fetch_note_scores(note_keys)
+            elapsed = time.perf_counter() - start
+        assert len(note_scores) == args.notes and all(score == args.words for _, score in note_scores)
+
+        label = 'stats' if with_stats else 'legacy'
+        print(f"{label:>8} {s3.calls['get_object']:>6} {s3.calls['head_object']:>6} "
+              f"{s3.bytes_downloaded / 1e6:>9.2f} MB {elapsed:>10.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Peak RSS while turning an S3 image body into a Document AI request and serializing it for the wire, for the old
+base64 dict request and the raw-bytes ProcessRequest built by notesOcrJob. Each path runs in a fresh subprocess
+and reads the kernel's high-water mark (VmHWM), since protobuf keeps message bytes in native memory that
+tracemalloc does not see. Reported as growth over the process holding just the upload, in MB and in multiples of
+the image. Linux only; needs google-cloud-documentai installed.
+    python -m benchmarks.ocr_memory_benchmark [--megabytes 20]
+"""
+import argparse
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+from benchmarks.support import LAMBDA_ROOT
+from tests.fakes import load_lambda_function
+
+PROCESSOR_NAME = 'projects/p/locations/us/processors/x'
+PATHS = {'old': 'base64 dict (old)', 'new': 'raw bytes (new)'}
+
+def legacy_request(content: bytes, mime_type: str):
+    from google.cloud.documentai_v1 import ProcessRequest
+    document = {"content": base64.b64encode(content).decode('utf-8'), "mime_type": mime_type}
+    return ProcessRequest({"name": PROCESSOR_NAME, "raw_document": document})
+
+def peak_rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_child(path: str, megabytes: int) -> None:
+    from google.cloud.documentai_v1 import ProcessRequest
+    ocr_job = load_lambda_function('notesOcrJob')
+    build = {
+        'old': lambda content: legacy_request(content, 'image/jpeg'),
+        'new': lambda content: ocr_job.build_process_request(PROCESSOR_NAME, content, 'image/jpeg')
+    }[path]
+    # Warm up protobuf and proto-plus so their one-off allocations are not charged to the request.
+    ProcessRequest.serialize(build(b'warm-up'))
+
+    content = os.urandom(megabytes * 1024 * 1024)
+    baseline = peak_rss_mb()
+    request = build(content)
+    built = peak_rss_mb()
+    # What the gRPC transport does before sending.
+    wire = ProcessRequest.serialize(request)
+    serialized = peak_rss_mb()
+    print(json.dumps({'built': built - baseline, 'serialized': serialized - baseline, 'wire': len(wire) / 2 ** 20}))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--megabytes', type=int, default=20)
+    parser.add_argument('--child', choices=list(PATHS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child, args.megabytes)
+        return
+
+    print(f"{args.megabytes} MB image; peak RSS growth beyond the upload itself")
+    print(f"{'path':>18} {'request (MB)':>13} {'x image':>8} {'+serialize (MB)':>16} {'x image':>8}")
+    for path, label in PATHS.items():
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.ocr_memory_benchmark', '--child', path, '--megabytes', str(args.megabytes)],
+            cwd=LAMBDA_ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:>18} {result['built']:>13.1f} {result['built'] / args.megabytes:>8.2f} "
+              f"{result['serialized']:>16.1f} {result['serialized'] / args.megabytes:>8.2f}")
+
+if __name__ == '__main__':
+    main()
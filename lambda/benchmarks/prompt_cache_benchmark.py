@@ -0,0 +1,136 @@
+"""
+Compares the old quiz prompt layout, which spliced the question count and topics into the middle of the system
+prompt, with the shared templates in utils/prompts.py, which keep them after the notes. Repeated requests over the
+same notes (retries, top-ups, new jobs with other topics or counts) are replayed against a simulated provider with
+OpenAI-style automatic prompt caching: prompts of at least 1024 tokens reuse the longest previously seen prefix in
+128-token steps, cached tokens are billed at half price and skip prefill. Reports billed input tokens and
+time-to-first-token. --live sends the same requests to OpenAI instead and reads cached_tokens from the usage.
+    python -m benchmarks.prompt_cache_benchmark [--notes 10] [--requests-per-note 6] [--live]
+"""
+import argparse
+import random
+import statistics
+import time
+from benchmarks.support import quiet
+from utils.note_stats import CHARS_PER_TOKEN
+from utils.prompts import build_quiz_messages
+
+MIN_CACHED_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+CACHED_TOKEN_PRICE = 0.5
+TOPICS = ['Photosynthesis', 'Cell respiration', 'Mitosis', 'Genetics', 'Evolution', 'Ecology']
+
+def legacy_quiz_messages(notes: list, num_questions: int, topics: list) -> list:
+    """
+    The layout before the shared templates: the request's count and topics sit inside the system prompt.
+    """
+    formatted_topics = ", ".join(f"'{topic}'" for topic in topics)
+    focus = f"Focus on the topics: {formatted_topics}. " if topics else ""
+    system_content = (
+        "Generate a quiz in JSON format based on the provided notes (found inside the triple quotes). "
+        "The quiz should include question text and multiple-choice answers derived from the notes content. "
+        "When you come up with the answer options, try to keep them realistic. "
+        f"The quiz should have exactly {num_questions} questions if possible. "
+        f"{focus}If the notes don't touch on the topics, feel free to return an object with no (or very few) questions. "
+        "Feel free to make the questions difficult, but make sure they draw from the notes and are useful for the user. "
+        "Do not mention \"the notes\" in any form in the questions or answers. For example do not say \"according to the notes\" or, \"as indicated by the notes\". "
+        "Only respond in the following format: \n"
+        "{\n  \"questions\": [\n    {\n      \"question\": \"string\",\n      \"answers\": \"string[]\",\n"
+        "      \"correctAnswerIndex\": \"number\"\n    }\n  ]\n}\n"
+        "Only respond in the above format. "
+        "Do not put your response in quotes."
+    )
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": f"Notes: '''{' '.join(notes)}'''"}
+    ]
+
+def serialize(messages: list) -> str:
+    return ''.join(f"<{message['role']}>{message['content']}" for message in messages)
+
+class SimulatedPromptCache:
+    """
+    Provider-side prefix cache: a prompt reuses the longest prefix it shares with any earlier prompt, rounded down
+    to CACHE_STEP_TOKENS, once that prefix reaches MIN_CACHED_TOKENS. Prefill time is charged per uncached token.
+    """
+    def __init__(self, base_ttft: float, prefill_per_1k_tokens: float):
+        self.base_ttft = base_ttft
+        self.prefill_per_1k_tokens = prefill_per_1k_tokens
+        self.prompts = []
+
+    def request(self, messages: list) -> tuple:
+        prompt = serialize(messages)
+        tokens = len(prompt) // CHARS_PER_TOKEN
+        shared_chars = 0
+        for previous in self.prompts:
+            limit = min(len(prompt), len(previous))
+            i = 0
+            while i < limit and prompt[i] == previous[i]:
+                i += 1
+            shared_chars = max(shared_chars, i)
+        self.prompts.append(prompt)
+        cached = (shared_chars // CHARS_PER_TOKEN) // CACHE_STEP_TOKENS * CACHE_STEP_TOKENS
+        if cached < MIN_CACHED_TOKENS:
+            cached = 0
+        ttft = self.base_ttft + self.prefill_per_1k_tokens * (tokens - cached) / 1000
+        return tokens, cached, ttft
+
+def live_request(client, model: str, messages: list) -> tuple:
+    start = time.perf_counter()
+    ttft = None
+    usage = None
+    stream = client.chat.completions.create(model=model, messages=messages, stream=True,
+                                            stream_options={"include_usage": True})
+    for chunk in stream:
+        if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+            ttft = time.perf_counter() - start
+        if chunk.usage is not None:
+            usage = chunk.usage
+    cached = getattr(usage.prompt_tokens_details, 'cached_tokens', 0) or 0
+    return usage.prompt_tokens, cached, ttft
+
+def workload(num_notes: int, requests_per_note: int, words: int, seed: int) -> list:
+    rng = random.Random(seed)
+    notes = [' '.join(f'term{rng.randrange(5000)}' for _ in range(words)) + '.' for _ in range(num_notes)]
+    requests = []
+    for _ in range(requests_per_note):
+        for note in notes:
+            requests.append(([note], rng.randint(2, 10), rng.sample(TOPICS, rng.randint(0, 3))))
+    return requests
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notes', type=int, default=10)
+    parser.add_argument('--requests-per-note', type=int, default=6)
+    parser.add_argument('--words', type=int, default=1200, help='words per note')
+    parser.add_argument('--base-ttft', type=float, default=0.15)
+    parser.add_argument('--prefill-per-1k-tokens', type=float, default=0.08)
+    parser.add_argument('--live', action='store_true', help='send the requests to OpenAI (needs OPENAI_API_KEY)')
+    parser.add_argument('--model', default='gpt-4o-mini')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    requests = workload(args.notes, args.requests_per_note, args.words, args.seed)
+    print(f"{len(requests)} quiz requests over {args.notes} notes of {args.words} words")
+    print(f"{'layout':>10} {'input tokens':>13} {'cached':>8} {'billed':>9} {'mean TTFT (ms)':>15} {'p50 TTFT (ms)':>14}")
+    for name, build in (('legacy', legacy_quiz_messages), ('templates', build_quiz_messages)):
+        if args.live:
+            from utils.clients import get_openai_client
+            client = get_openai_client()
+            send = lambda messages: live_request(client, args.model, messages)
+        else:
+            send = SimulatedPromptCache(args.base_ttft, args.prefill_per_1k_tokens).request
+        totals = [0, 0]
+        ttfts = []
+        with quiet():
+            for notes, num_questions, topics in requests:
+                tokens, cached, ttft = send(build(notes, num_questions, topics))
+                totals[0] += tokens
+                totals[1] += cached
+                ttfts.append(ttft)
+        billed = totals[0] - totals[1] + CACHED_TOKEN_PRICE * totals[1]
+        print(f"{name:>10} {totals[0]:>13} {totals[1]:>8} {billed:>9.0f} {statistics.mean(ttfts) * 1000:>15.1f} "
+              f"{statistics.median(ttfts) * 1000:>14.1f}")
+
+if __name__ == '__main__':
+    main()
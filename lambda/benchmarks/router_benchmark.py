@@ -0,0 +1,113 @@
+"""
+Simulates a Groq outage for the LLM router: the primary backend is fast but has a slow tail and answers 429 during
+a stretch of requests, the secondary is slower but steady. Sends the same request sequence to the primary alone
+and to LLMRouter over both, and reports failures, latency percentiles and where the calls went. Latencies are
+drawn from seeded generators and the outage is keyed to the request number, so runs are repeatable. The
+pass/fail version of this simulation, on a fake clock, is tests/test_llm_router.py.
+    python -m benchmarks.router_benchmark [--requests 200] [--outage 40 80] [--interval 0.03]
+"""
+import argparse
+import random
+import threading
+import time
+from benchmarks.support import quiet
+from tests.fakes import FakeLLM
+import utils.llm_router as llm_router
+from utils.llm_router import LLMRouter
+from utils.retry import CircuitBreaker, RetryPolicy
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__('Rate limit reached')
+        self.headers = {'retry-after': str(retry_after)}
+
+class SimulatedBackend(FakeLLM):
+    """
+    FakeLLM whose latency is drawn from a seeded distribution with a slow tail, and which answers 429 while the
+    simulation's current request number is inside outage.
+    """
+    def __init__(self, provider: str, latency: float, slow_rate: float = 0.0, slow_latency: float = 0.0,
+                 outage: range = range(0), retry_after: float = 0.2, seed: int = 0):
+        self.request = 0
+        super().__init__()
+        self.PROVIDER = provider
+        self.MODEL = 'fake-8k'
+        self.base_latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.outage = outage
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.rate_limited = 0
+        self._sim_lock = threading.Lock()
+
+    def _respond(self, text: str, completion_tokens: int = 0):
+        with self._sim_lock:
+            self.calls += 1
+            slow = self.rng.random() < self.slow_rate
+            jitter = self.rng.uniform(0.8, 1.2)
+            if self.request in self.outage:
+                self.rate_limited += 1
+                raise RateLimitError(self.retry_after)
+        time.sleep((self.slow_latency if slow else self.base_latency) * jitter)
+
+def make_backends(outage: range) -> list:
+    return [
+        SimulatedBackend('groq', latency=0.02, slow_rate=0.04, slow_latency=0.4, outage=outage, seed=1),
+        SimulatedBackend('openai', latency=0.06, seed=2)
+    ]
+
+def make_policy(name: str) -> RetryPolicy:
+    return RetryPolicy(name, base_delay=0.05, max_delay=0.5, circuit_breaker=CircuitBreaker(reset_timeout=0.5),
+                       rng=random.Random(0))
+
+def run(llm, backends: list, policy: RetryPolicy, requests: int, interval: float) -> dict:
+    latencies = []
+    failures = 0
+    start = time.perf_counter()
+    for i in range(requests):
+        # Requests arrive on a fixed schedule, so failing fast does not shorten the outage.
+        time.sleep(max(0.0, start + i * interval - time.perf_counter()))
+        for backend in backends:
+            backend.request = i
+        request_start = time.perf_counter()
+        try:
+            policy.call(llm.generate_quiz, [f'note {i}'], 5, [])
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - request_start)
+    latencies.sort()
+    return {
+        'failures': failures,
+        'p50': latencies[len(latencies) // 2],
+        'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'wall': time.perf_counter() - start
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--outage', type=int, nargs=2, default=[40, 80])
+    parser.add_argument('--interval', type=float, default=0.03)
+    args = parser.parse_args()
+
+    llm_router.HEDGE_DELAY_SECONDS = 0.1
+    llm_router.HEDGE_MIN_DELAY_SECONDS = 0.05
+    llm_router.ROUTER_COOLDOWN_SECONDS = 0.5
+    outage = range(*args.outage)
+
+    print(f"{'setup':>12} {'failures':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'wall (s)':>9}  calls (429s)")
+    for label in ['groq only', 'router']:
+        backends = make_backends(outage)
+        llm = backends[0] if label == 'groq only' else LLMRouter(backends, hedge=True)
+        with quiet():
+            result = run(llm, backends, make_policy(f'llm-{label}'), args.requests, args.interval)
+        calls = ', '.join(f'{b.PROVIDER} {b.calls} ({b.rate_limited})' for b in backends if b.calls)
+        print(f"{label:>12} {result['failures']:>9} {result['p50'] * 1000:>9.1f} {result['p95'] * 1000:>9.1f} {result['p99'] * 1000:>9.1f} "
+              f"{result['wall']:>9.2f}  {calls}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Runs the orchestrator and the quizGeneration worker in-process against an in-memory S3 and counts the GETs a
+quiz job issues. The first run disables the note cache, since both handlers share one process here, so its count
+shows the inline hand-off alone; the later runs show the container-wide cache.
+    python -m benchmarks.s3_prefetch_benchmark [--notes 20] [--latency 0.02]
+"""
+import argparse
+import json
+import time
+from benchmarks.support import quiet
+from tests.fakes import FakeLambdaClient, FakeLLM, FakeS3Client, load_lambda_function
+import utils.lambda_utils as lambda_utils
+import utils.s3_utils as s3_utils
+
+OCR_BUCKET = 'spellbook-imagestore-ocr-results'
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notes', type=int, default=20)
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    orchestrator = load_lambda_function('quizGenerationOrchestrator')
+    worker = load_lambda_function('quizGeneration')
+    worker.get_llm_provider = lambda provider_name: FakeLLM()
+
+    s3 = FakeS3Client(latency=args.latency)
+    s3_utils.s3_client = s3
+    note_keys = [f'note-{i}' for i in range(args.notes)]
+    for i, note_key in enumerate(note_keys):
+        s3.put_object(Bucket=OCR_BUCKET, Key=f'processed/{note_key}', Body=' '.join(['word'] * (args.words + i)))
+    lambda_utils.lambda_client = FakeLambdaClient(lambda payload: worker.lambda_handler(payload, None))
+
+    event = {'Records': [{'body': json.dumps({
+        'noteKeys': note_keys, 'numQuestions': args.notes * 2, 'jobUuid': 'benchmark', 'topics': []
+    })}]}
+
+    print(f"{'run':>9} {'GETs':>6} {'wall (s)':>10}")
+    cache_size = s3_utils.note_cache.max_bytes
+    for run in ['no cache', 'cold', 'warm']:
+        s3_utils.note_cache.max_bytes = 0 if run == 'no cache' else cache_size
+        s3.calls['get_object'] = 0
+        with quiet():
+            start = time.perf_counter()
+            orchestrator.lambda_handler(event, None)
+            elapsed = time.perf_counter() - start
+        print(f"{run:>9} {s3.calls['get_object']:>6} {elapsed:>10.3f}")
+    print(f"(one GET per note would be {args.notes}; the sequential double read issued {2 * args.notes})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+"""
+Shared helpers for the offline benchmarks. Run benchmarks from the lambda/ directory, e.g.
+    python -m benchmarks.fanout_benchmark
+The fakes they run against live in tests/fakes.py, shared with the test suite.
+"""
+import contextlib
+import io
+import os
+import sys
+
+LAMBDA_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if LAMBDA_ROOT not in sys.path:
+    sys.path.insert(0, LAMBDA_ROOT)
+# boto3 clients are created at import time and need a region even though no request leaves the process.
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+def quiet():
+    """
+    Swallows the handlers' print logging while a benchmark is being timed.
+    """
+    return contextlib.redirect_stdout(io.StringIO())
@@ -0,0 +1,50 @@
+"""
+Measures topicExtraction throughput in documents per second for an event of many small OCR'd pages: one request
+per page in turn (the previous behaviour), one request per page in parallel, and pages packed into batched
+requests run in parallel. The LLM is a stub whose latency has a fixed part and a per-token part.
+    python -m benchmarks.topic_batching_benchmark [--pages 40] [--words 150] [--latency 0.3]
+"""
+import argparse
+import os
+import time
+from benchmarks.support import quiet
+from tests.fakes import FakeLLM, FakeS3Client, load_lambda_function
+import utils.s3_utils as s3_utils
+
+OCR_BUCKET = 'spellbook-imagestore-ocr-results'
+TOPICS_BUCKET = 'spellbook-topic-extraction-results'
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--words', type=int, default=150)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--latency-per-1k-tokens', type=float, default=0.05)
+    args = parser.parse_args()
+
+    os.environ['LLM_CACHE_BACKEND'] = 'none'
+    handler = load_lambda_function('topicExtraction')
+    keys = [f'processed/page-{i}' for i in range(args.pages)]
+    event = {'Records': [{'s3': {'bucket': {'name': OCR_BUCKET}, 'object': {'key': key}}} for key in keys]}
+
+    print(f"{'mode':>12} {'LLM calls':>10} {'wall (s)':>9} {'docs/s':>8}")
+    for mode, batching, concurrency in [('sequential', False, 1), ('parallel', False, 8), ('batched', True, 8)]:
+        s3 = FakeS3Client()
+        s3_utils.s3_client = s3
+        for i, key in enumerate(keys):
+            s3.put_object(Bucket=OCR_BUCKET, Key=key, Body=' '.join(f'term{i}-{j % 40}' for j in range(args.words)))
+        llm = FakeLLM(latency=args.latency, latency_per_1k_tokens=args.latency_per_1k_tokens)
+        handler.get_llm_provider = lambda provider_name: llm
+        handler.TOPIC_BATCHING = batching
+        handler.MAX_CONCURRENT_RECORDS = concurrency
+
+        with quiet():
+            start = time.perf_counter()
+            response = handler.lambda_handler(event, None)
+            elapsed = time.perf_counter() - start
+        assert response['processedCount'] == args.pages and not response['failedRecords']
+        assert all((TOPICS_BUCKET, f'topics/{key}') in s3.objects for key in keys), "every key needs its topics file"
+        print(f"{mode:>12} {llm.calls:>10} {elapsed:>9.3f} {args.pages / elapsed:>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Measures what tracing adds to a retried call: per-call cost of retry_call around a no-op outside any traced
+invocation (how every call behaves with TRACING_ENABLED=false), inside a traced invocation, and the cost of
+emitting the EMF line for an invocation of a given number of spans.
+    python -m benchmarks.tracing_benchmark [--calls 100000] [--spans 200]
+"""
+import argparse
+import time
+from benchmarks.support import quiet
+import utils.tracing as tracing
+from utils.retry import retry_call
+
+def noop():
+    return None
+
+def per_call(calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        retry_call('default', noop)
+    return (time.perf_counter() - start) / calls
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--spans', type=int, default=200)
+    args = parser.parse_args()
+
+    baseline = per_call(args.calls)
+
+    @tracing.traced_handler('benchmark')
+    def handler(event, context):
+        return per_call(args.calls)
+
+    with quiet():
+        traced = handler(None, None)
+
+    @tracing.traced_handler('benchmark')
+    def invocation(event, context):
+        for i in range(args.spans):
+            with tracing.span(f'service{i % 10}.call'):
+                pass
+
+    with quiet():
+        start = time.perf_counter()
+        for _ in range(100):
+            invocation(None, None)
+        emf = (time.perf_counter() - start) / 100
+
+    print(f"retry_call, no trace active: {baseline * 1e6:.2f} us/call")
+    print(f"retry_call, traced:          {traced * 1e6:.2f} us/call ({(traced - baseline) * 1e6:+.2f} us)")
+    print(f"invocation with {args.spans} spans, EMF line included: {emf * 1e3:.3f} ms")
+
+if __name__ == '__main__':
+    main()
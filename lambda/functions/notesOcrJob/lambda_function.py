@@ -1,24 +1,84 @@
-import base64
+import hashlib
 import json
 import os
-from google.cloud.documentai_v1 import DocumentProcessorServiceClient
-from google.oauth2 import service_account
-from utils.s3_utils import get_s3_object, put_s3_object, head_s3_object
-from utils.retry import retry_operation
+from google.cloud.documentai_v1 import ProcessRequest, RawDocument
+from utils.clients import get_documentai_client
+from utils.concurrency import map_concurrently
+from utils.note_stats import compute_note_stats
+from utils.s3_utils import copy_s3_object, get_s3_object_with_content_type, head_s3_object_if_exists, put_s3_object
+from utils.retry import retry_call, set_invocation_deadline
+from utils.tracing import traced_handler
 
 PROCESSOR_ID = 'c2feb52c92e94301'
 PROJECT_ID = 'notes-helper-383322'
 LOCATION = 'us'
 OUTPUT_BUCKET_NAME = 'spellbook-imagestore-ocr-results'
+DOCUMENT_AI_TIMEOUT_SECONDS = float(os.environ.get('DOCUMENT_AI_TIMEOUT_SECONDS', '120'))
+MAX_CONCURRENT_RECORDS = int(os.environ.get('MAX_CONCURRENT_OCR_RECORDS', '8'))
+# OCR results are also kept as {sha256 of the upload} in this bucket so identical uploads under other keys skip
+# Document AI. It must have no S3 event notifications, which is why it is not the OCR results bucket: every object
+# written there triggers topicExtraction. Unset turns the cache off; unchanged re-uploads of a key are still skipped.
+OCR_CACHE_BUCKET = os.environ.get('OCR_CACHE_BUCKET')
 
+# Container-wide totals of how each record was handled.
+ocr_counters = {'processed': 0, 'copied': 0, 'unchanged': 0}
+
+def find_existing_result(bucket_name: str, key: str) -> dict:
+    # A missing result is the common case for new uploads, not a failure.
+    return retry_call('s3', head_s3_object_if_exists, bucket_name, key)
+
+def build_process_request(name: str, content: bytes, mime_type: str) -> ProcessRequest:
+    """
+    Wraps the S3 bytes in RawDocument.content as they are. The gRPC transport ships bytes fields natively, so
+    there is no base64 text copy of the upload and the same path serves images, PDFs and text.
+    """
+    return ProcessRequest(name=name, raw_document=RawDocument(content=content, mime_type=mime_type))
+
+def process_record(client, name: str, record: dict) -> str:
+    bucket_name = record['s3']['bucket']['name']
+    key = record['s3']['object']['key']
+    print(f"Processing S3 bucket: {bucket_name}, Key: {key}")
+
+    # Get the document and its Content-Type from S3 in one request, with retries
+    document_content, mime_type = retry_call('s3', get_s3_object_with_content_type, bucket_name, key)
+    print(f"Document retrieved from S3. Content-Type: {mime_type}")
+
+    # Skip Document AI when these exact bytes were processed before, here or under another key
+    output_key = f'processed/{key}'
+    source_sha256 = hashlib.sha256(document_content).hexdigest()
+    existing = find_existing_result(OUTPUT_BUCKET_NAME, output_key)
+    if existing and existing.get('Metadata', {}).get('source-sha256') == source_sha256:
+        print(f"Unchanged re-upload; keeping the existing result at {output_key}")
+        return 'unchanged'
+    if OCR_CACHE_BUCKET and find_existing_result(OCR_CACHE_BUCKET, source_sha256):
+        retry_call('s3', copy_s3_object, OCR_CACHE_BUCKET, source_sha256, OUTPUT_BUCKET_NAME, output_key)
+        print(f"Duplicate upload; copied the cached OCR result {source_sha256} to {output_key}")
+        return 'copied'
+
+    # Prepare the request to Document AI from the raw bytes
+    request = build_process_request(name, document_content, mime_type)
+    del document_content
+    print(f"Request prepared for Google Document AI: {key}")
+
+    # Process the document using Document AI with retries
+    result = retry_call('documentai', client.process_document, request=request, timeout=DOCUMENT_AI_TIMEOUT_SECONDS)
+    document_text = result.document.text
+    print(f"Document processed by Google Document AI: {key}")
+
+    # Output the results to a different S3 bucket with retries, recording the note statistics as object metadata
+    metadata = dict(compute_note_stats(document_text, len(result.document.pages)), **{'source-sha256': source_sha256})
+    retry_call('s3', put_s3_object, OUTPUT_BUCKET_NAME, output_key, document_text, metadata=metadata)
+    print(f"Processed document text saved to S3 bucket: {OUTPUT_BUCKET_NAME}, Key: {output_key}")
+    if OCR_CACHE_BUCKET:
+        retry_call('s3', copy_s3_object, OUTPUT_BUCKET_NAME, output_key, OCR_CACHE_BUCKET, source_sha256)
+    return 'processed'
+
+@traced_handler('notesOcrJob')
 def lambda_handler(event, context):
-    # Document AI setup
-    credentials_json = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS_JSON')
-    if not credentials_json:
-        print("Environment variable for GOOGLE_APPLICATION_CREDENTIALS_JSON is missing.")
-        raise ValueError("Environment variable for GOOGLE_APPLICATION_CREDENTIALS_JSON is missing")
-    credentials = service_account.Credentials.from_service_account_info(json.loads(credentials_json))
-    client = DocumentProcessorServiceClient(credentials=credentials)
+    set_invocation_deadline(context)
+
+    # Document AI setup, reusing the client of previous invocations in this container
+    client = get_documentai_client()
     name = client.processor_path(PROJECT_ID, LOCATION, PROCESSOR_ID)
     print("Google Document AI client initialized with processor path.")
 
@@ -27,46 +87,33 @@ def lambda_handler(event, context):
         print("No records found in the event.")
         raise ValueError("No records found in the event")
 
-    processed_count = 0
-
-    for record in event['Records']:
-        bucket_name = record['s3']['bucket']['name']
-        key = record['s3']['object']['key']
-        print(f"Processing S3 bucket: {bucket_name}, Key: {key}")
+    # Process the records concurrently; a failing record is reported without aborting the others
+    records = event['Records']
+    outcomes = map_concurrently(lambda record: process_record(client, name, record), records, MAX_CONCURRENT_RECORDS)
 
-        # Get the document from S3 with retries
-        document_content = retry_operation(get_s3_object, bucket_name, key)
-        print("Document retrieved from S3.")
-
-        # Retrieve the Content-Type from the metadata with retries
-        response = retry_operation(head_s3_object, bucket_name, key)
-        mime_type = response['ContentType']
-        print(f"Retrieved Content-Type: {mime_type}")
-
-        # Prepare the request to Document AI
-        # Encode the document content in base64 if it's an image
-        if mime_type.startswith('image/'):
-            document_content = base64.b64encode(document_content).decode('utf-8')
+    processed_count = 0
+    outcome_counts = {'processed': 0, 'copied': 0, 'unchanged': 0}
+    failed_records = []
+    for record, (outcome, error) in zip(records, outcomes):
+        if error is None:
+            processed_count += 1
+            outcome_counts[outcome] += 1
+            ocr_counters[outcome] += 1
         else:
-            document_content = document_content.decode('utf-8')
-        document = {"content": document_content, "mime_type": mime_type}
-        request = {"name": name, "raw_document": document}
-        print("Request prepared for Google Document AI.")
-
-        # Process the document using Document AI with retries
-        result = retry_operation(client.process_document, request=request)
-        document_text = result.document.text
-        print("Document processed by Google Document AI.")
+            key = record.get('s3', {}).get('object', {}).get('key')
+            print(f"Error: processing {key} failed. Error: {str(error)}")
+            failed_records.append({'key': key, 'error': str(error)})
 
-        # Output the results to a different S3 bucket with retries
-        output_key = f'processed/{key}'
-        retry_operation(put_s3_object, OUTPUT_BUCKET_NAME, output_key, document_text)
-        print(f"Processed document text saved to S3 bucket: {OUTPUT_BUCKET_NAME}, Key: {output_key}")
+    skipped_count = outcome_counts['copied'] + outcome_counts['unchanged']
+    print(f"Document AI calls skipped: {skipped_count} of {processed_count}. Container totals: {ocr_counters}")
 
-        processed_count += 1
+    if not processed_count:
+        raise RuntimeError(f"Processing failed for every record: {failed_records}")
 
     return {
         'statusCode': 200,
         'body': json.dumps('Document(s) processed successfully and saved to S3'),
-        'processedCount': processed_count
+        'processedCount': processed_count,
+        'skippedCount': skipped_count,
+        'failedRecords': failed_records
     }
@@ -1,39 +1,98 @@
 import os, json
-from utils.openai_llm import OpenAILLM
-from utils.groq_llm import GroqLLM
-from utils.s3_utils import get_s3_object_as_text
-from utils.retry import retry_operation
+from utils.chunking import generate_quiz_chunked
+from utils.concurrency import map_concurrently
+from utils.llm_cache import with_response_cache
+from utils.llm_providers import DEFAULT_LLM_PROVIDER, get_llm_provider
+from utils.quiz_jobs import assemble_quiz, part_key, write_json
+from utils.quiz_progress import QuizProgressWriter
+from utils.s3_utils import get_cached_s3_object_as_text
+from utils.retry import retry_call, set_invocation_deadline
+from utils.tracing import traced_handler
 
 S3_BUCKET_NAME = 'spellbook-imagestore-ocr-results'
-DEFAULT_LLM_PROVIDER = 'groq'
+S3_BUCKET_NAME_GENERATED_QUIZZES = 'spellbook-generated-quizzes'
+MAX_CONCURRENT_WORK_ITEMS = int(os.environ.get('MAX_CONCURRENT_WORK_ITEMS', '4'))
+# A work item that keeps failing is recorded as a failed part on its last delivery so the job can still complete.
+QUIZ_PART_MAX_ATTEMPTS = int(os.environ.get('QUIZ_PART_MAX_ATTEMPTS', '3'))
 
-def get_llm_provider(provider_name: str):
-    if provider_name == 'openai':
-        return OpenAILLM()
-    elif provider_name == 'groq':
-        return GroqLLM()
-    else:
-        raise ValueError(f"Unknown LLM provider: {provider_name}")
-
-def lambda_handler(event, context):
+def generate_quiz(event: dict) -> dict:
     # Extract parameters from the event
     note_keys = event['noteKeys']
     num_questions = event['numQuestions']
     topics = event['topics']
+    # The orchestrator forwards the note text it already downloaded, aligned with noteKeys.
+    note_contents = event.get('noteContents') or [None] * len(note_keys)
+    # Set for top-ups: questions the quiz already has and must not repeat.
+    exclude = event.get('excludeQuestions')
     
     # Get the LLM provider from environment variable
     provider_name = os.environ.get('LLM_PROVIDER', DEFAULT_LLM_PROVIDER)
-    llm_provider = get_llm_provider(provider_name)
+    llm_provider = with_response_cache(get_llm_provider(provider_name))
 
-    # Fetch the note content from S3
+    # Fetch from S3 only the note content that was not passed in
     notes = []
-    for note_key in note_keys:
-        s3_key = f'processed/{note_key}'
-        note_content = retry_operation(get_s3_object_as_text, S3_BUCKET_NAME, s3_key)
+    for note_key, note_content in zip(note_keys, note_contents):
+        if note_content is None:
+            s3_key = f'processed/{note_key}'
+            note_content = retry_call('s3', get_cached_s3_object_as_text, S3_BUCKET_NAME, s3_key)
         notes.append(note_content)
 
-    # Generate quiz using the LLM provider
-    quiz = retry_operation(llm_provider.generate_quiz, notes, num_questions, topics)
+    # Stream questions to the part's progress file as they are generated, when the orchestrator asked for it
+    progress_key = event.get('progressKey')
+    progress = QuizProgressWriter(S3_BUCKET_NAME_GENERATED_QUIZZES, progress_key) if progress_key else None
+    on_questions = progress.add if progress is not None else None
+
+    # Generate quiz using the LLM provider, chunking notes that are too large for a single prompt
+    try:
+        return generate_quiz_chunked(llm_provider, notes, num_questions, topics, on_questions=on_questions, exclude=exclude)
+    finally:
+        if progress is not None:
+            progress.close()
+
+def process_work_item(record: dict) -> None:
+    """
+    Generates one part of a queued job, writes it to quizzes/{job_id}/parts/ and assembles the quiz if it was the
+    last part missing. Parts are keyed by index, so a redelivered work item overwrites its own part.
+    """
+    work_item = json.loads(record['body'])
+    job_id = work_item['jobUuid']
+    payload = work_item['payload']
+    part = {'noteKey': payload['noteKeys'][0], 'numQuestions': payload['numQuestions']}
+    try:
+        part['questions'] = generate_quiz(payload)['questions']
+    except Exception as e:
+        attempts = int(record.get('attributes', {}).get('ApproximateReceiveCount', '1'))
+        if attempts < QUIZ_PART_MAX_ATTEMPTS:
+            raise
+        print(f"Error: part {work_item['partIndex']} of job {job_id} failed on attempt {attempts}. Error: {str(e)}")
+        part['error'] = str(e)
+
+    write_json(S3_BUCKET_NAME_GENERATED_QUIZZES, part_key(job_id, work_item['partIndex']), part)
+    def top_up(note_key, num_questions, exclude):
+        event = {'noteKeys': [note_key], 'numQuestions': num_questions, 'topics': payload['topics'], 'excludeQuestions': exclude}
+        return generate_quiz(event)['questions']
+
+    manifest = assemble_quiz(S3_BUCKET_NAME_GENERATED_QUIZZES, job_id, top_up)
+    if manifest is not None:
+        print(f"Assembled job {job_id}: {manifest['totalActualQuestions']} questions, status {manifest['status']}.")
+
+@traced_handler('quizGeneration')
+def lambda_handler(event, context):
+    set_invocation_deadline(context)
+
+    # Work items from the job queue; failed ones are returned for SQS to redeliver
+    if 'Records' in event:
+        records = event['Records']
+        outcomes = map_concurrently(process_work_item, records, MAX_CONCURRENT_WORK_ITEMS)
+        failures = []
+        for record, (_, error) in zip(records, outcomes):
+            if error is not None:
+                print(f"Error: work item {record['messageId']} failed. Error: {str(error)}")
+                failures.append({'itemIdentifier': record['messageId']})
+        return {'batchItemFailures': failures}
+
+    # Synchronous invocation by the orchestrator
+    quiz = generate_quiz(event)
     
     # Return the generated quiz as a JSON object
     return {
@@ -1,74 +1,233 @@
 import json
-import math
-import boto3
+import os
 from botocore.exceptions import ClientError
+from utils.allocation import calculate_questions_per_note
+from utils.concurrency import map_concurrently
 from utils.lambda_utils import invoke_lambda
-from utils.s3_utils import get_s3_object_as_text, put_s3_object
-from utils.retry import retry_operation
-
-sqs_client = boto3.client('sqs')
+from utils.note_stats import parse_note_stats
+from utils.quiz_dedup import refine_quiz
+from utils.quiz_jobs import assemble_quiz, job_manifest_key, write_json, write_progress_manifest
+from utils.s3_utils import get_cached_s3_object_as_text, get_s3_objects_as_text, head_s3_object, head_s3_objects, is_missing_key_error, put_s3_object
+from utils.retry import retry_call, set_invocation_deadline
+from utils.tracing import traced_handler
+from utils.sqs_utils import MAX_MESSAGE_BYTES, send_message_batch, split_batches
 
 S3_BUCKET_NAME_OCR_RESULTS = 'spellbook-imagestore-ocr-results'
 S3_BUCKET_NAME_GENERATED_QUIZZES = 'spellbook-generated-quizzes'
+MAX_CONCURRENT_INVOCATIONS = int(os.environ.get('MAX_CONCURRENT_INVOCATIONS', '10'))
+# Notes up to this size are passed inline to quizGeneration so it does not download them again. Measured as the
+# JSON the invocation sends, where non-ASCII text takes up to 6 bytes a character; payloads are capped at 6 MB.
+MAX_INLINE_NOTE_BYTES = int(os.environ.get('MAX_INLINE_NOTE_BYTES', '1000000'))
+# Workers publish questions to quizzes/{job_id}/progress/ while generating, indexed by quizzes/{job_id}.progress.json.
+# Opt-in: streaming gives up Groq's JSON mode, which cannot be combined with it, and relies on the prompt alone.
+STREAM_QUIZ_PROGRESS = os.environ.get('STREAM_QUIZ_PROGRESS', 'false').lower() == 'true'
+# How questions are apportioned across notes: 'hamilton' (largest remainder) or 'sainte-lague'.
+QUESTION_ALLOCATION_METHOD = os.environ.get('QUESTION_ALLOCATION_METHOD', 'hamilton')
+MIN_QUESTIONS_PER_NOTE = int(os.environ.get('MIN_QUESTIONS_PER_NOTE', '0'))
+MAX_QUESTIONS_PER_NOTE = int(os.environ['MAX_QUESTIONS_PER_NOTE']) if os.environ.get('MAX_QUESTIONS_PER_NOTE') else None
+# Above 1 spreads questions more evenly across short and long notes; unset keeps them proportional to word count.
+QUESTION_ALLOCATION_TEMPERATURE = float(os.environ['QUESTION_ALLOCATION_TEMPERATURE']) if os.environ.get('QUESTION_ALLOCATION_TEMPERATURE') else None
+# When set, jobs are enqueued here for quizGeneration to consume instead of invoking it synchronously, and the
+# worker that writes the last part assembles quizzes/{job_id}.json.
+QUIZ_WORK_QUEUE_URL = os.environ.get('QUIZ_WORK_QUEUE_URL')
 
 def score_page(content: str) -> int:
     return len(content.split())
 
-def fetch_note_content(note_key: str) -> str:
+def fetch_note_content(note_key: str, etag: str = None) -> str:
     s3_key = f'processed/{note_key}'
     try:
-        return retry_operation(get_s3_object_as_text, S3_BUCKET_NAME_OCR_RESULTS, s3_key)
+        return retry_call('s3', get_cached_s3_object_as_text, S3_BUCKET_NAME_OCR_RESULTS, s3_key, etag)
     except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
+        if is_missing_key_error(e):
             print(f"Error: The key {s3_key} does not exist in bucket {S3_BUCKET_NAME_OCR_RESULTS}.")
             return None
         else:
             raise
 
-def softmax(x):
-    max_x = max(x)
-    e_x = [math.exp(i - max_x) for i in x]
-    sum_e_x = sum(e_x)
-    return [i / sum_e_x for i in e_x]
-
-def calculate_questions_per_note(note_scores, total_questions):
-    if not note_scores:
-        raise ValueError("note_scores list is empty")
-
-    note_scores.sort(key=lambda x: x[1], reverse=True)
-    total_score = sum(score for _, score in note_scores)
-    
-    if total_score == 0:
-        questions_per_note = [(note_key, total_questions // len(note_scores)) for note_key, _ in note_scores]
-        remaining_questions = total_questions % len(note_scores)
-    else:
-        questions_per_note = []
-        remaining_questions = total_questions
-
-        for note_key, score in note_scores:
-            questions_for_note = int((score / total_score) * total_questions)
-            questions_per_note.append((note_key, questions_for_note))
-            remaining_questions -= questions_for_note
-
-    i = 0
-    while remaining_questions > 0:
-        note_key, current_questions = questions_per_note[i]
-        questions_per_note[i] = (note_key, current_questions + 1)
-        remaining_questions -= 1
-        i = (i + 1) % len(questions_per_note)
-
-    return questions_per_note
+def fetch_note_contents(note_keys: list, etags: dict = None) -> dict:
+    """
+    Downloads the processed text of every note in parallel. etags maps note keys to the ETags a HEAD returned,
+    which lets cached text be reused without another request.
+    Returns {note_key: content} in note_keys order, leaving out notes without an OCR result.
+    """
+    s3_keys = [f'processed/{note_key}' for note_key in note_keys]
+    note_etags = [(etags or {}).get(note_key) for note_key in note_keys]
+    outcomes = get_s3_objects_as_text(S3_BUCKET_NAME_OCR_RESULTS, s3_keys, etags=note_etags)
+
+    note_contents = {}
+    for note_key, s3_key, etag, (content, error) in zip(note_keys, s3_keys, note_etags, outcomes):
+        if is_missing_key_error(error):
+            print(f"Error: The key {s3_key} does not exist in bucket {S3_BUCKET_NAME_OCR_RESULTS}.")
+            continue
+        if error is not None:
+            # Fall back to the retrying single-object path for transient failures.
+            content = fetch_note_content(note_key, etag)
+        if content:
+            note_contents[note_key] = content
+    return note_contents
+
+def fetch_note_stats(note_key: str) -> dict:
+    # None means the note does not exist, {} that it predates the recorded statistics.
+    s3_key = f'processed/{note_key}'
+    try:
+        response = retry_call('s3', head_s3_object, S3_BUCKET_NAME_OCR_RESULTS, s3_key)
+    except ClientError as e:
+        if is_missing_key_error(e):
+            print(f"Error: The key {s3_key} does not exist in bucket {S3_BUCKET_NAME_OCR_RESULTS}.")
+            return None
+        else:
+            raise
+    return parse_note_stats(response.get('Metadata', {})) or {}
+
+def fetch_note_scores(note_keys: list):
+    """
+    Scores every note by word count using the statistics notesOcrJob stores in the metadata of processed/{key},
+    so sizing a note costs a HEAD request rather than a download. Notes processed before those statistics were
+    recorded are downloaded and counted instead.
+    Returns (note_scores, note_contents), where note_contents holds the text of the notes that had to be downloaded.
+    """
+    s3_keys = [f'processed/{note_key}' for note_key in note_keys]
+    outcomes = head_s3_objects(S3_BUCKET_NAME_OCR_RESULTS, s3_keys)
+
+    note_stats = {}
+    etags = {}
+    unscored_keys = []
+    for note_key, s3_key, (response, error) in zip(note_keys, s3_keys, outcomes):
+        if is_missing_key_error(error):
+            print(f"Error: The key {s3_key} does not exist in bucket {S3_BUCKET_NAME_OCR_RESULTS}.")
+            continue
+        if error is not None:
+            stats = fetch_note_stats(note_key)
+        else:
+            stats = parse_note_stats(response.get('Metadata', {})) or {}
+            etags[note_key] = response.get('ETag')
+        if stats is None:
+            continue
+        if stats:
+            note_stats[note_key] = stats
+        else:
+            unscored_keys.append(note_key)
+
+    note_contents = fetch_note_contents(unscored_keys, etags) if unscored_keys else {}
+    note_scores = []
+    for note_key in note_keys:
+        if note_key in note_stats and note_stats[note_key]['charCount'] > 0:
+            note_scores.append((note_key, note_stats[note_key]['wordCount']))
+        elif note_key in note_contents:
+            note_scores.append((note_key, score_page(note_contents[note_key])))
+    return note_scores, note_contents
 
+def generate_quiz_for_note(payload: dict) -> dict:
+    response = retry_call('lambda', invoke_lambda, 'quizGeneration', payload)
+    if 'body' not in response or 'questions' not in response['body']:
+        raise ValueError(f"Unexpected quizGeneration response: {response}")
+    return response
+
+def fits_inline(content: str) -> bool:
+    return content is not None and len(json.dumps(content)) <= MAX_INLINE_NOTE_BYTES
+
+def build_quiz_payloads(questions_per_note, topics, note_contents=None, progress_prefix=None):
+    """
+    Builds one quizGeneration payload per note that was allocated questions.
+    Note text already fetched by the orchestrator is forwarded in note_contents so the worker can skip the S3 read.
+    With a progress_prefix, allocation i streams its questions to {progress_prefix}{i:03d}.jsonl.
+    Returns (allocations, payloads), aligned with each other.
+    """
+    allocations = [(note_key, n) for note_key, n in questions_per_note if n > 0]
+    payloads = []
+    for index, (note_key, num_questions_for_note) in enumerate(allocations):
+        print(f"Note {note_key} is assigned {num_questions_for_note} questions.")
+        payload = {
+            'noteKeys': [note_key],
+            'numQuestions': num_questions_for_note,
+            'topics': topics
+        }
+        if progress_prefix is not None:
+            payload['progressKey'] = f'{progress_prefix}{index:03d}.jsonl'
+        content = (note_contents or {}).get(note_key)
+        if fits_inline(content):
+            payload['noteContents'] = [content]
+        payloads.append(payload)
+    return allocations, payloads
+
+def top_up_note(note_key: str, num_questions: int, topics: list, exclude: list, note_contents=None) -> list:
+    """
+    Asks quizGeneration for num_questions more questions from one note, none of them repeating exclude.
+    """
+    payload = {'noteKeys': [note_key], 'numQuestions': num_questions, 'topics': topics, 'excludeQuestions': exclude}
+    content = (note_contents or {}).get(note_key)
+    if fits_inline(content):
+        payload['noteContents'] = [content]
+    return generate_quiz_for_note(payload)['body']['questions']
+
+def generate_quizzes_concurrently(questions_per_note, topics, note_contents=None, progress_prefix=None,
+                                  max_concurrency=MAX_CONCURRENT_INVOCATIONS):
+    """
+    Fans the per-note quizGeneration invocations out over at most max_concurrency threads.
+    Returns (results, failures): results keeps the order of questions_per_note, failures lists the notes whose
+    invocation failed so the rest of the job can still be delivered.
+    """
+    allocations, payloads = build_quiz_payloads(questions_per_note, topics, note_contents, progress_prefix)
+    outcomes = map_concurrently(generate_quiz_for_note, payloads, max_concurrency)
+
+    results = []
+    failures = []
+    for (note_key, num_questions_for_note), (response, error) in zip(allocations, outcomes):
+        if error is not None:
+            print(f"Error: quiz generation for note {note_key} failed. Error: {str(error)}")
+            failures.append({'noteKey': note_key, 'numQuestions': num_questions_for_note, 'error': str(error)})
+        else:
+            results.append((note_key, num_questions_for_note, response))
+    return results, failures
+
+def enqueue_quiz_job(job_id: str, num_questions: int, questions_per_note, topics, note_contents=None,
+                     progress_prefix=None) -> int:
+    """
+    Records the job manifest, then sends one work item per allocation to QUIZ_WORK_QUEUE_URL.
+    Note text is only inlined when the work item still fits in an SQS message.
+    Returns the number of work items enqueued.
+    """
+    allocations, payloads = build_quiz_payloads(questions_per_note, topics, note_contents, progress_prefix)
+    manifest = {
+        'status': 'generating',
+        'jobUuid': job_id,
+        'numQuestions': num_questions,
+        'numParts': len(payloads),
+        'progressPrefix': progress_prefix,
+        'parts': [{'noteKey': note_key, 'numQuestions': n} for note_key, n in allocations]
+    }
+    write_json(S3_BUCKET_NAME_GENERATED_QUIZZES, job_manifest_key(job_id), manifest)
+
+    work_items = []
+    for index, payload in enumerate(payloads):
+        work_item = {'jobUuid': job_id, 'partIndex': index, 'payload': payload}
+        if 'noteContents' in payload and len(json.dumps(work_item).encode('utf-8')) > MAX_MESSAGE_BYTES:
+            work_item['payload'] = {key: value for key, value in payload.items() if key != 'noteContents'}
+        work_items.append(work_item)
+
+    if not work_items:
+        assemble_quiz(S3_BUCKET_NAME_GENERATED_QUIZZES, job_id)
+    for batch in split_batches(work_items):
+        retry_call('sqs', send_message_batch, QUIZ_WORK_QUEUE_URL, batch)
+    print(f"Enqueued {len(work_items)} quiz parts for job {job_id}.")
+    return len(work_items)
+
+@traced_handler('quizGenerationOrchestrator')
 def lambda_handler(event, context):
+    set_invocation_deadline(context)
+
     combined_quizzes = []
     total_requested_questions = 0
     total_actual_questions = 0
     total_llm_requested_questions = 0
+    failed_notes = []
+    enqueued_parts = 0
+    questions_removed = 0
 
     for record in event['Records']:
         print(record)
 
-        results = []
         message_body = json.loads(record['body'])
         note_keys = message_body['noteKeys']
         num_questions = int(message_body['numQuestions'])
@@ -77,33 +236,50 @@ def lambda_handler(event, context):
 
         total_requested_questions += num_questions
 
-        note_scores = []
-        for note_key in note_keys:
-            note_content = fetch_note_content(note_key)
-            if note_content:
-                score = score_page(note_content)
-                note_scores.append((note_key, score))
-
-        questions_per_note = calculate_questions_per_note(note_scores, num_questions)
-
-        for note_key, num_questions_for_note in questions_per_note:
-            if num_questions_for_note > 0:
-                print(f"Note {note_key} is assigned {num_questions_for_note} questions.")
-                payload = {
-                    'noteKeys': [note_key],
-                    'numQuestions': num_questions_for_note,
-                    'topics': topics
-                }
-                response = retry_operation(invoke_lambda, 'quizGeneration', payload)
-                results.append(response)
-                total_llm_requested_questions += num_questions_for_note
-                total_actual_questions += len(response['body']['questions'])
-
-        combined_quiz = {'questions': [q for result in results for q in result['body']['questions']]}
+        note_scores, note_contents = fetch_note_scores(note_keys)
+
+        questions_per_note = calculate_questions_per_note(
+            note_scores,
+            num_questions,
+            method=QUESTION_ALLOCATION_METHOD,
+            minimum=MIN_QUESTIONS_PER_NOTE,
+            maximum=MAX_QUESTIONS_PER_NOTE,
+            temperature=QUESTION_ALLOCATION_TEMPERATURE
+        )
+
+        num_parts = sum(1 for _, n in questions_per_note if n > 0)
+        progress_prefix = None
+        if STREAM_QUIZ_PROGRESS:
+            progress_prefix = f'quizzes/{job_id}/progress/'
+            write_progress_manifest(S3_BUCKET_NAME_GENERATED_QUIZZES, job_id, 'generating', num_questions,
+                                    progress_prefix, num_parts)
+
+        if QUIZ_WORK_QUEUE_URL:
+            enqueued_parts += enqueue_quiz_job(job_id, num_questions, questions_per_note, topics, note_contents,
+                                               progress_prefix)
+            continue
+
+        results, failures = generate_quizzes_concurrently(questions_per_note, topics, note_contents, progress_prefix)
+        if failures and not results:
+            raise RuntimeError(f"Quiz generation failed for every note of job {job_id}")
+        failed_notes.extend(dict(failure, jobUuid=job_id) for failure in failures)
+
+        # Near-duplicates across notes and chunks are dropped, and each note is asked once for the questions it lost.
+        parts = [(num_questions_for_note, response['body']['questions']) for _, num_questions_for_note, response in results]
+        combined_quiz, dedup_stats = refine_quiz(
+            parts,
+            lambda index, n, exclude: top_up_note(results[index][0], n, topics, exclude, note_contents)
+        )
         combined_quizzes.append(combined_quiz)
+        total_llm_requested_questions += sum(n for n, _ in parts) + dedup_stats['topUpRequestedQuestions']
+        total_actual_questions += len(combined_quiz['questions'])
+        questions_removed += dedup_stats['questionsRemoved']
 
         s3_key = f'quizzes/{job_id}.json'
-        retry_operation(put_s3_object, S3_BUCKET_NAME_GENERATED_QUIZZES, s3_key, json.dumps(combined_quiz))
+        retry_call('s3', put_s3_object, S3_BUCKET_NAME_GENERATED_QUIZZES, s3_key, json.dumps(combined_quiz))
+        if progress_prefix is not None:
+            write_progress_manifest(S3_BUCKET_NAME_GENERATED_QUIZZES, job_id, 'complete', num_questions,
+                                    progress_prefix, num_parts)
 
     return {
         'statusCode': 200,
@@ -111,5 +287,8 @@ def lambda_handler(event, context):
         'combinedQuizzes': combined_quizzes,
         'totalRequestedQuestions': total_requested_questions,
         'totalLLMRequestedQuestions': total_llm_requested_questions,
-        'totalActualQuestions': total_actual_questions
+        'totalActualQuestions': total_actual_questions,
+        'questionsRemoved': questions_removed,
+        'failedNotes': failed_notes,
+        'enqueuedParts': enqueued_parts
     }
\ No newline at end of file
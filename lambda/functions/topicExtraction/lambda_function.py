@@ -1,50 +1,79 @@
 import json
 import os
-from utils.groq_llm import GroqLLM
-from utils.openai_llm import OpenAILLM
+from utils.concurrency import map_concurrently
+from utils.llm_cache import with_response_cache
+from utils.llm_providers import DEFAULT_LLM_PROVIDER, get_llm_provider
 from utils.s3_utils import get_s3_object, put_s3_object
-from utils.llm_interface import LLMInterface
-from utils.retry import retry_operation
+from utils.retry import retry_call, set_invocation_deadline
+from utils.tracing import traced_handler
+from utils.topic_batching import extract_topics_batched
 
-DEFAULT_LLM_PROVIDER = 'groq'
 OUTPUT_BUCKET_NAME = 'spellbook-topic-extraction-results'
+MAX_CONCURRENT_RECORDS = int(os.environ.get('MAX_CONCURRENT_TOPIC_RECORDS', '8'))
+# Packs several OCR'd texts into each topic request; budgets are set in utils/topic_batching.
+TOPIC_BATCHING = os.environ.get('TOPIC_BATCHING', 'true').lower() == 'true'
 
-def get_llm_provider(provider_name: str) -> LLMInterface:
-    if provider_name == 'openai':
-        return OpenAILLM()
-    elif provider_name == 'groq':
-        return GroqLLM()
-    else:
-        raise ValueError(f"Unknown LLM provider: {provider_name}")
+def read_record(record: dict) -> str:
+    bucket_name = record['s3']['bucket']['name']
+    key = record['s3']['object']['key']
+    print(f"Processing S3 bucket: {bucket_name}, Key: {key}")
+    return retry_call('s3', get_s3_object, bucket_name, key).decode('utf-8')
+
+def save_topics(key: str, topics: list) -> None:
+    output_key = f'topics/{key}'
+    retry_call('s3', put_s3_object, OUTPUT_BUCKET_NAME, output_key, json.dumps(topics))
+    print(f"Extracted topics saved to S3 bucket: {OUTPUT_BUCKET_NAME}, Key: {output_key}")
 
+@traced_handler('topicExtraction')
 def lambda_handler(event, context):
+    set_invocation_deadline(context)
+
     if 'Records' not in event or not event['Records']:
         print("No records found in the event.")
         raise ValueError("No records found in the event")
 
-    processed_count = 0
     llm_provider_name = os.getenv('LLM_PROVIDER', DEFAULT_LLM_PROVIDER)
-    llm = get_llm_provider(llm_provider_name)
+    llm = with_response_cache(get_llm_provider(llm_provider_name))
 
-    for record in event['Records']:
-        bucket_name = record['s3']['bucket']['name']
-        key = record['s3']['object']['key']
-        print(f"Processing S3 bucket: {bucket_name}, Key: {key}")
+    # Read every OCR'd text in parallel
+    records = event['Records']
+    keys = [record['s3']['object']['key'] for record in records]
+    reads = map_concurrently(read_record, records, MAX_CONCURRENT_RECORDS)
+    failed_records = [{'key': key, 'error': str(error)} for key, (_, error) in zip(keys, reads) if error is not None]
+    pending = [(key, text) for key, (text, error) in zip(keys, reads) if error is None]
+    print(f"OCR'd text retrieved from S3 for {len(pending)} of {len(records)} records.")
 
-        ocr_text = retry_operation(get_s3_object, bucket_name, key).decode('utf-8')
-        print("OCR'd text retrieved from S3.")
+    # Extract topics, packing several texts into each request unless batching is turned off
+    texts = [text for _, text in pending]
+    if TOPIC_BATCHING:
+        outcomes = extract_topics_batched(llm, texts)
+    else:
+        outcomes = map_concurrently(lambda text: retry_call('llm', llm.extract_topics, text), texts, MAX_CONCURRENT_RECORDS)
 
-        topics = retry_operation(llm.extract_topics, ocr_text)
-        print(f"Extracted topics: {topics}")
+    extracted = []
+    for (key, _), (topics, error) in zip(pending, outcomes):
+        if error is None:
+            print(f"Extracted topics for {key}: {topics}")
+            extracted.append((key, topics))
+        else:
+            failed_records.append({'key': key, 'error': str(error)})
 
-        output_key = f'topics/{key}'
-        retry_operation(put_s3_object, OUTPUT_BUCKET_NAME, output_key, json.dumps(topics))
-        print(f"Extracted topics saved to S3 bucket: {OUTPUT_BUCKET_NAME}, Key: {output_key}")
+    writes = map_concurrently(lambda item: save_topics(*item), extracted, MAX_CONCURRENT_RECORDS)
+    processed_count = 0
+    for (key, _), (_, error) in zip(extracted, writes):
+        if error is None:
+            processed_count += 1
+        else:
+            failed_records.append({'key': key, 'error': str(error)})
 
-        processed_count += 1
+    for failure in failed_records:
+        print(f"Error: topic extraction for {failure['key']} failed. Error: {failure['error']}")
+    if not processed_count:
+        raise RuntimeError(f"Topic extraction failed for every record: {failed_records}")
 
     return {
         'statusCode': 200,
         'body': json.dumps('Topics extracted successfully and saved to S3'),
-        'processedCount': processed_count
+        'processedCount': processed_count,
+        'failedRecords': failed_records
     }
@@ -0,0 +1,8 @@
+import os
+import sys
+
+LAMBDA_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if LAMBDA_ROOT not in sys.path:
+    sys.path.insert(0, LAMBDA_ROOT)
+# boto3 clients are created at import time and need a region even though no request leaves the process.
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
@@ -0,0 +1,283 @@
+"""
+In-process stand-ins for AWS, Document AI and the LLM providers, shared by the tests and the offline benchmarks.
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from types import SimpleNamespace
+from utils.llm_interface import LLMInterface
+from utils.tracing import record_llm_usage
+
+LAMBDA_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_lambda_function(function_name: str):
+    """
+    Imports functions/<function_name>/lambda_function.py under a unique module name so several handlers can be
+    loaded side by side.
+    """
+    path = os.path.join(LAMBDA_ROOT, 'functions', function_name, 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location(f'{function_name}_lambda_function', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def aws_error(code: str, status_code: int, operation: str):
+    from botocore.exceptions import ClientError
+    return ClientError({'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status_code}}, operation)
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+class FaultInjector:
+    """
+    Base for the fakes below: inject() waits latency seconds and raises make_error() with probability error_rate.
+    Failures are drawn from a generator seeded with seed, so a run is repeatable.
+    """
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.injected_errors = 0
+        self._rng = random.Random(seed)
+        self._fault_lock = threading.Lock()
+
+    def inject(self, make_error, latency: float = None) -> None:
+        with self._fault_lock:
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self.injected_errors += 1
+        time.sleep(self.latency if latency is None else latency)
+        if fail:
+            raise make_error()
+
+class FakeLambdaClient(FaultInjector):
+    """
+    Stands in for boto3's Lambda client. Each invoke sleeps for latency seconds and returns handler(payload), or
+    is throttled with probability error_rate.
+    """
+    def __init__(self, handler, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(latency, error_rate, seed)
+        self.handler = handler
+        self.invocations = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        with self._lock:
+            self.invocations += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            self.inject(lambda: aws_error('TooManyRequestsException', 429, 'Invoke'))
+            result = self.handler(json.loads(Payload))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return {'StatusCode': 200, 'Payload': io.BytesIO(json.dumps(result).encode('utf-8'))}
+
+def etag_of(stored: dict) -> str:
+    # S3's ETag for a single-part upload is the quoted MD5 of the body.
+    return f'"{hashlib.md5(stored["Body"]).hexdigest()}"'
+
+class FakeS3Client(FaultInjector):
+    """
+    In-memory stand-in for boto3's S3 client that counts requests per operation. Each request waits latency
+    seconds and fails with SlowDown with probability error_rate.
+    """
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(latency, error_rate, seed)
+        self.objects = {}
+        self.calls = {'get_object': 0, 'put_object': 0, 'head_object': 0, 'copy_object': 0, 'list_objects_v2': 0}
+        self.bytes_downloaded = 0
+        self._lock = threading.Lock()
+
+    def _record(self, operation):
+        with self._lock:
+            self.calls[operation] += 1
+        self.inject(lambda: aws_error('SlowDown', 503, operation))
+
+    def _lookup(self, Bucket, Key, operation):
+        if (Bucket, Key) not in self.objects:
+            from botocore.exceptions import ClientError
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': Key}}, operation)
+        return self.objects[(Bucket, Key)]
+
+    def put_object(self, Bucket, Key, Body, ContentType='binary/octet-stream', Metadata=None, IfNoneMatch=None):
+        self._record('put_object')
+        if isinstance(Body, str):
+            Body = Body.encode('utf-8')
+        stored = {'Body': Body, 'ContentType': ContentType, 'Metadata': Metadata or {}}
+        with self._lock:
+            if IfNoneMatch == '*' and (Bucket, Key) in self.objects:
+                raise aws_error('PreconditionFailed', 412, 'PutObject')
+            self.objects[(Bucket, Key)] = stored
+        return {'ETag': etag_of(stored)}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        self._record('get_object')
+        stored = self._lookup(Bucket, Key, 'GetObject')
+        if IfNoneMatch is not None and IfNoneMatch == etag_of(stored):
+            raise aws_error('304', 304, 'GetObject')
+        with self._lock:
+            self.bytes_downloaded += len(stored['Body'])
+        return {
+            'Body': io.BytesIO(stored['Body']),
+            'ContentType': stored['ContentType'],
+            'ContentLength': len(stored['Body']),
+            'Metadata': stored['Metadata'],
+            'ETag': etag_of(stored)
+        }
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective='COPY'):
+        self._record('copy_object')
+        stored = self._lookup(CopySource['Bucket'], CopySource['Key'], 'CopyObject')
+        self.objects[(Bucket, Key)] = dict(stored)
+        return {}
+
+    def head_object(self, Bucket, Key):
+        self._record('head_object')
+        stored = self._lookup(Bucket, Key, 'HeadObject')
+        return {'ContentType': stored['ContentType'], 'ContentLength': len(stored['Body']), 'Metadata': stored['Metadata'],
+                'ETag': etag_of(stored)}
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None, MaxKeys=1000):
+        self._record('list_objects_v2')
+        with self._lock:
+            keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        response = {'Contents': [{'Key': key} for key in page], 'KeyCount': len(page), 'IsTruncated': start + MaxKeys < len(keys)}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = str(start + MaxKeys)
+        return response
+
+class FakeSQSClient:
+    """
+    In-process stand-in for boto3's SQS client. Sent messages wait until drain() delivers them to a handler as SQS
+    event batches; messages the handler lists in batchItemFailures are redelivered with a higher
+    ApproximateReceiveCount.
+    """
+    def __init__(self):
+        self.messages = deque()
+        self.sent = 0
+        self.deliveries = 0
+        self._lock = threading.Lock()
+
+    def send_message_batch(self, QueueUrl, Entries):
+        with self._lock:
+            for entry in Entries:
+                self.sent += 1
+                self.messages.append({
+                    'messageId': str(self.sent),
+                    'body': entry['MessageBody'],
+                    'attributes': {'ApproximateReceiveCount': '0'}
+                })
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+    def drain(self, handler, batch_size: int = 10, max_workers: int = 10) -> None:
+        """
+        Delivers messages until the queue is empty, running up to max_workers handler invocations at a time the way
+        concurrent Lambda pollers would.
+        """
+        from utils.concurrency import map_concurrently
+
+        def deliver(batch):
+            for message in batch:
+                message['attributes']['ApproximateReceiveCount'] = str(int(message['attributes']['ApproximateReceiveCount']) + 1)
+            response = handler({'Records': batch}, None) or {}
+            failed = {failure['itemIdentifier'] for failure in response.get('batchItemFailures', [])}
+            return [message for message in batch if message['messageId'] in failed]
+
+        while self.messages:
+            with self._lock:
+                pending = list(self.messages)
+                self.messages.clear()
+            batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            self.deliveries += len(pending)
+            for redeliver, error in map_concurrently(deliver, batches, max_workers):
+                if error is not None:
+                    raise error
+                self.messages.extend(redeliver)
+
+class FakeDocumentAIClient(FaultInjector):
+    """
+    Stands in for DocumentProcessorServiceClient. process_document answers with words_per_page words derived from
+    the uploaded bytes after latency seconds, or fails with ServiceUnavailable with probability error_rate.
+    """
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0, words_per_page: int = 400):
+        super().__init__(latency, error_rate, seed)
+        self.words_per_page = words_per_page
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def processor_path(project: str, location: str, processor: str) -> str:
+        return f'projects/{project}/locations/{location}/processors/{processor}'
+
+    def process_document(self, request, timeout: float = None):
+        with self._lock:
+            self.calls += 1
+        self.inject(lambda: type('ServiceUnavailable', (Exception,), {'code': 503})('Document AI is unavailable'))
+        seed = zlib.crc32(request.raw_document.content)
+        text = ' '.join(f'word{(seed + i * 7919) % 997}' for i in range(self.words_per_page))
+        return SimpleNamespace(document=SimpleNamespace(text=text, pages=[None]))
+
+class FakeLLM(LLMInterface, FaultInjector):
+    """
+    LLMInterface stand-in that answers with numbered questions after latency seconds plus latency_per_1k_tokens
+    for every thousand prompt tokens, mimicking a model whose response time grows with the prompt. Requests are
+    rate limited with probability error_rate.
+    """
+    PROVIDER = 'fake'
+    MODEL = 'fake-8k'
+
+    def __init__(self, latency: float = 0.0, latency_per_1k_tokens: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0):
+        FaultInjector.__init__(self, latency, error_rate, seed)
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, text: str, completion_tokens: int = 0):
+        with self._lock:
+            self.calls += 1
+        self.inject(lambda: FakeRateLimitError('Rate limit reached'),
+                    latency=self.latency + self.latency_per_1k_tokens * len(text) / 4000)
+        record_llm_usage(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=len(text) // 4,
+                                                               completion_tokens=completion_tokens)))
+
+    def generate_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None) -> dict:
+        text = ' '.join(notes)
+        self._respond(text, completion_tokens=40 * num_questions)
+        start = len(exclude or [])
+        questions = [
+            {'question': f'Question {i + 1} about passage {zlib.crc32(text.encode())}', 'answers': ['a', 'b', 'c', 'd'], 'correctAnswerIndex': 0}
+            for i in range(start, start + num_questions)
+        ]
+        return {'questions': questions}
+
+    def extract_topics(self, text: str) -> list:
+        self._respond(text, completion_tokens=20)
+        return sorted(set(text.split()))[:5]
+
+    def extract_topics_batch(self, texts: list) -> list:
+        self._respond(' '.join(texts), completion_tokens=30 * len(texts))
+        return [sorted(set(text.split()))[:5] for text in texts]
+
+def fake_quiz_response(payload: dict) -> dict:
+    questions = [
+        {
+            'question': f"{payload['noteKeys'][0]} question {i + 1}",
+            'answers': ['a', 'b', 'c', 'd'],
+            'correctAnswerIndex': 0
+        }
+        for i in range(payload['numQuestions'])
+    ]
+    return {'statusCode': 200, 'body': {'questions': questions}}
@@ -0,0 +1,83 @@
+import random
+import pytest
+from utils.allocation import HAMILTON, SAINTE_LAGUE, allocation_weights, calculate_questions_per_note
+
+METHODS = [HAMILTON, SAINTE_LAGUE]
+
+def random_case(rng: random.Random) -> dict:
+    """
+    Draws note scores shaped like real word counts (long-tailed, some empty notes, some exact ties) and caps,
+    including caps that cannot all be met.
+    """
+    count = rng.randint(1, 80)
+    if rng.random() < 0.2:
+        scores = [rng.choice([0, 10, 20, 30]) for _ in range(count)]
+    else:
+        scores = [int(rng.lognormvariate(7, 1.5)) if rng.random() > 0.05 else 0 for _ in range(count)]
+    return {
+        'note_scores': [(f'note-{i}', score) for i, score in enumerate(scores)],
+        'total_questions': rng.randint(0, 300),
+        'minimum': rng.choice([0, 0, 1, 2, 5, 50]),
+        'maximum': rng.choice([None, None, 1, 3, 10, 50]),
+        'temperature': rng.choice([None, 0.5, 1.0, 3.0])
+    }
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('seed', range(300))
+def test_sum_and_cap_invariants(method, seed):
+    case = random_case(random.Random(seed))
+    allocation = calculate_questions_per_note(method=method, **case)
+    counts = [n for _, n in allocation]
+    count = len(case['note_scores'])
+    total = case['total_questions']
+
+    assert sum(counts) == total
+    assert sorted(key for key, _ in allocation) == sorted(key for key, _ in case['note_scores'])
+    assert all(n >= 0 for n in counts)
+    if case['minimum'] * count <= total:
+        assert min(counts) >= case['minimum']
+    else:
+        assert min(counts) >= total // count
+    if case['maximum'] is not None:
+        assert max(counts) <= max(case['maximum'], -(-total // count))
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('seed', range(100))
+def test_higher_scores_never_get_fewer_questions(method, seed):
+    case = random_case(random.Random(seed))
+    allocation = calculate_questions_per_note(method=method, **case)
+    scores = dict(case['note_scores'])
+    ordered = [scores[key] for key, _ in allocation]
+    counts = [n for _, n in allocation]
+    assert ordered == sorted(ordered, reverse=True)
+    assert counts == sorted(counts, reverse=True)
+
+@pytest.mark.parametrize('seed', range(100))
+def test_hamilton_stays_within_one_of_the_exact_quota(seed):
+    rng = random.Random(seed)
+    case = dict(random_case(rng), minimum=0, maximum=None)
+    allocation = calculate_questions_per_note(method=HAMILTON, **case)
+    scores = dict(case['note_scores'])
+    weights = allocation_weights([scores[key] for key, _ in allocation], case['temperature'])
+    for (_, n), weight in zip(allocation, weights):
+        assert abs(n - weight * case['total_questions']) < 1
+
+def test_all_zero_scores_are_split_evenly():
+    allocation = calculate_questions_per_note([('a', 0), ('b', 0), ('c', 0)], 7)
+    assert sorted(n for _, n in allocation) == [2, 2, 3]
+
+def test_temperature_evens_out_the_split():
+    note_scores = [('long', 10000), ('short', 100)]
+    proportional = dict(calculate_questions_per_note(note_scores, 20))
+    tempered = dict(calculate_questions_per_note(note_scores, 20, temperature=3.0))
+    assert proportional['short'] == 0
+    assert tempered['short'] > 0
+
+@pytest.mark.parametrize('arguments', [([], 5), ([('a', 1)], -1)])
+def test_rejects_invalid_input(arguments):
+    with pytest.raises(ValueError):
+        calculate_questions_per_note(*arguments)
+
+def test_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        calculate_questions_per_note([('a', 1)], 5, method='dhondt')
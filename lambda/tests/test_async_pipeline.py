@@ -0,0 +1,85 @@
+import json
+import pytest
+import utils.s3_utils as s3_utils
+import utils.sqs_utils as sqs_utils
+from tests.fakes import FakeLLM, FakeS3Client, FakeSQSClient, load_lambda_function
+from utils.quiz_jobs import job_manifest_key, quiz_key
+
+OCR_BUCKET = 'spellbook-imagestore-ocr-results'
+QUIZ_BUCKET = 'spellbook-generated-quizzes'
+JOB_ID = 'job'
+NOTES = {'note-0': 'broken', 'note-1': 'flaky', 'note-2': 'steady', 'note-3': 'steady'}
+
+class ScriptedLLM(FakeLLM):
+    """
+    Fails every request for a note whose text starts with "broken", and only the first for one starting "flaky".
+    """
+    def __init__(self):
+        super().__init__()
+        self.failed_once = set()
+
+    def generate_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None) -> dict:
+        text = ' '.join(notes)
+        if text.startswith('broken') or (text.startswith('flaky') and text not in self.failed_once):
+            self.failed_once.add(text)
+            raise ValueError("Model returned invalid JSON")
+        return super().generate_quiz(notes, num_questions, topics, exclude)
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setenv('LLM_CACHE_BACKEND', 'none')
+    s3 = FakeS3Client()
+    monkeypatch.setattr(s3_utils, 's3_client', s3)
+    monkeypatch.setattr(s3_utils, 'note_cache', s3_utils.LruTextCache(s3_utils.NOTE_CACHE_MAX_BYTES))
+    for note_key, kind in NOTES.items():
+        s3.put_object(Bucket=OCR_BUCKET, Key=f'processed/{note_key}', Body=f'{kind} ' + ' '.join([note_key] * 300))
+    sqs = FakeSQSClient()
+    monkeypatch.setattr(sqs_utils, 'get_sqs_client', lambda: sqs)
+
+    orchestrator = load_lambda_function('quizGenerationOrchestrator')
+    monkeypatch.setattr(orchestrator, 'QUIZ_WORK_QUEUE_URL', 'local-queue')
+    worker = load_lambda_function('quizGeneration')
+    llm = ScriptedLLM()
+    monkeypatch.setattr(worker, 'get_llm_provider', lambda provider_name: llm)
+    return orchestrator, worker, s3, sqs
+
+def stored(s3: FakeS3Client, key: str):
+    return json.loads(s3.objects[(QUIZ_BUCKET, key)]['Body'])
+
+def test_queued_job_is_assembled_with_retries_and_failed_parts(pipeline):
+    orchestrator, worker, s3, sqs = pipeline
+    event = {'Records': [{'body': json.dumps({
+        'noteKeys': list(NOTES), 'numQuestions': 12, 'jobUuid': JOB_ID, 'topics': []
+    })}]}
+    orchestrator.lambda_handler(event, None)
+    assert sqs.sent == 4
+    assert (QUIZ_BUCKET, quiz_key(JOB_ID)) not in s3.objects
+
+    sqs.drain(worker.lambda_handler, batch_size=1, max_workers=4)
+    # The broken part is delivered until its last attempt, the flaky one once more.
+    assert sqs.deliveries == 4 + (worker.QUIZ_PART_MAX_ATTEMPTS - 1) + 1
+
+    quiz = stored(s3, quiz_key(JOB_ID))
+    manifest = stored(s3, job_manifest_key(JOB_ID))
+    assert manifest['status'] == 'complete'
+    assert [note['noteKey'] for note in manifest['failedNotes']] == ['note-0']
+    assert manifest['totalActualQuestions'] == len(quiz['questions']) == 9
+    assert manifest['totalLLMRequestedQuestions'] == 9
+
+def test_a_late_duplicate_delivery_leaves_the_assembled_job_alone(pipeline):
+    orchestrator, worker, s3, sqs = pipeline
+    event = {'Records': [{'body': json.dumps({
+        'noteKeys': list(NOTES)[2:], 'numQuestions': 6, 'jobUuid': JOB_ID, 'topics': []
+    })}]}
+    orchestrator.lambda_handler(event, None)
+    first_item = sqs.messages[0]['body']
+    sqs.drain(worker.lambda_handler, batch_size=1, max_workers=2)
+    quiz = stored(s3, quiz_key(JOB_ID))
+    manifest = stored(s3, job_manifest_key(JOB_ID))
+
+    # SQS delivers at least once: the same work item can arrive again after the job was assembled.
+    sqs.send_message_batch(QueueUrl='local-queue', Entries=[{'Id': '0', 'MessageBody': first_item}])
+    sqs.drain(worker.lambda_handler)
+    assert stored(s3, quiz_key(JOB_ID)) == quiz
+    assert stored(s3, job_manifest_key(JOB_ID)) == manifest
+    assert manifest['totalActualQuestions'] == len(quiz['questions']) == 6
@@ -0,0 +1,36 @@
+import pytest
+from utils.chunking import generate_with_top_up
+from utils.llm_parsing import IncompleteQuizError, LLMResponseError
+
+def question(text: str) -> dict:
+    return {'question': text, 'answers': ['a', 'b'], 'correctAnswerIndex': 0}
+
+def test_top_up_excludes_the_kept_questions():
+    calls = []
+
+    def generate(num_questions, exclude):
+        calls.append((num_questions, exclude))
+        if len(calls) == 1:
+            raise IncompleteQuizError({'questions': [question('q1'), question('q2')]}, 1, 'truncated')
+        return {'questions': [question('q3')]}
+
+    quiz = generate_with_top_up(generate, 3, ['q0'])
+    assert [q['question'] for q in quiz['questions']] == ['q1', 'q2', 'q3']
+    assert calls == [(3, ['q0']), (1, ['q0', 'q1', 'q2'])]
+
+def test_a_complete_response_is_not_topped_up():
+    calls = []
+
+    def generate(num_questions, exclude):
+        calls.append(num_questions)
+        return {'questions': [question('q1')]}
+
+    assert generate_with_top_up(generate, 3)['questions'] == [question('q1')]
+    assert calls == [3]
+
+def test_raises_when_neither_call_has_a_valid_question():
+    def generate(num_questions, exclude):
+        raise IncompleteQuizError({'questions': []}, num_questions, 'truncated')
+
+    with pytest.raises(LLMResponseError):
+        generate_with_top_up(generate, 2)
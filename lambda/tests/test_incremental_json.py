@@ -0,0 +1,36 @@
+import json
+import random
+import pytest
+from utils.incremental_json import ArrayItemStreamParser
+
+QUESTIONS = [
+    {'question': 'Which bracket closes an object: "}" or "]"?', 'answers': ['}', ']', '{', '['], 'correctAnswerIndex': 0},
+    {'question': 'Escapes: \\" and \\\\ inside a string', 'answers': ['a "quoted" b', 'back\\slash'], 'correctAnswerIndex': 1},
+    {'question': 'Nested {"objects": [1, {"deep": true}]}', 'answers': ['x', 'y'], 'correctAnswerIndex': 0,
+     'meta': {'tags': ['a', {'b': '}'}]}},
+    {'question': 'Unicode: café, 東京, emoji 🙂', 'answers': ['é', '京'], 'correctAnswerIndex': 1},
+]
+
+def random_split(text: str, rng: random.Random) -> list:
+    cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, min(40, len(text) - 1))))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+@pytest.mark.parametrize('seed', range(200))
+def test_random_splits_yield_every_item_once_in_order(seed):
+    rng = random.Random(seed)
+    questions = rng.sample(QUESTIONS, rng.randint(1, len(QUESTIONS)))
+    document = 'Here is the quiz: ' + json.dumps({'title': 'questions: [', 'questions': questions, 'extra': [{}]},
+                                                 indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5)
+    parser = ArrayItemStreamParser('questions')
+    items = []
+    for chunk in random_split(document, rng):
+        items.extend(parser.feed(chunk))
+    assert items == questions
+    assert parser.done
+
+def test_truncated_document_keeps_the_completed_items():
+    document = json.dumps({'questions': QUESTIONS})
+    cut = document.index(json.dumps(QUESTIONS[-1])) + 10
+    parser = ArrayItemStreamParser('questions')
+    assert parser.feed(document[:cut]) == QUESTIONS[:-1]
+    assert not parser.done
@@ -0,0 +1,96 @@
+import os
+import pytest
+from tests.fakes import FakeLLM
+from utils.llm_cache import CacheBackend, CachingLLM, DiskCacheBackend, MemoryCacheBackend
+from utils.prompts import TOPIC_BATCH_PROMPT, TOPICS_PROMPT
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_backends_must_implement_load_and_store():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+def test_memory_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = MemoryCacheBackend(ttl_seconds=60, clock=clock)
+    cache.set('key', {'questions': []})
+    clock.now += 60
+    assert cache.get('key') == {'questions': []}
+    clock.now += 1
+    assert cache.get('key') is None
+
+def test_memory_evicts_the_least_recently_used_entry():
+    cache = MemoryCacheBackend(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+def test_cached_values_cannot_be_mutated_through_a_hit():
+    cache = MemoryCacheBackend()
+    cache.set('key', {'questions': ['q']})
+    cache.get('key')['questions'].append('changed')
+    assert cache.get('key') == {'questions': ['q']}
+
+def test_counts_hits_and_misses():
+    cache = MemoryCacheBackend()
+    cache.get('key')
+    cache.set('key', 'value')
+    cache.get('key')
+    cache.get('key')
+    assert cache.stats() == {'hits': 2, 'misses': 1}
+
+def test_disk_entries_expire_after_the_ttl(tmp_path):
+    clock = FakeClock()
+    cache = DiskCacheBackend(directory=str(tmp_path), ttl_seconds=60, clock=clock)
+    cache.set('key', ['topic'])
+    assert cache.get('key') == ['topic']
+    clock.now += 61
+    assert cache.get('key') is None
+    assert not os.path.exists(tmp_path / 'key.json'), "expired files are removed"
+    assert cache.stats() == {'hits': 1, 'misses': 1}
+
+def test_disk_evicts_the_least_recently_used_files_past_max_bytes(tmp_path):
+    value = 'x' * 100
+    entry_bytes = len(f'{{"storedAt": 1000.0, "value": "{value}"}}')
+    cache = DiskCacheBackend(directory=str(tmp_path), max_bytes=2 * entry_bytes, clock=FakeClock())
+    cache.set('a', value)
+    cache.set('b', value)
+    os.utime(tmp_path / 'a.json', (1000, 1000))
+    os.utime(tmp_path / 'b.json', (2000, 2000))
+    # Reading a marks it as recently used, so b is the one evicted.
+    assert cache.get('a') == value
+    cache.set('c', value)
+    assert sorted(os.listdir(tmp_path)) == ['a.json', 'c.json']
+
+def test_disk_entry_evicted_during_a_read_is_a_miss(tmp_path, monkeypatch):
+    cache = DiskCacheBackend(directory=str(tmp_path))
+    cache.set('key', 'value')
+
+    def evicted(path, *args):
+        os.remove(path)
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(os, 'utime', evicted)
+    assert cache.get('key') is None
+    assert cache.stats() == {'hits': 0, 'misses': 1}
+
+@pytest.mark.parametrize('prompt', [TOPICS_PROMPT, TOPIC_BATCH_PROMPT])
+def test_changing_either_topic_prompt_retires_batched_entries(prompt, monkeypatch):
+    llm = FakeLLM()
+    cached = CachingLLM(llm, MemoryCacheBackend())
+    texts = ['first document', 'second document']
+    cached.extract_topics_batch(texts)
+    # Batched entries also serve single-document requests while both prompts are unchanged.
+    cached.extract_topics(texts[0])
+    assert llm.calls == 1
+
+    monkeypatch.setattr(prompt, 'id', f'{prompt.name}/v{prompt.version + 1}')
+    cached.extract_topics_batch(texts)
+    assert llm.calls == 2
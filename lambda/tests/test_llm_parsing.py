@@ -0,0 +1,135 @@
+import json
+import pytest
+from utils.llm_parsing import (IncompleteQuizError, LLMResponseError, coerce_answer_index, load_json_object, parse_quiz,
+                               parse_quiz_stream, parse_topics, validate_question)
+
+ANSWERS = ['Paris', 'Lyon', 'Nice', 'Lille']
+
+def question(i: int, index=0) -> dict:
+    return {'question': f'Question {i}?', 'answers': list(ANSWERS), 'correctAnswerIndex': index}
+
+def quiz_json(questions: list) -> str:
+    return json.dumps({'questions': questions})
+
+def truncated(questions: list) -> str:
+    """
+    The response cut off halfway through its last question.
+    """
+    content = quiz_json(questions)
+    return content[:len(content) - len(json.dumps(questions[-1])) // 2]
+
+@pytest.mark.parametrize('content', [
+    '{"topics": ["a"]}',
+    '```json\n{"topics": ["a"]}\n```',
+    '```\n{"topics": ["a"]}```',
+    'Here are the topics:\n{"topics": ["a"]}\nLet me know if you need more!',
+    '{"topics": ["a"]} {"topics": ["b"]}',
+])
+def test_load_json_object_ignores_fences_and_surrounding_text(content):
+    assert load_json_object(content) == {'topics': ['a']}
+
+@pytest.mark.parametrize('content', ['', None, 'no JSON here', '["a", "b"]', '{"topics": [', '```json\n```'])
+def test_load_json_object_rejects_responses_without_an_object(content):
+    with pytest.raises(LLMResponseError):
+        load_json_object(content)
+
+@pytest.mark.parametrize('value, expected', [
+    (2, 2),
+    (2.0, 2),
+    ('2', 2),
+    (' 3 ', 3),
+    ('B', 1),
+    ('(c)', 2),
+    ('d.', 3),
+    ('A)', 0),
+    ('lyon', 1),
+    ('Nice', 2),
+    (True, None),
+    (False, None),
+    (4, None),
+    (-1, None),
+    ('-1', None),
+    ('7', None),
+    (2.5, None),
+    ('e', None),
+    ('Marseille', None),
+    (None, None),
+    ([1], None),
+])
+def test_coerce_answer_index(value, expected):
+    assert coerce_answer_index(value, ANSWERS) == expected
+
+def test_coerce_answer_index_needs_an_unambiguous_answer_text():
+    assert coerce_answer_index('paris', ['Paris', 'paris', 'Nice']) is None
+
+@pytest.mark.parametrize('item, expected', [
+    ({'question': ' Capital? ', 'answers': [' Paris ', 'Lyon'], 'correctAnswerIndex': '0', 'explanation': 'x'},
+     {'question': 'Capital?', 'answers': ['Paris', 'Lyon'], 'correctAnswerIndex': 0, 'explanation': 'x'}),
+    ({'question': 'Sum?', 'answers': [1, 2.5, True], 'correctAnswerIndex': 1},
+     {'question': 'Sum?', 'answers': ['1', '2.5'], 'correctAnswerIndex': 1}),
+    ({'question': 'Capital?', 'answers': ['Paris'], 'correctAnswerIndex': 0}, None),
+    ({'question': 'Capital?', 'answers': ['Paris', ' '], 'correctAnswerIndex': 0}, None),
+    ({'question': '', 'answers': ANSWERS, 'correctAnswerIndex': 0}, None),
+    ({'question': 'Capital?', 'answers': 'Paris, Lyon', 'correctAnswerIndex': 0}, None),
+    ({'question': 'Capital?', 'answers': ANSWERS, 'correctAnswerIndex': 7}, None),
+    ({'question': 'Capital?', 'answers': ANSWERS}, None),
+    ('Capital?', None),
+])
+def test_validate_question(item, expected):
+    assert validate_question(item) == expected
+
+@pytest.mark.parametrize('content, num_questions, expected', [
+    (quiz_json([question(1), question(2)]), 2, [question(1), question(2)]),
+    ('Here is your quiz:\n' + quiz_json([question(1), question(2)]) + '\nEnjoy!', 2, [question(1), question(2)]),
+    ('```json\n' + quiz_json([question(1)]) + '\n```', 1, [question(1)]),
+    (quiz_json([question(1, '1'), question(2, 'C')]), 2, [question(1, 1), question(2, 2)]),
+    # A clean response with fewer questions is accepted: the prompt allows it when the notes miss the topics.
+    (quiz_json([question(1)]), 3, [question(1)]),
+    # Repairs that still leave enough questions are not an error.
+    (truncated([question(1), question(2), question(3)]), 2, [question(1), question(2)]),
+    (quiz_json([question(1), question(2, 9), question(3)]), 2, [question(1), question(3)]),
+])
+def test_parse_quiz_repairs_damaged_responses(content, num_questions, expected):
+    assert parse_quiz(content, num_questions) == {'questions': expected}
+
+@pytest.mark.parametrize('content, num_questions, kept, missing', [
+    (truncated([question(1), question(2), question(3)]), 3, [question(1), question(2)], 1),
+    (quiz_json([question(1), question(2, 9), 'oops']), 3, [question(1)], 2),
+    ('Sorry, I cannot help with that.', 4, [], 4),
+    ('{"quiz": []}', 2, [], 2),
+])
+def test_parse_quiz_reports_what_repairs_lost(content, num_questions, kept, missing):
+    with pytest.raises(IncompleteQuizError) as raised:
+        parse_quiz(content, num_questions)
+    assert raised.value.quiz == {'questions': kept}
+    assert raised.value.missing == missing
+
+def chunks(content: str, size: int = 7) -> list:
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+def test_parse_quiz_stream_yields_valid_questions():
+    content = 'Sure!\n' + quiz_json([question(1), question(2, 'b'), question(3, 9)])
+    assert list(parse_quiz_stream(chunks(content), 2)) == [question(1), question(2, 1)]
+
+def test_parse_quiz_stream_reports_a_cut_off_stream_after_yielding():
+    stream = parse_quiz_stream(chunks(truncated([question(1), question(2), question(3)])), 3)
+    assert next(stream) == question(1)
+    assert next(stream) == question(2)
+    with pytest.raises(IncompleteQuizError) as raised:
+        next(stream)
+    assert raised.value.missing == 1
+    assert raised.value.quiz == {'questions': []}
+
+@pytest.mark.parametrize('content, expected', [
+    ('{"topics": ["Cells", "cells", " ", 3, " DNA "]}', ['Cells', 'DNA']),
+    ('```json\n{"topics": ["a", "b", "c", "d", "e", "f"]}\n```', ['a', 'b', 'c', 'd', 'e']),
+    ('Topics: {"topics": []}', []),
+    ('{}', []),
+])
+def test_parse_topics(content, expected):
+    assert parse_topics(content) == expected
+
+@pytest.mark.parametrize('content', ['{"topics": "cells"}', 'no topics', '["cells"]'])
+def test_parse_topics_rejects_unusable_responses(content):
+    with pytest.raises(LLMResponseError):
+        parse_topics(content)
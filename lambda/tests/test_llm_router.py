@@ -0,0 +1,151 @@
+import threading
+import time
+import pytest
+import utils.llm_router as llm_router
+from utils.llm_interface import LLMInterface
+from utils.llm_router import LLMRouter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> float:
+        with self._lock:
+            return self.now
+
+    def advance(self, seconds: float) -> None:
+        with self._lock:
+            self.now += seconds
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__('Rate limit reached')
+        self.headers = {'retry-after': str(retry_after)}
+
+class ScriptedBackend(LLMInterface):
+    """
+    Backend whose calls take latency seconds, spent through wait (a fake clock's advance or time.sleep), and
+    raise fail(request) when that returns an error. The request number is passed as the only note.
+    """
+    def __init__(self, provider: str, latency, wait, fail=lambda request: None):
+        self.PROVIDER = provider
+        self.MODEL = 'fake-8k'
+        self.latency = latency
+        self.wait = wait
+        self.fail = fail
+        self.calls = []
+        self.errors = 0
+
+    def generate_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None) -> dict:
+        request = notes[0]
+        self.calls.append(request)
+        self.wait(self.latency(request) if callable(self.latency) else self.latency)
+        error = self.fail(request)
+        if error is not None:
+            self.errors += 1
+            raise error
+        return {'questions': [], 'provider': self.PROVIDER}
+
+def ask(router: LLMRouter, request: int) -> str:
+    return router.generate_quiz([request], 5, [])['provider']
+
+def test_routes_to_the_backend_with_the_lowest_p50():
+    clock = FakeClock()
+    slow = ScriptedBackend('slow', 2.0, clock.advance)
+    fast = ScriptedBackend('fast', 1.0, clock.advance)
+    router = LLMRouter([slow, fast], hedge=False, clock=clock)
+    providers = [ask(router, i) for i in range(20)]
+    # Both are tried once while they have no samples; from then on the faster one wins every time.
+    assert providers[:2] == ['slow', 'fast']
+    assert set(providers[2:]) == {'fast'}
+
+def test_fails_over_on_429_and_benches_until_retry_after():
+    clock = FakeClock()
+    limited = ScriptedBackend('limited', 0.01, clock.advance, fail=lambda request: RateLimitError(5))
+    backup = ScriptedBackend('backup', 0.05, clock.advance)
+    router = LLMRouter([limited, backup], hedge=False, clock=clock)
+
+    assert ask(router, 0) == 'backup'
+    for i in range(1, 10):
+        assert ask(router, i) == 'backup'
+    assert limited.calls == [0], "a benched backend is not called"
+    clock.advance(5)
+    ask(router, 10)
+    assert limited.calls == [0, 10], "after Retry-After the backend is tried again"
+
+def test_fatal_errors_are_not_failed_over():
+    clock = FakeClock()
+    broken = ScriptedBackend('broken', 0.01, clock.advance, fail=lambda request: ValueError('bad prompt'))
+    backup = ScriptedBackend('backup', 0.05, clock.advance)
+    router = LLMRouter([broken, backup], hedge=False, clock=clock)
+    with pytest.raises(ValueError):
+        ask(router, 0)
+    assert backup.calls == []
+
+def test_raises_the_last_error_when_every_backend_fails():
+    clock = FakeClock()
+    backends = [ScriptedBackend(name, 0.01, clock.advance, fail=lambda request: RateLimitError(1)) for name in 'ab']
+    with pytest.raises(RateLimitError):
+        ask(LLMRouter(backends, hedge=False, clock=clock), 0)
+    assert [len(backend.calls) for backend in backends] == [1, 1]
+
+def test_rides_out_a_simulated_outage():
+    """
+    The primary is fast but answers 429 for requests 40-79, the secondary is slower but steady. Requests arrive
+    every 30 ms of simulated time. No request may fail, the benched primary is only probed once per Retry-After,
+    and traffic returns to the primary once the outage is over.
+    """
+    clock = FakeClock()
+    outage = range(40, 80)
+    primary = ScriptedBackend('groq', 0.02, clock.advance,
+                              fail=lambda request: RateLimitError(0.2) if request in outage else None)
+    secondary = ScriptedBackend('openai', 0.06, clock.advance)
+    router = LLMRouter([primary, secondary], hedge=False, clock=clock)
+
+    providers = []
+    for request in range(200):
+        providers.append(ask(router, request))
+        clock.advance(0.03)
+
+    outage_seconds = len(outage) * (0.03 + 0.06)
+    assert primary.errors <= outage_seconds / 0.2 + 1
+    assert all(providers[request] == 'openai' for request in outage)
+    assert set(providers[100:]) == {'groq'}
+    assert router.report()['groq']['healthy']
+
+def test_hedges_a_slow_request_on_the_next_backend(monkeypatch):
+    monkeypatch.setattr(llm_router, 'HEDGE_DELAY_SECONDS', 0.05)
+    slow = ScriptedBackend('slow', 0.5, time.sleep)
+    fast = ScriptedBackend('fast', 0.01, time.sleep)
+    router = LLMRouter([slow, fast], hedge=True)
+    start = time.perf_counter()
+    assert ask(router, 0) == 'fast'
+    assert time.perf_counter() - start < 0.3
+    assert slow.calls == [0] and fast.calls == [0]
+
+def test_stream_fails_over_only_before_the_first_question():
+    class StreamingBackend(ScriptedBackend):
+        def __init__(self, provider: str, questions: list, error: Exception = None):
+            super().__init__(provider, 0.0, lambda seconds: None)
+            self.questions = questions
+            self.error = error
+
+        def stream_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None):
+            self.calls.append(notes[0])
+            yield from self.questions
+            if self.error is not None:
+                raise self.error
+
+    question = {'question': 'q', 'answers': ['a', 'b'], 'correctAnswerIndex': 0}
+    limited = StreamingBackend('limited', [], RateLimitError(1))
+    backup = StreamingBackend('backup', [question])
+    assert list(LLMRouter([limited, backup], hedge=False).stream_quiz([0], 1, [])) == [question]
+
+    cut_off = StreamingBackend('cut-off', [question], RateLimitError(1))
+    backup = StreamingBackend('backup', [question])
+    with pytest.raises(RateLimitError):
+        list(LLMRouter([cut_off, backup], hedge=False).stream_quiz([0], 2, []))
+    assert backup.calls == []
@@ -0,0 +1,31 @@
+import json
+from types import SimpleNamespace
+from utils.openai_llm import OpenAILLM
+from utils.tracing import Span, Trace
+
+def chunk(content: str = None, usage=None):
+    choices = [] if content is None else [SimpleNamespace(delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+class FakeCompletions:
+    def __init__(self, chunks: list):
+        self.chunks = chunks
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return iter(self.chunks)
+
+def test_stream_asks_for_usage_and_records_it_on_the_span():
+    quiz = json.dumps({'questions': [{'question': 'q', 'answers': ['a', 'b'], 'correctAnswerIndex': 0}]})
+    usage = SimpleNamespace(prompt_tokens=120, completion_tokens=40, prompt_tokens_details=None)
+    completions = FakeCompletions([chunk(quiz[:10]), chunk(quiz[10:]), chunk(usage=usage)])
+    llm = OpenAILLM.__new__(OpenAILLM)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    with Span(Trace('test'), 'openai.stream_quiz', {}) as span:
+        questions = list(llm.stream_quiz(['notes'], 1, []))
+
+    assert len(questions) == 1
+    assert completions.requests[0]['stream_options'] == {'include_usage': True}
+    assert span.attributes == {'promptTokens': 120, 'completionTokens': 40, 'cachedPromptTokens': 0}
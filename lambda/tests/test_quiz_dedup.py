@@ -0,0 +1,41 @@
+import pytest
+from utils.quiz_dedup import is_low_quality, refine_quiz
+
+def question(text: str, answers: list = None) -> dict:
+    return {'question': text, 'answers': answers or ['Paris', 'Lyon', 'Nice', 'Lille'], 'correctAnswerIndex': 0}
+
+@pytest.mark.parametrize('text', [
+    'According to the notes, what is the capital of France?',
+    'What is the capital of France in the notes?',
+    'As indicated by the notes, which city is the capital of France?',
+    'Based on your notes, which city is the capital of France?',
+    'According to the passage, which city is the capital of France?',
+])
+def test_flags_questions_that_cite_the_notes(text):
+    assert is_low_quality(question(text))
+
+@pytest.mark.parametrize('text', [
+    'Which of the notes in a C major triad is the fifth?',
+    'How many of these notes belong to the pentatonic scale?',
+    'Which city is the capital of France?',
+])
+def test_keeps_questions_that_only_mention_notes(text):
+    assert not is_low_quality(question(text, ['C', 'E', 'G', 'B']))
+
+def test_flags_repeated_answers():
+    assert is_low_quality(question('Which city is the capital of France?', ['Paris', 'paris', 'Nice', 'Lille']))
+
+def test_top_up_excludes_the_questions_duplicated_in_other_parts():
+    original = question('Which city is the capital of France?')
+    reworded = question('Which city is the capital city of France?')
+    other = question('Which river flows through Paris?', ['Seine', 'Loire', 'Rhone', 'Garonne'])
+    requests = []
+
+    def top_up(index, num_questions, exclude):
+        requests.append((index, num_questions, exclude))
+        return [question('Which French city hosts the Cannes festival?', ['Cannes', 'Paris', 'Nice', 'Lyon'])]
+
+    quiz, stats = refine_quiz([(1, [original]), (2, [other, reworded])], top_up)
+    assert requests == [(1, 1, [original['question'], other['question']])]
+    assert stats['questionsRemoved'] == 1 and stats['topUpAddedQuestions'] == 1
+    assert len(quiz['questions']) == 3
@@ -0,0 +1,72 @@
+import json
+import pytest
+import utils.s3_utils as s3_utils
+from tests.fakes import FakeS3Client
+from utils.quiz_jobs import assemble_quiz, job_manifest_key, part_key, quiz_key, write_json
+
+BUCKET = 'quizzes'
+JOB_ID = 'job'
+
+@pytest.fixture
+def s3(monkeypatch):
+    s3 = FakeS3Client()
+    monkeypatch.setattr(s3_utils, 's3_client', s3)
+    return s3
+
+def question(text: str) -> dict:
+    return {'question': text, 'answers': ['a', 'b', 'c', 'd'], 'correctAnswerIndex': 0}
+
+def write_job(questions: list, num_questions: int) -> None:
+    write_json(BUCKET, job_manifest_key(JOB_ID), {'numQuestions': num_questions, 'numParts': 1})
+    write_json(BUCKET, part_key(JOB_ID, 0), {'noteKey': 'note', 'numQuestions': num_questions, 'questions': questions})
+
+def stored(s3: FakeS3Client, key: str):
+    return json.loads(s3.objects[(BUCKET, key)]['Body'])
+
+def counting_top_up(texts: list):
+    def top_up(note_key, num_questions, exclude):
+        top_up.calls += 1
+        return [question(text) for text in texts[:num_questions]]
+    top_up.calls = 0
+    return top_up
+
+def test_waits_for_every_part(s3):
+    write_json(BUCKET, job_manifest_key(JOB_ID), {'numQuestions': 2, 'numParts': 2})
+    write_json(BUCKET, part_key(JOB_ID, 0), {'noteKey': 'note', 'numQuestions': 2, 'questions': []})
+    assert assemble_quiz(BUCKET, JOB_ID) is None
+    assert (BUCKET, quiz_key(JOB_ID)) not in s3.objects
+
+def test_a_finished_quiz_is_not_reassembled_or_topped_up(s3):
+    write_job([question('What is the capital of France?')] * 2, 2)
+    first = assemble_quiz(BUCKET, JOB_ID, counting_top_up(['Which river flows through Paris?']))
+    assert first['totalActualQuestions'] == 2
+
+    late = counting_top_up(['Who designed the Eiffel Tower?'])
+    assert assemble_quiz(BUCKET, JOB_ID, late) is None
+    assert late.calls == 0
+    assert stored(s3, job_manifest_key(JOB_ID)) == first
+
+def test_losing_a_concurrent_assembly_leaves_the_winners_quiz_and_manifest(s3, monkeypatch):
+    """
+    Two workers both see every part and both top up, but only the one whose conditional write lands records
+    totals, so the manifest always describes the stored quiz.
+    """
+    write_job([question('What is the capital of France?')] * 3, 3)
+    winner_top_up = counting_top_up(['Which river flows through Paris?'])
+    loser_top_up = counting_top_up([])
+    real_head = s3_utils.head_s3_object_if_exists
+
+    def winner_writes_first(bucket_name, key):
+        if key == quiz_key(JOB_ID):
+            return None
+        return real_head(bucket_name, key)
+    winner = assemble_quiz(BUCKET, JOB_ID, winner_top_up)
+    # The loser checked for the quiz before the winner wrote it.
+    monkeypatch.setattr('utils.quiz_jobs.head_s3_object_if_exists', winner_writes_first)
+    assert assemble_quiz(BUCKET, JOB_ID, loser_top_up) is None
+    assert loser_top_up.calls == 1
+
+    quiz = stored(s3, quiz_key(JOB_ID))
+    manifest = stored(s3, job_manifest_key(JOB_ID))
+    assert manifest == winner
+    assert manifest['totalActualQuestions'] == len(quiz['questions']) == 2
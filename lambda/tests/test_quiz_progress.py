@@ -0,0 +1,34 @@
+import json
+import threading
+import time
+import utils.s3_utils as s3_utils
+from utils.quiz_progress import QuizProgressWriter
+
+class SlowS3:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.bodies = []
+        self.threads = set()
+
+    def put_object(self, Bucket, Key, Body, ContentType, Metadata):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.latency)
+        self.bodies.append(Body.decode('utf-8'))
+
+def test_writes_are_coalesced_off_the_generating_thread(monkeypatch):
+    s3 = SlowS3(latency=0.05)
+    monkeypatch.setattr(s3_utils, 's3_client', s3)
+    writer = QuizProgressWriter('bucket', 'progress.jsonl')
+    questions = [{'question': f'Question {i}', 'answers': ['a', 'b'], 'correctAnswerIndex': 0} for i in range(20)]
+
+    start = time.perf_counter()
+    for question in questions:
+        writer.add([question])
+        writer.add([question])
+    adding = time.perf_counter() - start
+    writer.close()
+
+    assert adding < s3.latency, "add() must not wait for S3"
+    assert threading.get_ident() not in s3.threads
+    assert 1 <= len(s3.bodies) < len(questions)
+    assert [json.loads(line) for line in s3.bodies[-1].splitlines()] == questions
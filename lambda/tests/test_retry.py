@@ -0,0 +1,183 @@
+import random
+from email.utils import formatdate
+import pytest
+from botocore.exceptions import ClientError
+from utils.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, get_retry_after, is_retryable, set_invocation_deadline
+
+class FakeClock:
+    """
+    Monotonic clock that only moves when the policy sleeps.
+    """
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class ApiError(Exception):
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+        self.headers = headers or {}
+
+def aws_error(code: str, status_code: int) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status_code}}, 'Op')
+
+def failing(errors: list, result='ok'):
+    """
+    Returns a function that raises the given errors in turn, then returns result, counting its calls.
+    """
+    remaining = list(errors)
+
+    def func():
+        func.calls += 1
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    func.calls = 0
+    return func
+
+def make_policy(clock: FakeClock, max_attempts: int = 5, breaker: CircuitBreaker = None) -> RetryPolicy:
+    return RetryPolicy('test', max_attempts=max_attempts, base_delay=0.5, max_delay=20,
+                       circuit_breaker=breaker or CircuitBreaker(failure_threshold=100, clock=clock),
+                       clock=clock, sleep=clock.sleep, rng=random.Random(0))
+
+@pytest.fixture(autouse=True)
+def no_deadline():
+    set_invocation_deadline(None)
+    yield
+    set_invocation_deadline(None)
+
+@pytest.mark.parametrize('error, retryable', [
+    (aws_error('ThrottlingException', 400), True),
+    (aws_error('SlowDown', 503), True),
+    (aws_error('InternalError', 500), True),
+    (aws_error('NoSuchKey', 404), False),
+    (aws_error('AccessDenied', 403), False),
+    (ApiError(429), True),
+    (ApiError(503), True),
+    (ApiError(400), False),
+    (TimeoutError(), True),
+    (ValueError('bad JSON'), False),
+    (CircuitOpenError(), False),
+])
+def test_classifies_errors(error, retryable):
+    assert is_retryable(error) is retryable
+
+def test_fatal_error_is_raised_without_retrying():
+    clock = FakeClock()
+    func = failing([ValueError('bad JSON')])
+    with pytest.raises(ValueError):
+        make_policy(clock).call(func)
+    assert func.calls == 1
+    assert clock.sleeps == []
+
+def test_backoff_is_decorrelated_jitter_within_bounds():
+    clock = FakeClock()
+    func = failing([ApiError(503)] * 4)
+    assert make_policy(clock).call(func) == 'ok'
+    assert func.calls == 5
+    previous = 0.5
+    for delay in clock.sleeps:
+        assert 0.5 <= delay <= min(20, previous * 3)
+        previous = delay
+
+def test_backoff_is_capped_at_max_delay():
+    clock = FakeClock()
+    policy = make_policy(clock, max_attempts=30)
+    assert policy.call(failing([ApiError(503)] * 29)) == 'ok'
+    assert max(clock.sleeps) <= 20
+
+def test_gives_up_after_max_attempts():
+    clock = FakeClock()
+    func = failing([ApiError(503)] * 3)
+    with pytest.raises(ApiError):
+        make_policy(clock, max_attempts=3).call(func)
+    assert func.calls == 3
+    assert len(clock.sleeps) == 2
+
+def test_honors_retry_after_seconds():
+    clock = FakeClock()
+    make_policy(clock).call(failing([ApiError(429, {'retry-after': '7'})]))
+    assert clock.sleeps == [7.0]
+
+def test_parses_retry_after_http_date():
+    error = ApiError(429, {'Retry-After': formatdate(1000.0 + 30, usegmt=True)})
+    assert get_retry_after(error, now=1000.0) == pytest.approx(30.0)
+    assert get_retry_after(ApiError(429, {'retry-after': 'soon'})) is None
+    assert get_retry_after(ApiError(429)) is None
+
+class FakeContext:
+    def __init__(self, remaining_ms: int):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self) -> int:
+        return self.remaining_ms
+
+def test_stops_when_the_deadline_leaves_no_time_to_wait():
+    clock = FakeClock()
+    # 2 s of the 3 s left are the safety margin, so a 7 s Retry-After cannot be honored.
+    set_invocation_deadline(FakeContext(3000), clock=clock)
+    func = failing([ApiError(429, {'retry-after': '7'})])
+    with pytest.raises(ApiError):
+        make_policy(clock).call(func)
+    assert func.calls == 1
+    assert clock.sleeps == []
+
+def test_retries_within_the_deadline():
+    clock = FakeClock()
+    set_invocation_deadline(FakeContext(60000), clock=clock)
+    assert make_policy(clock).call(failing([ApiError(429, {'retry-after': '7'})])) == 'ok'
+    assert clock.sleeps == [7.0]
+
+def test_circuit_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow_request()
+
+    clock.now += 30
+    assert breaker.state == 'half-open'
+    assert breaker.allow_request()
+    assert not breaker.allow_request(), "only one trial call is let through while half-open"
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow_request()
+
+def test_failed_trial_reopens_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    clock.now += 29
+    assert not breaker.allow_request()
+
+def test_open_circuit_rejects_calls_without_calling_the_service():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    func = failing([ApiError(503)] * 10)
+    with pytest.raises(CircuitOpenError):
+        make_policy(clock, breaker=breaker).call(func)
+    assert func.calls == 2
+    assert breaker.state == 'open'
+
+def test_fatal_errors_do_not_trip_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    policy = make_policy(clock, breaker=breaker)
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            policy.call(failing([ValueError('bad input')]))
+    assert breaker.state == 'closed'
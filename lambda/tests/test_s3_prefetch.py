@@ -0,0 +1,72 @@
+import json
+import pytest
+import utils.lambda_utils as lambda_utils
+import utils.s3_utils as s3_utils
+from tests.fakes import FakeLambdaClient, FakeLLM, FakeS3Client, load_lambda_function
+from utils.s3_utils import LruTextCache
+
+OCR_BUCKET = 'spellbook-imagestore-ocr-results'
+NOTE_KEYS = [f'note-{i}' for i in range(5)]
+
+@pytest.fixture
+def s3(monkeypatch):
+    s3 = FakeS3Client()
+    monkeypatch.setattr(s3_utils, 's3_client', s3)
+    monkeypatch.setattr(s3_utils, 'note_cache', LruTextCache(s3_utils.NOTE_CACHE_MAX_BYTES))
+    for i, note_key in enumerate(NOTE_KEYS):
+        s3.put_object(Bucket=OCR_BUCKET, Key=f'processed/{note_key}', Body=' '.join(['word'] * (200 + i)))
+    return s3
+
+@pytest.fixture
+def run_job(s3, monkeypatch):
+    """
+    Runs a quiz job through the orchestrator and a synchronously invoked worker in this process, returning the
+    number of GETs it issued.
+    """
+    orchestrator = load_lambda_function('quizGenerationOrchestrator')
+    worker = load_lambda_function('quizGeneration')
+    monkeypatch.setattr(worker, 'get_llm_provider', lambda provider_name: FakeLLM())
+    monkeypatch.setattr(lambda_utils, 'lambda_client', FakeLambdaClient(lambda payload: worker.lambda_handler(payload, None)))
+    event = {'Records': [{'body': json.dumps({
+        'noteKeys': NOTE_KEYS, 'numQuestions': 10, 'jobUuid': 'job', 'topics': []
+    })}]}
+
+    def run() -> int:
+        before = s3.calls['get_object']
+        orchestrator.lambda_handler(event, None)
+        return s3.calls['get_object'] - before
+    return run
+
+def test_each_note_is_read_once_across_orchestrator_and_worker(run_job, monkeypatch):
+    # Without the container cache the inline hand-off alone must keep the worker from reading the notes again.
+    monkeypatch.setattr(s3_utils, 'note_cache', LruTextCache(0))
+    assert run_job() == len(NOTE_KEYS)
+
+def test_a_warm_cache_issues_no_gets(run_job):
+    assert run_job() == len(NOTE_KEYS)
+    assert run_job() == 0
+
+def test_a_rewritten_note_is_fetched_again(run_job, s3):
+    run_job()
+    s3.put_object(Bucket=OCR_BUCKET, Key='processed/note-0', Body='rewritten ' * 300)
+    assert run_job() == 1
+    assert s3_utils.note_cache.get((OCR_BUCKET, 'processed/note-0'))[1] == 'rewritten ' * 300
+
+def test_conditional_get_reuses_the_cached_text_while_unchanged(s3):
+    key = 'processed/note-0'
+    first = s3_utils.get_cached_s3_object_as_text(OCR_BUCKET, key)
+    assert s3_utils.get_cached_s3_object_as_text(OCR_BUCKET, key) == first
+    # Without an ETag from the caller the second read is a conditional GET that S3 answers with a 304.
+    assert s3.calls['get_object'] == 2
+    assert s3.bytes_downloaded == len(first.encode('utf-8'))
+
+def test_cache_is_bounded_by_encoded_bytes():
+    cache = LruTextCache(max_bytes=10)
+    cache.put('a', 'ééé')
+    assert cache.current_bytes == 6
+    cache.put('b', 'ééé', etag='"b"')
+    assert cache.get('a') is None, "the least recently used entry is evicted once the bytes exceed the limit"
+    assert cache.get('b') == ('"b"', 'ééé')
+    cache.put('c', 'é' * 6)
+    assert cache.get('c') is None, "text larger than the whole cache is not kept"
+    assert cache.current_bytes == 6
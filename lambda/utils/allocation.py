@@ -0,0 +1,130 @@
+import heapq
+import math
+
+HAMILTON = 'hamilton'
+SAINTE_LAGUE = 'sainte-lague'
+
+# Plain Python on purpose: jobs have at most a few thousand notes, which this handles in milliseconds. Importing
+# NumPy here would load it (~60 ms) at every orchestrator cold start, while utils/quiz_dedup only loads it when a
+# quiz is deduplicated, which a queued job leaves to the worker that assembles it.
+
+def softmax(x, temperature: float = 1.0) -> list:
+    x = [value / temperature for value in x]
+    top = max(x)
+    e_x = [math.exp(value - top) if value != -math.inf else 0.0 for value in x]
+    total = sum(e_x)
+    return [value / total for value in e_x]
+
+def allocation_weights(scores, temperature: float = None) -> list:
+    """
+    Turns raw scores (e.g. word counts) into weights that sum to 1.
+    Without a temperature the weights are proportional to the scores. With one they are softmax(log(score) / T),
+    i.e. proportional to score ** (1 / T): T > 1 evens the split out so short notes still get questions, T < 1
+    favors the longest notes. All-zero scores are weighted equally.
+    """
+    scores = [float(score) if score > 0 else 0.0 for score in scores]
+    total = sum(scores)
+    if total == 0:
+        return [1.0 / len(scores)] * len(scores)
+    if temperature is None:
+        return [score / total for score in scores]
+    return softmax([math.log(score) if score > 0 else -math.inf for score in scores], temperature)
+
+def bounded_quotas(weights: list, total: int, lower: list, upper: list) -> list:
+    """
+    Splits total proportionally to weights while keeping every share within [lower, upper]: shares that fall
+    outside are pinned to the bound and the rest is redistributed among the others until nothing moves.
+    """
+    quotas = [0.0] * len(weights)
+    free = list(range(len(weights)))
+    pinned_total = 0.0
+    while True:
+        remaining = total - pinned_total
+        free_weight = sum(weights[i] for i in free)
+        for i in free:
+            quotas[i] = remaining * weights[i] / free_weight if free_weight > 0 else remaining / len(free)
+        below = [i for i in free if quotas[i] < lower[i]]
+        above = [i for i in free if quotas[i] > upper[i]]
+        if not below and not above:
+            return quotas
+        # Pin only the side that is out of balance, as pinning both at once can overshoot.
+        if sum(lower[i] - quotas[i] for i in below) >= sum(quotas[i] - upper[i] for i in above):
+            pinned, bounds = below, lower
+        else:
+            pinned, bounds = above, upper
+        for i in pinned:
+            quotas[i] = bounds[i]
+            pinned_total += bounds[i]
+        pinned = set(pinned)
+        free = [i for i in free if i not in pinned]
+
+def hamilton(weights: list, total: int, lower: list, upper: list) -> list:
+    """
+    Largest-remainder apportionment: everyone gets the floor of their quota, and the seats left over go to the
+    largest fractional remainders (ties broken by weight, then position).
+    """
+    quotas = bounded_quotas(weights, total, lower, upper)
+    seats = [int(quota + 1e-9) for quota in quotas]
+    leftover = total - sum(seats)
+    if leftover > 0:
+        ranks = zip([1.0 if seat >= limit else seat - quota for quota, seat, limit in zip(quotas, seats, upper)],
+                    [-weight for weight in weights], range(len(seats)))
+        for _, _, i in heapq.nsmallest(leftover, ranks):
+            seats[i] += 1
+    return seats
+
+def sainte_lague(weights: list, total: int, lower: list, upper: list) -> list:
+    """
+    Highest-averages apportionment with odd divisors (Webster/Sainte-Laguë): seats are handed out one at a time
+    to the largest weight / (2 * seats + 1), starting from the lower bounds. O((total + n) log n) with a heap.
+    """
+    seats = [int(bound) for bound in lower]
+    heap = [(-weight / (2 * seat + 1), i) for i, (weight, seat, limit) in enumerate(zip(weights, seats, upper))
+            if seat < limit]
+    heapq.heapify(heap)
+    for _ in range(total - sum(seats)):
+        _, i = heapq.heappop(heap)
+        seats[i] += 1
+        if seats[i] < upper[i]:
+            heapq.heappush(heap, (-weights[i] / (2 * seats[i] + 1), i))
+    return seats
+
+def apportion(scores, total: int, method: str = HAMILTON, minimum: int = 0, maximum: int = None,
+              temperature: float = None) -> list:
+    """
+    Splits total whole units (questions) across items in proportion to their scores.
+    Returns a list of ints aligned with scores whose sum is always exactly total. Caps that cannot all be met are
+    relaxed: the minimum is lowered to total // len(scores) and the maximum raised to ceil(total / len(scores)).
+    """
+    count = len(scores)
+    if count == 0:
+        raise ValueError("scores list is empty")
+    if total < 0:
+        raise ValueError("total must not be negative")
+
+    minimum = min(minimum, total // count)
+    maximum = total if maximum is None else max(maximum, -(-total // count))
+    lower = [minimum] * count
+    upper = [maximum] * count
+    weights = allocation_weights(scores, temperature)
+
+    if method == HAMILTON:
+        return hamilton(weights, total, lower, upper)
+    elif method == SAINTE_LAGUE:
+        return sainte_lague(weights, total, lower, upper)
+    else:
+        raise ValueError(f"Unknown apportionment method: {method}")
+
+def calculate_questions_per_note(note_scores, total_questions, method: str = HAMILTON, minimum: int = 0,
+                                 maximum: int = None, temperature: float = None):
+    """
+    Apportions total_questions across (note_key, score) pairs.
+    Returns (note_key, questions) pairs ordered by descending score.
+    """
+    if not note_scores:
+        raise ValueError("note_scores list is empty")
+
+    scores = [score for _, score in note_scores]
+    order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+    seats = apportion([scores[i] for i in order], total_questions, method, minimum, maximum, temperature)
+    return [(note_scores[i][0], n) for i, n in zip(order, seats)]
@@ -0,0 +1,170 @@
+import os
+import re
+from .allocation import calculate_questions_per_note
+from .concurrency import map_concurrently
+from .llm_interface import LLMInterface
+from .llm_parsing import IncompleteQuizError, LLMResponseError
+from .note_stats import CHARS_PER_TOKEN, estimate_tokens
+from .retry import retry_call
+
+MODEL_CONTEXT_TOKENS = {
+    'llama3-70b-8192': 8192,
+    'gpt-4o': 128000
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+# Room left in the context window for the system prompt and for the generated questions.
+PROMPT_RESERVED_TOKENS = 600
+OUTPUT_RESERVED_TOKENS = 2048
+# Large-context models could take whole notes, but one huge call is slower than several parallel small ones.
+MAX_CHUNK_TOKENS = int(os.environ.get('MAX_CHUNK_TOKENS', '4000'))
+MAX_PARALLEL_CHUNKS = int(os.environ.get('MAX_PARALLEL_CHUNKS', '8'))
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+def chunk_token_budget(model: str) -> int:
+    # A router lists all of its backends' models; chunks must fit the smallest of them.
+    context_tokens = min(MODEL_CONTEXT_TOKENS.get(name, DEFAULT_CONTEXT_TOKENS) for name in model.split(','))
+    return max(1, min(MAX_CHUNK_TOKENS, context_tokens - PROMPT_RESERVED_TOKENS - OUTPUT_RESERVED_TOKENS))
+
+def split_oversized(piece: str, max_chars: int) -> list:
+    """
+    Splits a single paragraph that is over budget at sentence boundaries, and a single sentence that is over
+    budget at word boundaries.
+    """
+    sentences = SENTENCE_BREAK.split(piece)
+    if len(sentences) > 1:
+        return pack_pieces(sentences, max_chars, ' ')
+    words = piece.split()
+    if len(words) > 1:
+        return pack_pieces(words, max_chars, ' ')
+    return [piece[i:i + max_chars] for i in range(0, len(piece), max_chars)]
+
+def pack_pieces(pieces: list, max_chars: int, separator: str) -> list:
+    """
+    Greedily packs consecutive pieces into chunks of at most max_chars, splitting any piece that alone is too big.
+    """
+    chunks = []
+    current = []
+    current_chars = 0
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        if len(piece) > max_chars:
+            if current:
+                chunks.append(separator.join(current))
+                current, current_chars = [], 0
+            chunks.extend(split_oversized(piece, max_chars))
+            continue
+        added_chars = len(piece) + (len(separator) if current else 0)
+        if current and current_chars + added_chars > max_chars:
+            chunks.append(separator.join(current))
+            current, current_chars = [], 0
+            added_chars = len(piece)
+        current.append(piece)
+        current_chars += added_chars
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+def chunk_notes(notes: list, max_tokens: int) -> list:
+    """
+    Splits the notes into chunks of at most max_tokens, breaking at paragraph, then sentence, then word
+    boundaries. Small paragraphs are packed together, but a chunk never spans two notes.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    for note in notes:
+        chunks.extend(pack_pieces(PARAGRAPH_BREAK.split(note), max_chars, '\n\n'))
+    return chunks
+
+def normalize_question(question: dict) -> str:
+    return ' '.join(re.sub(r'[^a-z0-9 ]', ' ', str(question.get('question', '')).lower()).split())
+
+def merge_quizzes(quizzes: list) -> dict:
+    """
+    Concatenates the questions of several quizzes in order, dropping repeats of the same question text.
+    """
+    seen = set()
+    questions = []
+    for quiz in quizzes:
+        for question in quiz.get('questions', []):
+            key = normalize_question(question)
+            if key in seen:
+                continue
+            seen.add(key)
+            questions.append(question)
+    return {'questions': questions}
+
+def stream_quiz(llm: LLMInterface, notes: list, num_questions: int, topics: list, on_questions,
+                exclude: list = None) -> dict:
+    questions = []
+    try:
+        for question in llm.stream_quiz(notes, num_questions, topics, exclude):
+            questions.append(question)
+            on_questions([question])
+    except IncompleteQuizError as e:
+        # The questions were passed on as they arrived; keep them for the top-up.
+        raise IncompleteQuizError({'questions': questions}, e.missing, e.reason)
+    return {'questions': questions}
+
+def generate_with_top_up(generate, num_questions: int, exclude: list = None) -> dict:
+    """
+    Calls generate(num_questions, exclude) and, when the response was damaged and came up short, generate(missing,
+    exclude) once for just the questions it lost, this time also excluding the questions it kept so the model does
+    not write them again. Returns the merged quiz; raises if neither call produced a valid question.
+    """
+    try:
+        return generate(num_questions, exclude)
+    except IncompleteQuizError as e:
+        print(f"Keeping {len(e.quiz['questions'])} questions of a damaged response and asking for {e.missing} more. Error: {str(e)}")
+        quiz, missing = e.quiz, e.missing
+    try:
+        top_up = generate(missing, (exclude or []) + [question['question'] for question in quiz['questions']])
+    except IncompleteQuizError as e:
+        top_up = e.quiz
+    merged = merge_quizzes([quiz, top_up])
+    if not merged['questions']:
+        raise LLMResponseError("Neither the quiz response nor its top-up had a valid question")
+    return merged
+
+def generate_quiz_chunked(llm: LLMInterface, notes: list, num_questions: int, topics: list,
+                          max_workers: int = MAX_PARALLEL_CHUNKS, on_questions=None, exclude: list = None) -> dict:
+    """
+    Generates a quiz in a single call when the notes fit the model's chunk budget. Otherwise splits them into
+    chunks, apportions the questions across chunks by token count, generates every chunk in parallel and merges
+    the results. Chunks that fail are skipped as long as at least one succeeds. exclude lists existing questions
+    the new ones must not repeat, for top-ups.
+    When on_questions is given it is called with questions as soon as they are available: one at a time from the
+    streamed response of a single call, or per chunk as each chunk completes.
+    """
+    max_tokens = chunk_token_budget(llm.MODEL)
+    if sum(estimate_tokens(note) for note in notes) <= max_tokens:
+        if on_questions is not None:
+            return generate_with_top_up(lambda n, excluded: retry_call('llm', stream_quiz, llm, notes, n, topics, on_questions, excluded),
+                                        num_questions, exclude)
+        return generate_with_top_up(lambda n, excluded: retry_call('llm', llm.generate_quiz, notes, n, topics, excluded),
+                                    num_questions, exclude)
+
+    chunks = chunk_notes(notes, max_tokens)
+    chunk_scores = [(index, estimate_tokens(chunk)) for index, chunk in enumerate(chunks)]
+    allocations = sorted(calculate_questions_per_note(chunk_scores, num_questions))
+    work = [(chunks[index], n) for index, n in allocations if n > 0]
+    print(f"Split notes into {len(chunks)} chunks of up to {max_tokens} tokens; generating from {len(work)}.")
+
+    def generate_chunk(item):
+        quiz = generate_with_top_up(lambda n, excluded: retry_call('llm', llm.generate_quiz, [item[0]], n, topics, excluded),
+                                    item[1], exclude)
+        if on_questions is not None:
+            on_questions(quiz.get('questions', []))
+        return quiz
+
+    outcomes = map_concurrently(generate_chunk, work, max_workers)
+    quizzes = [quiz for quiz, error in outcomes if error is None]
+    errors = [error for _, error in outcomes if error is not None]
+    if errors:
+        print(f"Quiz generation failed for {len(errors)} of {len(work)} chunks. First error: {str(errors[0])}")
+        if not quizzes:
+            raise errors[0]
+    return merge_quizzes(quizzes)
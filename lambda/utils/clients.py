@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+
+# Connection pool and timeout settings shared by every client built here.
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '20'))
+AWS_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('AWS_CONNECT_TIMEOUT_SECONDS', '5'))
+AWS_READ_TIMEOUT_SECONDS = float(os.environ.get('AWS_READ_TIMEOUT_SECONDS', '60'))
+LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', '20'))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('LLM_MAX_KEEPALIVE_CONNECTIONS', '10'))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('LLM_CONNECT_TIMEOUT_SECONDS', '5'))
+LLM_READ_TIMEOUT_SECONDS = float(os.environ.get('LLM_READ_TIMEOUT_SECONDS', '120'))
+# utils/retry owns retries, so the SDKs' own retry loops are off by default to avoid multiplying attempts.
+LLM_SDK_MAX_RETRIES = int(os.environ.get('LLM_SDK_MAX_RETRIES', '0'))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(name: str, factory):
+    """
+    Returns the client registered under name, building it with factory() on first use.
+    Clients live for the whole container, so warm invocations reuse their credentials and connection pools.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = factory()
+                _clients[name] = client
+    return client
+
+def reset_clients() -> None:
+    with _clients_lock:
+        _clients.clear()
+
+def create_boto3_client(service_name: str, max_pool_connections: int = AWS_MAX_POOL_CONNECTIONS,
+                        read_timeout: float = AWS_READ_TIMEOUT_SECONDS):
+    import boto3
+    from botocore.config import Config
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        connect_timeout=AWS_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=read_timeout
+    )
+    return boto3.client(service_name, config=config)
+
+def get_boto3_client(service_name: str, **kwargs):
+    return get_client(f'boto3:{service_name}', lambda: create_boto3_client(service_name, **kwargs))
+
+def create_http_client():
+    import httpx
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS
+        ),
+        timeout=httpx.Timeout(LLM_READ_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+    )
+
+def create_groq_client():
+    from groq import Groq
+    return Groq(
+        api_key=os.environ.get("GROQ_API_KEY"),
+        http_client=create_http_client(),
+        max_retries=LLM_SDK_MAX_RETRIES
+    )
+
+def get_groq_client():
+    return get_client('groq', create_groq_client)
+
+def create_openai_client():
+    from openai import OpenAI
+    return OpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        http_client=create_http_client(),
+        max_retries=LLM_SDK_MAX_RETRIES
+    )
+
+def get_openai_client():
+    return get_client('openai', create_openai_client)
+
+def create_documentai_client():
+    from google.cloud.documentai_v1 import DocumentProcessorServiceClient
+    from google.oauth2 import service_account
+    credentials_json = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS_JSON')
+    if not credentials_json:
+        print("Environment variable for GOOGLE_APPLICATION_CREDENTIALS_JSON is missing.")
+        raise ValueError("Environment variable for GOOGLE_APPLICATION_CREDENTIALS_JSON is missing")
+    credentials = service_account.Credentials.from_service_account_info(json.loads(credentials_json))
+    return DocumentProcessorServiceClient(credentials=credentials)
+
+def get_documentai_client():
+    return get_client('documentai', create_documentai_client)
@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+from .tracing import submit_in_context
+
+DEFAULT_MAX_WORKERS = 10
+
+def map_concurrently(func, items, max_workers: int = DEFAULT_MAX_WORKERS) -> list:
+    """
+    Applies func to every item using a bounded thread pool.
+    Returns a list of (result, error) tuples in the same order as items. error is None when the call succeeded,
+    otherwise it is the exception raised and result is None. A failing item never cancels the others.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def run(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            return None, e
+
+    max_workers = max(1, min(max_workers, len(items)))
+    if max_workers == 1:
+        return [run(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [submit_in_context(executor, run, item) for item in items]
+        return [future.result() for future in futures]
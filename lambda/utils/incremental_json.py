@@ -0,0 +1,73 @@
+import json
+import re
+
+class ArrayItemStreamParser:
+    """
+    Incrementally extracts the items of one named array from a JSON document that arrives in arbitrary chunks,
+    e.g. the "questions" of a streamed quiz. feed() returns the items completed by that chunk, so callers can act
+    on each one as soon as its closing brace arrives instead of waiting for the whole document.
+    Only object items are supported; an item that fails to parse is skipped.
+    """
+    def __init__(self, key: str):
+        self.array_start = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+        self.prefix = ''
+        self.in_array = False
+        self.done = False
+        self.item = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> list:
+        if self.done or not chunk:
+            return []
+        if not self.in_array:
+            self.prefix += chunk
+            match = self.array_start.search(self.prefix)
+            if not match:
+                return []
+            self.in_array = True
+            chunk = self.prefix[match.end():]
+            self.prefix = ''
+
+        items = []
+        start = 0 if self.depth else None
+        for i, char in enumerate(chunk):
+            if self.depth == 0:
+                if char == '{':
+                    self.depth = 1
+                    start = i
+                elif char == ']':
+                    self.done = True
+                    break
+                continue
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.item.append(chunk[start:i + 1])
+                    item = self._parse(''.join(self.item))
+                    if item is not None:
+                        items.append(item)
+                    self.item = []
+                    start = None
+        if self.depth and start is not None:
+            self.item.append(chunk[start:])
+        return items
+
+    @staticmethod
+    def _parse(text: str):
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
@@ -1,7 +1,13 @@
-import boto3
 import json
+import os
+from .clients import get_boto3_client
 
-lambda_client = boto3.client('lambda')
+# Sized for the orchestrator's concurrent fan-out; botocore's default pool of 10 would serialize anything above that.
+MAX_POOL_CONNECTIONS = int(os.environ.get('LAMBDA_MAX_POOL_CONNECTIONS', '20'))
+# Synchronous invocations wait for the whole LLM call, so allow up to the maximum Lambda run time.
+INVOKE_READ_TIMEOUT_SECONDS = 900
+
+lambda_client = get_boto3_client('lambda', max_pool_connections=MAX_POOL_CONNECTIONS, read_timeout=INVOKE_READ_TIMEOUT_SECONDS)
 
 def invoke_lambda(function_name, payload):
     response = lambda_client.invoke(
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from botocore.exceptions import ClientError
+from .llm_interface import LLMInterface
+from .prompts import QUIZ_PROMPT, TOPIC_BATCH_PROMPT, TOPICS_PROMPT
+from .s3_utils import get_s3_object_as_text, is_missing_key_error, put_s3_object
+from .tracing import span
+
+DEFAULT_CACHE_BACKEND = 'memory'
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_DISK_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_DIRECTORY = '/tmp/llm-cache'
+# Responses are keyed by the prompt template versions that can produce them, so changing a prompt retires its
+# entries. Topic entries are shared by the single-document and batched paths, so they carry both prompts' ids.
+PROMPTS = {'generate_quiz': [QUIZ_PROMPT], 'extract_topics': [TOPICS_PROMPT, TOPIC_BATCH_PROMPT]}
+DEFAULT_S3_PREFIX = 'llm-cache/'
+
+class CacheBackend(ABC):
+    """
+    Base class for LLM response stores. Values must be JSON-serializable.
+    Counts hits and misses for the life of the container.
+    """
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def get(self, key: str):
+        value = self._load(key)
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value) -> None:
+        self._store(key, value)
+
+    def is_expired(self, stored_at: float) -> bool:
+        return self.clock() - stored_at > self.ttl_seconds
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
+
+    @abstractmethod
+    def _load(self, key: str):
+        """
+        Returns the value stored under key, or None when it is missing or expired.
+        """
+        pass
+
+    @abstractmethod
+    def _store(self, key: str, value) -> None:
+        pass
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    LRU cache in the container's memory, bounded by entry count.
+    Entries are kept serialized so callers can never mutate a cached response in place.
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.is_expired(stored_at):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return json.loads(value)
+
+    def _store(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock(), json.dumps(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class DiskCacheBackend(CacheBackend):
+    """
+    One JSON file per entry under a local directory (Lambda's /tmp survives warm invocations).
+    Evicts the least recently used files once the directory grows past max_bytes.
+    """
+    def __init__(self, directory: str = DEFAULT_DISK_DIRECTORY, max_bytes: int = DEFAULT_DISK_MAX_BYTES, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    def _load(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.is_expired(entry['storedAt']):
+            self._remove(path)
+            return None
+        try:
+            # Marks the entry recently used; _evict on another thread may have deleted it since it was read.
+            os.utime(path)
+        except OSError:
+            return None
+        return entry['value']
+
+    def _store(self, key: str, value) -> None:
+        path = self._path(key)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'storedAt': self.clock(), 'value': value}, f)
+        os.replace(temp_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            files = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            total_bytes = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total_bytes <= self.max_bytes:
+                    break
+                self._remove(path)
+                total_bytes -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+class S3CacheBackend(CacheBackend):
+    """
+    Shares cached responses across containers under an S3 prefix.
+    Expired entries are ignored on read; size is bounded by an expiration lifecycle rule on the prefix.
+    """
+    def __init__(self, bucket_name: str, prefix: str = DEFAULT_S3_PREFIX, **kwargs):
+        super().__init__(**kwargs)
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+
+    def _load(self, key: str):
+        try:
+            with span('s3.cache_load'):
+                entry = json.loads(get_s3_object_as_text(self.bucket_name, f'{self.prefix}{key}.json'))
+        except ClientError as e:
+            if is_missing_key_error(e):
+                return None
+            raise
+        if self.is_expired(entry['storedAt']):
+            return None
+        return entry['value']
+
+    def _store(self, key: str, value) -> None:
+        with span('s3.cache_store'):
+            put_s3_object(self.bucket_name, f'{self.prefix}{key}.json', json.dumps({'storedAt': self.clock(), 'value': value}))
+
+def create_cache_backend(name: str) -> CacheBackend:
+    ttl_seconds = float(os.environ.get('LLM_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+    if name == 'memory':
+        max_entries = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        return MemoryCacheBackend(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    elif name == 'disk':
+        directory = os.environ.get('LLM_CACHE_DIR', DEFAULT_DISK_DIRECTORY)
+        max_bytes = int(os.environ.get('LLM_CACHE_MAX_BYTES', DEFAULT_DISK_MAX_BYTES))
+        return DiskCacheBackend(directory=directory, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+    elif name == 's3':
+        bucket_name = os.environ.get('LLM_CACHE_BUCKET')
+        if not bucket_name:
+            raise ValueError("Environment variable LLM_CACHE_BUCKET is required for the s3 LLM cache backend")
+        prefix = os.environ.get('LLM_CACHE_PREFIX', DEFAULT_S3_PREFIX)
+        return S3CacheBackend(bucket_name, prefix=prefix, ttl_seconds=ttl_seconds)
+    else:
+        raise ValueError(f"Unknown LLM cache backend: {name}")
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_cache_backend(name: str) -> CacheBackend:
+    """
+    Returns the container-wide backend for name so entries and counters outlive a single invocation.
+    """
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = create_cache_backend(name)
+        return _backends[name]
+
+class CachingLLM(LLMInterface):
+    """
+    Serves repeated quiz and topic requests from a cache keyed by a hash of the provider, model, prompt template
+    and every request input, falling through to the wrapped LLM on a miss.
+    """
+    def __init__(self, llm: LLMInterface, backend: CacheBackend):
+        self.llm = llm
+        self.backend = backend
+        self.PROVIDER = llm.PROVIDER
+        self.MODEL = llm.MODEL
+
+    def cache_key(self, operation: str, **inputs) -> str:
+        key_material = {
+            'operation': operation,
+            'provider': self.llm.PROVIDER,
+            'model': self.llm.MODEL,
+            'prompt': [prompt.id for prompt in PROMPTS[operation]],
+            'inputs': inputs
+        }
+        return hashlib.sha256(json.dumps(key_material, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _cached(self, key: str, compute):
+        value = self.backend.get(key)
+        if value is not None:
+            print(f"LLM cache hit ({self.backend.stats()}).")
+            return value
+        value = compute()
+        self.backend.set(key, value)
+        print(f"LLM cache miss ({self.backend.stats()}).")
+        return value
+
+    def quiz_cache_key(self, notes: list, num_questions: int, topics: list, exclude: list = None) -> str:
+        inputs = {'notes': notes, 'num_questions': num_questions, 'topics': sorted(topics or [])}
+        if exclude:
+            # Only added when present so the keys of plain requests stay as they were.
+            inputs['exclude'] = sorted(exclude)
+        return self.cache_key('generate_quiz', **inputs)
+
+    def generate_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None) -> dict:
+        key = self.quiz_cache_key(notes, num_questions, topics, exclude)
+        return self._cached(key, lambda: self.llm.generate_quiz(notes, num_questions, topics, exclude))
+
+    def stream_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None):
+        key = self.quiz_cache_key(notes, num_questions, topics, exclude)
+        cached = self.backend.get(key)
+        if cached is not None:
+            print(f"LLM cache hit ({self.backend.stats()}).")
+            yield from cached.get('questions', [])
+            return
+        questions = []
+        for question in self.llm.stream_quiz(notes, num_questions, topics, exclude):
+            questions.append(question)
+            yield question
+        self.backend.set(key, {'questions': questions})
+        print(f"LLM cache miss ({self.backend.stats()}).")
+
+    def extract_topics(self, text: str) -> list:
+        key = self.cache_key('extract_topics', text=text)
+        return self._cached(key, lambda: self.llm.extract_topics(text))
+
+    def extract_topics_batch(self, texts: list) -> list:
+        # Entries are per text and shared with extract_topics, so only the uncached texts are sent.
+        keys = [self.cache_key('extract_topics', text=text) for text in texts]
+        results = [self.backend.get(key) for key in keys]
+        missing = [i for i, topics in enumerate(results) if topics is None]
+        if missing:
+            fetched = self.llm.extract_topics_batch([texts[i] for i in missing])
+            for i, topics in zip(missing, fetched):
+                results[i] = topics
+                if topics is not None:
+                    self.backend.set(keys[i], topics)
+        print(f"LLM cache: {len(texts) - len(missing)} of {len(texts)} topic lookups hit ({self.backend.stats()}).")
+        return results
+
+def with_response_cache(llm: LLMInterface) -> LLMInterface:
+    """
+    Wraps llm with the backend named by LLM_CACHE_BACKEND ('memory', 'disk', 's3' or 'none').
+    """
+    backend_name = os.environ.get('LLM_CACHE_BACKEND', DEFAULT_CACHE_BACKEND)
+    if backend_name == 'none':
+        return llm
+    return CachingLLM(llm, get_cache_backend(backend_name))
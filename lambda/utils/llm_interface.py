@@ -1,8 +1,28 @@
 from abc import ABC, abstractmethod
 
 class LLMInterface(ABC):
+    PROVIDER = None
+    MODEL = None
+
     @abstractmethod
-    def generate_quiz(self, notes: list, num_questions: int, topics: list) -> dict:
+    def generate_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None) -> dict:
+        """
+        Returns {'questions': [...]}. exclude lists question texts the quiz must not repeat, for top-ups.
+        """
         pass
     def extract_topics(self, text: str) -> list:
-        pass
\ No newline at end of file
+        pass
+
+    def stream_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None):
+        """
+        Yields the quiz questions one at a time as they become available.
+        Providers that can stream override this; the default waits for generate_quiz.
+        """
+        yield from self.generate_quiz(notes, num_questions, topics, exclude).get('questions', [])
+
+    def extract_topics_batch(self, texts: list) -> list:
+        """
+        Returns the topics of each text, aligned with texts; None marks a text the provider could not answer for.
+        Providers that can answer several texts in one request override this; the default asks for each in turn.
+        """
+        return [self.extract_topics(text) for text in texts]
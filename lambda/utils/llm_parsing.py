@@ -0,0 +1,159 @@
+import json
+import re
+from .incremental_json import ArrayItemStreamParser
+
+MAX_TOPICS = 5
+CODE_FENCE = re.compile(r'^\s*```[a-zA-Z]*\s*|\s*```\s*$')
+# Answer letters some models give instead of an index: "B", "(b)", "c." or "D)".
+ANSWER_LETTER = re.compile(r'^\(?([A-Za-z])[.):]?$')
+
+_decoder = json.JSONDecoder()
+
+class LLMResponseError(ValueError):
+    """
+    Raised when nothing usable can be recovered from an LLM response. A ValueError, so it is never retried as is.
+    """
+
+class IncompleteQuizError(LLMResponseError):
+    """
+    Raised when a quiz response was damaged (truncated, or with invalid questions) and came up short.
+    quiz holds the questions that survived and missing how many more to ask for, so the caller can top up the
+    quiz instead of regenerating it.
+    """
+    def __init__(self, quiz: dict, missing: int, reason: str):
+        super().__init__(f"{reason}; {len(quiz['questions'])} valid questions, {missing} missing")
+        self.quiz = quiz
+        self.missing = missing
+        self.reason = reason
+
+def load_json_object(content: str) -> dict:
+    """
+    Decodes the JSON object in an LLM response. Well-formed responses take the json.loads fast path; otherwise
+    code fences and any text before the first '{' or after the object's closing brace are ignored.
+    """
+    content = content or ''
+    try:
+        value = json.loads(content)
+    except ValueError:
+        text = CODE_FENCE.sub('', content)
+        start = text.find('{')
+        if start < 0:
+            raise LLMResponseError("Response contains no JSON object")
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+        except ValueError as e:
+            raise LLMResponseError(f"Response is not valid JSON: {str(e)}")
+    if not isinstance(value, dict):
+        raise LLMResponseError(f"Response is a JSON {type(value).__name__}, not an object")
+    return value
+
+def coerce_answer_index(value, answers: list):
+    """
+    Returns the correct answer's index as an int within answers, accepting ints, integral floats, numeric strings,
+    answer letters and the text of the answer itself. Returns None when the value cannot be matched.
+    """
+    index = None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        index = value
+    elif isinstance(value, float) and value.is_integer():
+        index = int(value)
+    elif isinstance(value, str):
+        text = value.strip()
+        letter = ANSWER_LETTER.match(text)
+        if text.lstrip('-').isdigit():
+            index = int(text)
+        elif letter and len(answers) <= 26:
+            index = ord(letter.group(1).lower()) - ord('a')
+        else:
+            matches = [i for i, answer in enumerate(answers) if answer.lower() == text.lower()]
+            index = matches[0] if len(matches) == 1 else None
+    if index is None or not 0 <= index < len(answers):
+        return None
+    return index
+
+def validate_question(item):
+    """
+    Returns the question normalized to {'question': str, 'answers': [str, ...], 'correctAnswerIndex': int}, plus
+    any other fields the model added, or None when it cannot be used.
+    """
+    if not isinstance(item, dict):
+        return None
+    question = item.get('question')
+    answers = item.get('answers')
+    if not isinstance(question, str) or not question.strip() or not isinstance(answers, list):
+        return None
+    answers = [str(answer).strip() for answer in answers if isinstance(answer, (str, int, float)) and not isinstance(answer, bool)]
+    if len(answers) < 2 or not all(answers):
+        return None
+    index = coerce_answer_index(item.get('correctAnswerIndex'), answers)
+    if index is None:
+        return None
+    validated = dict(item)
+    validated.update({'question': question.strip(), 'answers': answers, 'correctAnswerIndex': index})
+    return validated
+
+def parse_quiz(content: str, num_questions: int) -> dict:
+    """
+    Parses and validates a quiz response, repairing what it can: text around the JSON, a truncated final
+    question and correctAnswerIndex given as a string. Returns {'questions': [...]} with the valid questions.
+    Raises IncompleteQuizError when repairs lost questions and fewer than num_questions are left.
+    """
+    truncated = False
+    try:
+        items = load_json_object(content).get('questions')
+        if not isinstance(items, list):
+            raise LLMResponseError("Response has no questions array")
+    except LLMResponseError:
+        # A truncated response still holds every question whose closing brace arrived.
+        items = ArrayItemStreamParser('questions').feed(content or '')
+        truncated = True
+    questions = [question for question in (validate_question(item) for item in items) if question is not None]
+    dropped = len(items) - len(questions)
+    if (truncated or dropped) and len(questions) < num_questions:
+        reason = 'Quiz response was truncated' if truncated else f'Quiz response had {dropped} invalid questions'
+        raise IncompleteQuizError({'questions': questions}, num_questions - len(questions), reason)
+    return {'questions': questions}
+
+def parse_quiz_stream(contents, num_questions: int):
+    """
+    Yields the valid questions of a streamed quiz response as they complete, given its content deltas.
+    Raises IncompleteQuizError at the end if the stream was cut off or held invalid questions and came up short;
+    its quiz is empty because the questions were already yielded.
+    """
+    parser = ArrayItemStreamParser('questions')
+    count = 0
+    dropped = 0
+    for content in contents:
+        for item in parser.feed(content):
+            question = validate_question(item)
+            if question is None:
+                dropped += 1
+                continue
+            count += 1
+            yield question
+    if (dropped or not parser.done) and count < num_questions:
+        reason = 'Quiz stream ended early' if not parser.done else f'Quiz stream had {dropped} invalid questions'
+        raise IncompleteQuizError({'questions': []}, num_questions - count, reason)
+
+def clean_topics(topics) -> list:
+    """
+    Keeps the non-empty string topics, without repeats (ignoring case) and at most MAX_TOPICS of them.
+    """
+    if not isinstance(topics, list):
+        return None
+    cleaned = []
+    seen = set()
+    for topic in topics:
+        if not isinstance(topic, str) or not topic.strip() or topic.strip().lower() in seen:
+            continue
+        seen.add(topic.strip().lower())
+        cleaned.append(topic.strip())
+    return cleaned[:MAX_TOPICS]
+
+def parse_topics(content: str) -> list:
+    topics = clean_topics(load_json_object(content).get('topics', []))
+    if topics is None:
+        raise LLMResponseError("Topic response's topics are not an array")
+    return topics
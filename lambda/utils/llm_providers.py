@@ -0,0 +1,36 @@
+import os
+from .clients import get_client
+from .llm_interface import LLMInterface
+
+DEFAULT_LLM_PROVIDER = 'groq'
+# Backends of the 'router' provider, fastest-first guess; the router reorders them by measured latency.
+LLM_ROUTER_PROVIDERS = os.environ.get('LLM_ROUTER_PROVIDERS', 'groq,openai')
+
+def create_llm_provider(provider_name: str) -> LLMInterface:
+    # Provider modules are imported on demand so a function only loads the SDK it actually uses.
+    if provider_name == 'openai':
+        from .openai_llm import OpenAILLM
+        return OpenAILLM()
+    elif provider_name == 'groq':
+        from .groq_llm import GroqLLM
+        return GroqLLM()
+    elif provider_name == 'stub':
+        from .stub_llm import StubLLM
+        return StubLLM()
+    elif provider_name == 'router':
+        from .llm_router import LLMRouter
+        names = [name.strip() for name in LLM_ROUTER_PROVIDERS.split(',') if name.strip()]
+        if 'router' in names:
+            raise ValueError("LLM_ROUTER_PROVIDERS cannot include 'router'")
+        return LLMRouter([create_llm_provider(name) for name in names])
+    else:
+        raise ValueError(f"Unknown LLM provider: {provider_name}")
+
+def get_llm_provider(provider_name: str) -> LLMInterface:
+    """
+    Returns the provider named by LLM_PROVIDER. The router is kept for the life of the container so its latency
+    and error statistics carry over between warm invocations.
+    """
+    if provider_name == 'router':
+        return get_client('llm-router', lambda: create_llm_provider('router'))
+    return create_llm_provider(provider_name)
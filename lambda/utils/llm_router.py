@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .llm_interface import LLMInterface
+from .retry import get_retry_after, get_status_code, is_retryable
+from .tracing import span, submit_in_context
+
+# Latency and error rates are computed over each backend's last ROUTER_WINDOW calls.
+ROUTER_WINDOW = int(os.environ.get('LLM_ROUTER_WINDOW', '50'))
+ROUTER_MIN_SAMPLES = int(os.environ.get('LLM_ROUTER_MIN_SAMPLES', '5'))
+# A backend whose error rate reaches this is benched for ROUTER_COOLDOWN_SECONDS, as is one answering 429
+# without a Retry-After header.
+ROUTER_MAX_ERROR_RATE = float(os.environ.get('LLM_ROUTER_MAX_ERROR_RATE', '0.5'))
+ROUTER_COOLDOWN_SECONDS = float(os.environ.get('LLM_ROUTER_COOLDOWN_SECONDS', '30'))
+# A request still running after its backend's p95 (never less than HEDGE_MIN_DELAY_SECONDS, and
+# HEDGE_DELAY_SECONDS until there are enough samples) is raced against the next backend.
+HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'true').lower() == 'true'
+HEDGE_DELAY_SECONDS = float(os.environ.get('LLM_HEDGE_DELAY_SECONDS', '8'))
+HEDGE_MIN_DELAY_SECONDS = float(os.environ.get('LLM_HEDGE_MIN_DELAY_SECONDS', '1'))
+ROUTER_MAX_THREADS = int(os.environ.get('LLM_ROUTER_MAX_THREADS', '32'))
+
+def is_rate_limited(error: Exception) -> bool:
+    return get_status_code(error) == 429 or any(cls.__name__ == 'RateLimitError' for cls in type(error).__mro__)
+
+class BackendStats:
+    """
+    Rolling latency and error record of one backend, plus the time until which it is benched.
+    """
+    def __init__(self, window: int = ROUTER_WINDOW, clock=time.monotonic):
+        self.clock = clock
+        self.samples = deque(maxlen=window)
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.samples.append((latency, True))
+
+    def record_failure(self, cooldown: float = None) -> None:
+        with self._lock:
+            self.samples.append((None, False))
+            if cooldown is None and len(self.samples) >= ROUTER_MIN_SAMPLES and self._error_rate() >= ROUTER_MAX_ERROR_RATE:
+                cooldown = ROUTER_COOLDOWN_SECONDS
+                # Start over after the cooldown so the backend is judged on fresh calls.
+                self.samples.clear()
+            if cooldown is not None:
+                self.cooldown_until = max(self.cooldown_until, self.clock() + cooldown)
+
+    def _error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._error_rate()
+
+    def percentile(self, q: float):
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    @property
+    def p50(self):
+        return self.percentile(0.5)
+
+    @property
+    def p95(self):
+        return self.percentile(0.95)
+
+    @property
+    def successes(self) -> int:
+        with self._lock:
+            return sum(1 for _, ok in self.samples if ok)
+
+    def is_healthy(self) -> bool:
+        return self.clock() >= self.cooldown_until
+
+    def snapshot(self) -> dict:
+        return {'p50': self.p50, 'p95': self.p95, 'errorRate': self.error_rate, 'healthy': self.is_healthy()}
+
+class LLMRouter(LLMInterface):
+    """
+    Spreads requests over several providers. Each request goes to the healthy backend with the lowest rolling
+    p50 latency (backends without samples yet are tried first, in the order given). Transient failures, 429s
+    above all, fail over to the next backend and bench the one that failed; a request that outlives its
+    backend's p95 is hedged on the next backend and the first answer wins. Fatal errors are raised as they are.
+    Streamed quizzes fail over only until the first question has been yielded, and are not hedged.
+    """
+    PROVIDER = 'router'
+
+    def __init__(self, backends: list, hedge: bool = HEDGE_ENABLED, clock=time.monotonic):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.clock = clock
+        self.stats = [BackendStats(clock=clock) for _ in self.backends]
+        # chunk_token_budget takes the smallest context window of these models.
+        self.MODEL = ','.join(backend.MODEL for backend in self.backends)
+        self.executor = ThreadPoolExecutor(max_workers=ROUTER_MAX_THREADS)
+
+    def rank(self) -> list:
+        def key(index):
+            stats = self.stats[index]
+            p50 = stats.p50
+            return (not stats.is_healthy(), p50 if p50 is not None else 0.0, index)
+        return sorted(range(len(self.backends)), key=key)
+
+    def hedge_delay(self, index: int) -> float:
+        stats = self.stats[index]
+        if stats.successes < ROUTER_MIN_SAMPLES:
+            return HEDGE_DELAY_SECONDS
+        return max(HEDGE_MIN_DELAY_SECONDS, stats.p95)
+
+    def report(self) -> dict:
+        return {backend.PROVIDER: stats.snapshot() for backend, stats in zip(self.backends, self.stats)}
+
+    def _record_failure(self, index: int, error: Exception) -> None:
+        cooldown = None
+        if is_rate_limited(error):
+            retry_after = get_retry_after(error)
+            cooldown = retry_after if retry_after is not None else ROUTER_COOLDOWN_SECONDS
+        self.stats[index].record_failure(cooldown)
+        print(f"LLM backend {self.backends[index].PROVIDER} failed. Error: {str(error)}")
+
+    def _call(self, index: int, operation: str, *args):
+        start = self.clock()
+        try:
+            with span(f'llm.{self.backends[index].PROVIDER}.{operation}'):
+                result = getattr(self.backends[index], operation)(*args)
+        except Exception as e:
+            self._record_failure(index, e)
+            raise
+        self.stats[index].record_success(self.clock() - start)
+        return result
+
+    def _route(self, operation: str, *args):
+        remaining = self.rank()
+        in_flight = {}
+        hedged = False
+        last_error = None
+
+        def launch():
+            index = remaining.pop(0)
+            in_flight[submit_in_context(self.executor, self._call, index, operation, *args)] = index
+            return index
+
+        primary = launch()
+        while in_flight:
+            timeout = None
+            if self.hedge and not hedged and remaining and len(in_flight) == 1:
+                timeout = self.hedge_delay(primary)
+            done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                index = launch()
+                print(f"Hedging slow {self.backends[primary].PROVIDER} request on {self.backends[index].PROVIDER}.")
+                continue
+            for future in done:
+                del in_flight[future]
+                try:
+                    return future.result()
+                except Exception as e:
+                    if not is_retryable(e):
+                        raise
+                    last_error = e
+            if not in_flight and remaining:
+                primary = launch()
+        raise last_error
+
+    def generate_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None) -> dict:
+        return self._route('generate_quiz', notes, num_questions, topics, exclude)
+
+    def extract_topics(self, text: str) -> list:
+        return self._route('extract_topics', text)
+
+    def extract_topics_batch(self, texts: list) -> list:
+        return self._route('extract_topics_batch', texts)
+
+    def stream_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None):
+        last_error = None
+        for index in self.rank():
+            start = self.clock()
+            started = False
+            try:
+                for question in self.backends[index].stream_quiz(notes, num_questions, topics, exclude):
+                    started = True
+                    yield question
+            except Exception as e:
+                self._record_failure(index, e)
+                if started or not is_retryable(e):
+                    raise
+                last_error = e
+                continue
+            self.stats[index].record_success(self.clock() - start)
+            return
+        raise last_error
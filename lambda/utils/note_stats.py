@@ -0,0 +1,36 @@
+import hashlib
+
+# Rough average for English text across the tokenizers we use; only used for budgeting, never for billing.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def compute_note_stats(text: str, page_count: int) -> dict:
+    """
+    Summarizes an OCR result as S3 user metadata (string values, lowercase keys).
+    Stored on processed/{key} so consumers can size a note with a HEAD request instead of downloading it.
+    """
+    return {
+        'word-count': str(len(text.split())),
+        'char-count': str(len(text)),
+        'token-estimate': str(estimate_tokens(text)),
+        'page-count': str(page_count),
+        'content-sha256': hashlib.sha256(text.encode('utf-8')).hexdigest()
+    }
+
+def parse_note_stats(metadata: dict) -> dict:
+    """
+    Reads the statistics written by compute_note_stats back from S3 object metadata.
+    Returns None for objects written before the statistics were recorded.
+    """
+    try:
+        return {
+            'wordCount': int(metadata['word-count']),
+            'charCount': int(metadata['char-count']),
+            'tokenEstimate': int(metadata['token-estimate']),
+            'pageCount': int(metadata['page-count']),
+            'contentSha256': metadata['content-sha256']
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
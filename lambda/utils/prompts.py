@@ -0,0 +1,89 @@
+class PromptTemplate:
+    """
+    A prompt compiled once per container: a static system message, sent byte-for-byte identical on every request
+    so provider-side prompt caching can reuse it, followed by a user message rendered from format fields.
+    The id (name/version) is part of the LLM cache key, so bump the version whenever the text changes.
+    """
+    def __init__(self, name: str, version: int, system: str, user: str):
+        self.name = name
+        self.version = version
+        self.id = f'{name}/v{version}'
+        self.system = system
+        self.user = user
+
+    def render(self, **fields) -> list:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user.format(**fields)}
+        ]
+
+# The number of questions and the topics change from request to request, so they go last: the system prompt and
+# the notes, which retries, chunks and top-ups of the same note share, form the cacheable prefix.
+QUIZ_PROMPT = PromptTemplate('quiz', 2, (
+    "Generate a quiz in JSON format based on the provided notes (found inside the triple quotes). "
+    "The quiz should include question text and multiple-choice answers derived from the notes content. "
+    "When you come up with the answer options, try to keep them realistic. "
+    "The number of questions to write is given after the notes. "
+    "If topics to focus on are given too and the notes don't touch on them, feel free to return an object with no (or very few) questions. "
+    "Feel free to make the questions difficult, but make sure they draw from the notes and are useful for the user. "
+    "Do not mention \"the notes\" in any form in the questions or answers. For example do not say \"according to the notes\" or, \"as indicated by the notes\". "
+    "Only respond in the following format: \n"
+    "{\n"
+    "  \"questions\": [\n"
+    "    {\n"
+    "      \"question\": \"string\",\n"
+    "      \"answers\": \"string[]\",\n"
+    "      \"correctAnswerIndex\": \"number\"\n"
+    "    }\n"
+    "  ]\n"
+    "}\n"
+    "Only respond in the above format. "
+    "Do not put your response in quotes."
+), "Notes: '''{notes}'''\n\n{request}")
+
+TOPICS_PROMPT = PromptTemplate('topics', 2, (
+    "Extract topics from the provided text. "
+    "The topics should be relevant and concise, capturing only the main ideas and themes. "
+    "Be picky, and if there aren't clear topics, don't feel obligated to include them. Include a max of 5 topics. Fewer topics is better. "
+    "If there are no topics, respond with an empty array. "
+    "If there are too many topics, respond with a truncated list of the 5 most relevant topics. Avoid being overly vague with the topics. "
+    "Only respond with a JSON object containing a list of topics in the following format: \n"
+    "{\n"
+    "  \"topics\": [\"Topic1\", \"Topic2\", \"Topic3\"]\n"
+    "}"
+), "Text: '''{text}'''")
+
+TOPIC_BATCH_PROMPT = PromptTemplate('topic-batch', 1, (
+    "Extract topics from each of the provided documents independently. "
+    "The topics should be relevant and concise, capturing only the main ideas and themes of that document. "
+    "Be picky, and if there aren't clear topics, don't feel obligated to include them. Include a max of 5 topics per document. Fewer topics is better. "
+    "If a document has no topics, give it an empty array. Avoid being overly vague with the topics. "
+    "Only respond with a JSON object containing one entry per document, using the document numbers as ids, in the following format: \n"
+    "{\n"
+    "  \"documents\": [\n"
+    "    {\"id\": 1, \"topics\": [\"Topic1\", \"Topic2\"]},\n"
+    "    {\"id\": 2, \"topics\": []}\n"
+    "  ]\n"
+    "}"
+), "{documents}")
+
+def quiz_request(num_questions: int, topics: list, exclude: list = None) -> str:
+    if topics:
+        formatted_topics = ", ".join(f"'{topic}'" for topic in topics)
+        request = f"Write exactly {num_questions} questions if possible. Focus on the topics: {formatted_topics}."
+    else:
+        request = f"Write exactly {num_questions} questions."
+    if exclude:
+        listed = "\n".join(f"- {question}" for question in exclude)
+        request += f"\nDo not repeat or rephrase any of these existing questions:\n{listed}"
+    return request
+
+def build_quiz_messages(notes: list, num_questions: int, topics: list, exclude: list = None) -> list:
+    return QUIZ_PROMPT.render(notes=" ".join(notes), request=quiz_request(num_questions, topics, exclude))
+
+def build_topic_messages(text: str) -> list:
+    return TOPICS_PROMPT.render(text=text)
+
+def build_topic_batch_messages(texts: list) -> list:
+    documents = "\n\n".join(f"Document {index + 1}:\n'''{text}'''" for index, text in enumerate(texts))
+    return TOPIC_BATCH_PROMPT.render(documents=documents)
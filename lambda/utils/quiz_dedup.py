@@ -0,0 +1,205 @@
+import functools
+import os
+import re
+import zlib
+from .concurrency import map_concurrently
+
+# Questions whose word sets (question plus correct answer, stopwords dropped) have a Jaccard similarity of at least
+# this are treated as the same question. Set it above 1 to turn deduplication off.
+QUIZ_DEDUP_THRESHOLD = float(os.environ.get('QUIZ_DEDUP_THRESHOLD', '0.7'))
+# Existing questions listed in a top-up prompt so the model avoids them.
+MAX_TOP_UP_EXCLUDES = int(os.environ.get('MAX_TOP_UP_EXCLUDES', '50'))
+MAX_PARALLEL_TOP_UPS = int(os.environ.get('MAX_PARALLEL_TOP_UPS', '10'))
+
+# MinHash signatures of NUM_PERMUTATIONS values, split into LSH_BANDS bands of two: two questions become candidates
+# when any band matches, which catches pairs at a Jaccard similarity of 0.7 with probability 0.9988. Candidates are
+# confirmed exactly, so more permutations would mostly cut false candidates, at a higher hashing cost.
+NUM_PERMUTATIONS = 20
+LSH_BANDS = 10
+
+WORD = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    'a an and are as at be by can did do does for from has have how in is it its of on or that the this to was '
+    'were what when where which who whom why will with would'.split()
+)
+# Phrasing that cites the notes as a source, which the prompt forbids. "Which of the notes in a C major triad..."
+# is a fine question, so a bare "the notes" is not enough.
+LOW_QUALITY = re.compile(
+    r'\b(according to|as (indicated|stated|described|mentioned|shown) (in|by)|based on|in|from) (the|these|your) notes\b'
+    r'|\baccording to the (text|passage)\b',
+    re.IGNORECASE
+)
+
+@functools.lru_cache(maxsize=None)
+def hash_parameters() -> tuple:
+    """
+    Returns (multipliers, offsets, band weights) for multiply-shift hashing: odd 64-bit multipliers, keeping the
+    top 32 bits of the wrapped product. NumPy is imported here, on the first deduplication, rather than with the
+    module: quizGeneration imports this through quiz_jobs but only deduplicates when it assembles a queued job.
+    """
+    import numpy as np
+    rng = np.random.RandomState(1)
+    multipliers = rng.randint(1, 2 ** 62, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+    offsets = rng.randint(0, 2 ** 62, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+    band_weights = rng.randint(1, 2 ** 62, size=NUM_PERMUTATIONS // LSH_BANDS, dtype=np.int64).astype(np.uint64)
+    return multipliers, offsets, band_weights
+
+def question_words(question: dict) -> frozenset:
+    """
+    The words a question is compared on: its text and its correct answer, lowercased, without stopwords.
+    """
+    answers = question.get('answers') or []
+    index = question.get('correctAnswerIndex')
+    answer = answers[index] if isinstance(index, int) and 0 <= index < len(answers) else ''
+    words = WORD.findall(f"{question.get('question', '')} {answer}".lower())
+    return frozenset(word for word in words if word not in STOPWORDS)
+
+def is_low_quality(question: dict) -> bool:
+    """
+    Flags questions that repeat an answer option or point at "the notes", which the prompt forbids.
+    """
+    answers = [str(answer).strip().lower() for answer in question.get('answers') or []]
+    if len(set(answers)) < len(answers):
+        return True
+    return any(LOW_QUALITY.search(str(text)) for text in [question.get('question', '')] + answers)
+
+def minhash_signatures(word_sets: list):
+    """
+    Returns an (n, NUM_PERMUTATIONS) array of MinHash values, computed for all sets in one vectorized pass.
+    """
+    import numpy as np
+    multipliers, offsets, _ = hash_parameters()
+    word_sets = [words or frozenset(['']) for words in word_sets]
+    lengths = np.fromiter((len(words) for words in word_sets), dtype=np.int64, count=len(word_sets))
+    # Questions share most of their words, so each distinct word is hashed and permuted once.
+    vocabulary = {}
+    ids = np.fromiter((vocabulary.setdefault(word, len(vocabulary)) for words in word_sets for word in words),
+                      dtype=np.int64, count=int(lengths.sum()))
+    hashes = np.fromiter((zlib.crc32(word.encode('utf-8')) for word in vocabulary), dtype=np.uint64,
+                         count=len(vocabulary))
+    permuted = (multipliers[:, None] * hashes[None, :] + offsets[:, None]) >> np.uint64(32)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.minimum.reduceat(permuted[:, ids], starts, axis=1).T
+
+def candidate_pairs(signatures, threshold: float) -> tuple:
+    """
+    Returns arrays (first, second), first < second, of the pairs whose signatures agree on at least one LSH band
+    and on enough values to plausibly reach threshold: a pair at the threshold survives with probability 0.9986.
+    """
+    import numpy as np
+    _, _, band_weights = hash_parameters()
+    n = len(signatures)
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    codes = []
+    for band in range(LSH_BANDS):
+        keys = signatures[:, band * rows:(band + 1) * rows] @ band_weights
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # Equal keys are adjacent once sorted; the offset-th pass pairs each question with the one offset behind it.
+        offset = 1
+        while offset < n:
+            same = sorted_keys[offset:] == sorted_keys[:-offset]
+            if not same.any():
+                break
+            first, second = order[:-offset][same], order[offset:][same]
+            codes.append(np.minimum(first, second) * n + np.maximum(first, second))
+            offset += 1
+    if not codes:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    codes = np.unique(np.concatenate(codes))
+    first, second = codes // n, codes % n
+    # Words common to many questions put unrelated pairs in the same bucket; most agree on few signature values.
+    agreement = (signatures[first] == signatures[second]).mean(axis=1)
+    plausible = agreement >= threshold - 0.35
+    return first[plausible], second[plausible]
+
+def find_duplicates(questions: list, threshold: float = QUIZ_DEDUP_THRESHOLD) -> set:
+    """
+    Returns the indexes of questions that nearly repeat an earlier kept question. Candidates come from MinHash
+    LSH and are confirmed with the exact Jaccard similarity, so no false positives get through.
+    """
+    return set(find_originals(questions, threshold))
+
+def find_originals(questions: list, threshold: float = QUIZ_DEDUP_THRESHOLD) -> dict:
+    """
+    Same as find_duplicates, but maps each duplicate's index to the index of the kept question it repeats.
+    """
+    if len(questions) < 2 or threshold > 1:
+        return {}
+    import numpy as np
+    word_sets = [question_words(question) for question in questions]
+    first, second = candidate_pairs(minhash_signatures(word_sets), threshold)
+    originals = {}
+    # Pairs are visited by their later question, so whether i is itself a duplicate is settled before any (i, j).
+    for position in np.lexsort((first, second)):
+        i, j = int(first[position]), int(second[position])
+        if i in originals or j in originals:
+            continue
+        union = len(word_sets[i] | word_sets[j])
+        if union and len(word_sets[i] & word_sets[j]) / union >= threshold:
+            originals[j] = i
+    return originals
+
+def filter_questions(parts: list) -> tuple:
+    """
+    Drops low-quality questions and near-duplicates (keeping the first) across the parts of a quiz.
+    parts is a list of question lists. Returns (kept parts, removed count per part, and per part the kept
+    questions, from any part, that its removed duplicates repeated).
+    """
+    flat = [(index, question) for index, questions in enumerate(parts) for question in questions]
+    low_quality = {position for position, (_, question) in enumerate(flat) if is_low_quality(question)}
+    candidates = [position for position in range(len(flat)) if position not in low_quality]
+    originals = find_originals([flat[position][1] for position in candidates])
+    duplicates = {candidates[j]: candidates[i] for j, i in originals.items()}
+    kept = [[] for _ in parts]
+    removed = [0] * len(parts)
+    repeated = [[] for _ in parts]
+    for position, (index, question) in enumerate(flat):
+        if position in low_quality or position in duplicates:
+            removed[index] += 1
+            if position in duplicates:
+                repeated[index].append(flat[duplicates[position]][1])
+        else:
+            kept[index].append(question)
+    return kept, removed, repeated
+
+def refine_quiz(parts: list, top_up=None) -> tuple:
+    """
+    Deduplicates the questions of a quiz's parts and, for each part that lost questions, asks top_up once for
+    the shortfall: top_up(index, num_questions, exclude) returns new questions for part index, avoiding the
+    question texts in exclude. parts is a list of (requested count, questions).
+    Returns ({'questions': [...]}, stats) with the questions grouped by part, in part order.
+    """
+    kept, removed, repeated = filter_questions([questions for _, questions in parts])
+    shortfalls = [(index, min(removed[index], requested - len(kept[index])))
+                  for index, (requested, _) in enumerate(parts)]
+    shortfalls = [(index, shortfall) for index, shortfall in shortfalls if shortfall > 0]
+    stats = {'questionsRemoved': sum(removed), 'topUpRequestedQuestions': 0, 'topUpAddedQuestions': 0}
+
+    if shortfalls and top_up is not None:
+        def request(item):
+            index, shortfall = item
+            # The questions its duplicates repeated, often from other parts, are the likeliest to come back.
+            texts = [question['question'] for question in repeated[index] + kept[index]]
+            exclude = list(dict.fromkeys(texts))[:MAX_TOP_UP_EXCLUDES]
+            return top_up(index, shortfall, exclude)
+
+        outcomes = map_concurrently(request, shortfalls, MAX_PARALLEL_TOP_UPS)
+        extra = [[] for _ in parts]
+        for (index, shortfall), (questions, error) in zip(shortfalls, outcomes):
+            stats['topUpRequestedQuestions'] += shortfall
+            if error is not None:
+                print(f"Error: top-up of part {index} failed. Error: {str(error)}")
+                continue
+            extra[index] = list(questions)[:shortfall]
+        # Top-up questions are checked against everything kept so far; only new, distinct ones are added.
+        refined, _, _ = filter_questions(kept + extra)
+        for index in range(len(parts)):
+            added = refined[len(parts) + index]
+            stats['topUpAddedQuestions'] += len(added)
+            kept[index] = kept[index] + added
+
+    questions = [question for part in kept for question in part]
+    print(f"Removed {stats['questionsRemoved']} duplicate or low-quality questions; "
+          f"topped up {stats['topUpAddedQuestions']} of {stats['topUpRequestedQuestions']}.")
+    return {'questions': questions}, stats
@@ -0,0 +1,97 @@
+import json
+from .concurrency import map_concurrently
+from .quiz_dedup import refine_quiz
+from .retry import retry_call
+from .s3_utils import (MAX_PARALLEL_FETCHES, get_s3_object_as_text, head_s3_object_if_exists, list_s3_keys, put_s3_object,
+                       put_s3_object_if_absent)
+
+# Layout of a quiz job in the generated-quizzes bucket:
+#   quizzes/{job_id}/job.json          what the orchestrator enqueued, then the outcome once assembled
+#   quizzes/{job_id}/parts/{i:03d}.json one per work item, written by quizGeneration
+#   quizzes/{job_id}.json              the assembled quiz
+#   quizzes/{job_id}.progress.json     where the streamed progress parts live, for the frontend
+
+def job_manifest_key(job_id: str) -> str:
+    return f'quizzes/{job_id}/job.json'
+
+def parts_prefix(job_id: str) -> str:
+    return f'quizzes/{job_id}/parts/'
+
+def part_key(job_id: str, index: int) -> str:
+    return f'{parts_prefix(job_id)}{index:03d}.json'
+
+def quiz_key(job_id: str) -> str:
+    return f'quizzes/{job_id}.json'
+
+def write_json(bucket_name: str, key: str, value) -> None:
+    retry_call('s3', put_s3_object, bucket_name, key, json.dumps(value))
+
+def write_json_if_absent(bucket_name: str, key: str, value) -> bool:
+    return retry_call('s3', put_s3_object_if_absent, bucket_name, key, json.dumps(value))
+
+def read_json(bucket_name: str, key: str):
+    return json.loads(retry_call('s3', get_s3_object_as_text, bucket_name, key))
+
+def write_progress_manifest(bucket_name: str, job_id: str, status: str, num_questions: int, progress_prefix: str,
+                            num_parts: int) -> None:
+    """
+    Tells the frontend where the streamed question parts of a job live: {partsPrefix}000.jsonl up to numParts - 1.
+    """
+    manifest = {
+        'status': status,
+        'numQuestions': num_questions,
+        'partsPrefix': progress_prefix,
+        'numParts': num_parts
+    }
+    write_json(bucket_name, f'quizzes/{job_id}.progress.json', manifest)
+
+def assemble_quiz(bucket_name: str, job_id: str, top_up=None):
+    """
+    Combines the parts of a job into quizzes/{job_id}.json, in part order, once every part is in, dropping
+    near-duplicate questions. top_up(note_key, num_questions, exclude), when given, is asked once per note that
+    lost questions for the shortfall. Returns None while parts are missing, otherwise the job manifest updated
+    with the outcome. Every worker calls this after writing its part, so several can see all parts at once: the
+    quiz is written with If-None-Match: *, and only the worker whose write lands updates the manifest, so its
+    totals always describe the stored quiz. The others, and any worker that finds the quiz already there, return
+    None without generating top-ups.
+    """
+    if retry_call('s3', head_s3_object_if_exists, bucket_name, quiz_key(job_id)) is not None:
+        return None
+    manifest = read_json(bucket_name, job_manifest_key(job_id))
+    keys = sorted(list_s3_keys(bucket_name, parts_prefix(job_id)))
+    if len(keys) < manifest['numParts']:
+        return None
+
+    parts = []
+    for part, error in map_concurrently(lambda key: read_json(bucket_name, key), keys, MAX_PARALLEL_FETCHES):
+        if error is not None:
+            raise error
+        parts.append(part)
+
+    generated = [part for part in parts if 'error' not in part]
+    quiz, dedup_stats = refine_quiz(
+        [(part['numQuestions'], part['questions']) for part in generated],
+        None if top_up is None else lambda index, n, exclude: top_up(generated[index]['noteKey'], n, exclude)
+    )
+    questions = quiz['questions']
+    failed_notes = [
+        {'noteKey': part['noteKey'], 'numQuestions': part['numQuestions'], 'error': part['error'], 'jobUuid': job_id}
+        for part in parts if 'error' in part
+    ]
+    status = 'failed' if parts and len(failed_notes) == len(parts) else 'complete'
+    if status == 'complete' and not write_json_if_absent(bucket_name, quiz_key(job_id), {'questions': questions}):
+        print(f"Job {job_id} was already assembled by another worker; keeping its quiz.")
+        return None
+
+    manifest.update({
+        'status': status,
+        'totalLLMRequestedQuestions': sum(part['numQuestions'] for part in generated) + dedup_stats['topUpRequestedQuestions'],
+        'totalActualQuestions': len(questions),
+        'questionsRemoved': dedup_stats['questionsRemoved'],
+        'failedNotes': failed_notes
+    })
+    write_json(bucket_name, job_manifest_key(job_id), manifest)
+    if manifest.get('progressPrefix'):
+        write_progress_manifest(bucket_name, job_id, status, manifest['numQuestions'], manifest['progressPrefix'],
+                                manifest['numParts'])
+    return manifest
@@ -0,0 +1,65 @@
+import contextvars
+import json
+import threading
+from .chunking import normalize_question
+from .s3_utils import put_s3_object
+from .tracing import span
+
+class QuizProgressWriter:
+    """
+    Publishes the questions of one quiz part as JSON Lines while they are being generated so the frontend can
+    show them before the job finishes. S3 has no append, so the object is rewritten whenever questions arrive.
+    The writes happen on a background thread, off the stream being consumed: questions that arrive while a PUT
+    is in flight are coalesced into the next one. Call close() before returning so the last write lands.
+    The progress file is provisional: the assembled quizzes/{job_id}.json stays authoritative.
+    """
+    def __init__(self, bucket_name: str, key: str):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.lines = []
+        self.seen = set()
+        self.puts = 0
+        self._written = 0
+        self._writing = False
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def add(self, questions: list) -> None:
+        with self._lock:
+            for question in questions:
+                normalized = normalize_question(question)
+                if normalized in self.seen:
+                    continue
+                self.seen.add(normalized)
+                self.lines.append(json.dumps(question))
+            if self._writing or len(self.lines) == self._written:
+                return
+            self._writing = True
+        # The copied context keeps the PUT spans in the invocation's trace.
+        threading.Thread(target=contextvars.copy_context().run, args=(self._write_pending,), daemon=True).start()
+
+    def _write_pending(self) -> None:
+        while True:
+            with self._lock:
+                if len(self.lines) == self._written:
+                    self._writing = False
+                    self._idle.notify_all()
+                    return
+                count = len(self.lines)
+                content = '\n'.join(self.lines) + '\n'
+            try:
+                with span('s3.put_progress'):
+                    put_s3_object(self.bucket_name, self.key, content)
+            except Exception as e:
+                # Progress is best effort; the final quiz is still written by the orchestrator.
+                print(f"Error: could not write quiz progress to {self.key}. Error: {str(e)}")
+            with self._lock:
+                self._written = count
+                self.puts += 1
+
+    def close(self, timeout: float = None) -> None:
+        """
+        Waits until every added question has been written, or for at most timeout seconds.
+        """
+        with self._idle:
+            self._idle.wait_for(lambda: not self._writing, timeout)
@@ -1,16 +1,242 @@
+import random
+import threading
 import time
 from botocore.exceptions import ClientError
+from .tracing import span
 
 MAX_RETRIES = 5
-RETRY_DELAY = 15  # seconds
+BASE_DELAY = 0.5  # seconds
+MAX_DELAY = 20  # seconds
+# Time kept back from the Lambda deadline so the handler can still record a failure after giving up.
+DEADLINE_SAFETY_MARGIN = 2.0  # seconds
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30.0  # seconds
+
+RETRYABLE_AWS_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'TooManyRequestsException',
+    'RequestLimitExceeded', 'RequestThrottled', 'RequestThrottledException', 'SlowDown',
+    'ProvisionedThroughputExceededException', 'EC2ThrottledException', 'TransactionInProgressException',
+    'RequestTimeout', 'RequestTimeoutException', 'InternalError', 'InternalFailure', 'ServiceUnavailable',
+    'ServiceException', 'PriorRequestNotComplete', 'TooManyRequests'
+}
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+# Matched by class name so the Groq, OpenAI, Google and botocore SDKs need not be importable here.
+RETRYABLE_EXCEPTION_NAMES = {
+    'APIConnectionError', 'APITimeoutError', 'RateLimitError', 'InternalServerError', 'Timeout',
+    'ServiceUnavailableError', 'TryAgain', 'EndpointConnectionError', 'ConnectionClosedError',
+    'ReadTimeoutError', 'ConnectTimeoutError', 'ServiceUnavailable', 'TooManyRequests', 'ResourceExhausted',
+    'DeadlineExceeded', 'GatewayTimeout', 'BadGateway'
+}
+
+class CircuitOpenError(Exception):
+    """
+    Raised without calling the downstream service while its circuit breaker is open.
+    """
+
+def get_status_code(error: Exception):
+    if isinstance(error, ClientError):
+        return error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    for attribute in ('status_code', 'http_status', 'code'):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Classifies an error as transient (throttling, timeouts, 5xx) or fatal (bad input, missing keys, bad JSON).
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, ClientError):
+        if error.response.get('Error', {}).get('Code') in RETRYABLE_AWS_ERROR_CODES:
+            return True
+        return get_status_code(error) in RETRYABLE_STATUS_CODES
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in RETRYABLE_EXCEPTION_NAMES for cls in type(error).__mro__):
+        return True
+    return get_status_code(error) in RETRYABLE_STATUS_CODES
+
+def get_headers(error: Exception) -> dict:
+    if isinstance(error, ClientError):
+        return error.response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or getattr(error, 'headers', None)
+    return headers or {}
+
+def get_retry_after(error: Exception, now: float = None):
+    """
+    Returns the server-requested wait in seconds from a Retry-After header (delta-seconds or HTTP date), if any.
+    """
+    headers = get_headers(error)
+    value = None
+    for name in ('retry-after', 'Retry-After'):
+        if name in headers:
+            value = headers[name]
+            break
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    # email.utils costs ~25 ms at import, so it is only loaded for the rare HTTP-date form.
+    from email.utils import parsedate_to_datetime
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (time.time() if now is None else now))
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures and rejects calls for reset_timeout seconds,
+    then lets a single trial call through (half-open) to decide whether to close again.
+    """
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self.trial_in_flight = False
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(service: str) -> CircuitBreaker:
+    """
+    Returns the container-wide circuit breaker for a downstream service, creating it on first use.
+    """
+    with _circuit_breakers_lock:
+        if service not in _circuit_breakers:
+            _circuit_breakers[service] = CircuitBreaker()
+        return _circuit_breakers[service]
+
+_invocation_deadline = None
+
+def set_invocation_deadline(context, clock=time.monotonic) -> None:
+    """
+    Bounds every retry loop of the current invocation by the time Lambda has left to run.
+    Call at the top of each lambda_handler; a context without get_remaining_time_in_millis clears the deadline.
+    """
+    global _invocation_deadline
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        _invocation_deadline = None
+    else:
+        _invocation_deadline = clock() + context.get_remaining_time_in_millis() / 1000.0
+
+class RetryPolicy:
+    """
+    Retries transient failures with decorrelated-jitter exponential backoff, honoring Retry-After, the
+    invocation deadline and the per-service circuit breaker. Fatal errors are raised on the first attempt.
+    clock, sleep and rng are injectable so the policy can be driven by a fake clock.
+    """
+    def __init__(self, service: str = 'default', max_attempts: int = MAX_RETRIES, base_delay: float = BASE_DELAY,
+                 max_delay: float = MAX_DELAY, circuit_breaker: CircuitBreaker = None,
+                 clock=time.monotonic, sleep=time.sleep, rng: random.Random = None):
+        self.service = service
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker(service)
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+
+    def next_delay(self, previous_delay: float) -> float:
+        return min(self.max_delay, self.rng.uniform(self.base_delay, previous_delay * 3))
+
+    def remaining_time(self):
+        if _invocation_deadline is None:
+            return None
+        return _invocation_deadline - self.clock() - DEADLINE_SAFETY_MARGIN
+
+    def call(self, func, *args, **kwargs):
+        # One span per call, named after the service and function, covering every attempt and backoff.
+        with span(f"{self.service}.{getattr(func, '__name__', 'call')}") as current:
+            return self._call(current, func, *args, **kwargs)
+
+    def _call(self, current, func, *args, **kwargs):
+        delay = self.base_delay
+        for attempt in range(self.max_attempts):
+            if not self.circuit_breaker.allow_request():
+                raise CircuitOpenError(f"Circuit for {self.service} is open; not calling {getattr(func, '__name__', func)}.")
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The service answered, it just rejected this request, so it counts as healthy.
+                    self.circuit_breaker.record_success()
+                    print(f"Operation failed with a non-retryable error. Error: {str(e)}")
+                    raise
+                self.circuit_breaker.record_failure()
+                if attempt == self.max_attempts - 1:
+                    print(f"Operation failed after {self.max_attempts} attempts. Error: {str(e)}")
+                    raise
+
+                delay = self.next_delay(delay)
+                retry_after = get_retry_after(e)
+                wait = max(delay, retry_after) if retry_after is not None else delay
+                remaining = self.remaining_time()
+                if remaining is not None and wait > remaining:
+                    print(f"Attempt {attempt + 1} failed and the invocation deadline leaves no time to retry. Error: {str(e)}")
+                    raise
+                print(f"Attempt {attempt + 1} failed. Retrying in {wait:.2f} seconds...")
+                current.set(retries=attempt + 1)
+                self.sleep(wait)
+            else:
+                self.circuit_breaker.record_success()
+                return result
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+def get_retry_policy(service: str) -> RetryPolicy:
+    with _policies_lock:
+        if service not in _policies:
+            _policies[service] = RetryPolicy(service)
+        return _policies[service]
+
+def retry_call(service: str, func, *args, **kwargs):
+    """
+    Calls func under the shared retry policy and circuit breaker of a downstream service ('s3', 'lambda', ...).
+    """
+    return get_retry_policy(service).call(func, *args, **kwargs)
 
 def retry_operation(func, *args, **kwargs):
-    for attempt in range(MAX_RETRIES):
-        try:
-            return func(*args, **kwargs)
-        except (ClientError, Exception) as e:
-            if attempt == MAX_RETRIES - 1:
-                print(f"Operation failed after {MAX_RETRIES} attempts. Error: {str(e)}")
-                raise
-            print(f"Attempt {attempt + 1} failed. Retrying in {RETRY_DELAY} seconds...")
-            time.sleep(RETRY_DELAY)
+    return retry_call('default', func, *args, **kwargs)
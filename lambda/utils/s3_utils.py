@@ -1,6 +1,74 @@
-import boto3
+import os
+import threading
+from collections import OrderedDict
+from botocore.exceptions import ClientError
+from .clients import get_boto3_client
+from .concurrency import map_concurrently
+from .tracing import span
 
-s3_client = boto3.client('s3')
+s3_client = get_boto3_client('s3')
+
+# Upper bound on the note text kept in memory across warm invocations of the same container.
+NOTE_CACHE_MAX_BYTES = int(os.environ.get('NOTE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+MAX_PARALLEL_FETCHES = int(os.environ.get('MAX_PARALLEL_S3_FETCHES', '10'))
+
+class LruTextCache:
+    """
+    Thread-safe LRU cache of decoded S3 objects and their ETags, bounded by the total size of the cached text.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns (etag, value), or None when the key is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[:2]
+
+    def put(self, key, value: str, etag: str = None) -> None:
+        # Sized as UTF-8, the encoding the text arrived in, so max_bytes bounds bytes rather than characters.
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[2]
+            self._entries[key] = (etag, value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+note_cache = LruTextCache(NOTE_CACHE_MAX_BYTES)
+
+def is_missing_key_error(error: Exception) -> bool:
+    # GETs report a missing key as NoSuchKey, HEADs (which have no response body) as a bare 404.
+    return isinstance(error, ClientError) and error.response['Error']['Code'] in ('NoSuchKey', '404', 'NotFound')
+
+def is_not_modified_error(error: Exception) -> bool:
+    # A conditional GET whose If-None-Match still matches comes back as a bodiless 304.
+    return isinstance(error, ClientError) and (
+        error.response['Error']['Code'] in ('304', 'NotModified')
+        or error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 304
+    )
+
+def is_precondition_failed_error(error: Exception) -> bool:
+    # A conditional PUT loses with 412 when the key already exists, or 409 while a competing write is in flight.
+    return isinstance(error, ClientError) and error.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict')
 
 def get_s3_object(bucket_name: str, key: str) -> bytes:
     """
@@ -11,26 +79,139 @@ def get_s3_object(bucket_name: str, key: str) -> bytes:
     body = response['Body'].read()
     return body
 
+def get_s3_object_with_content_type(bucket_name: str, key: str) -> tuple:
+    """
+    Fetches an object from S3 and returns (content bytes, Content-Type) from a single GET, saving the HEAD request.
+    """
+    response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    return response['Body'].read(), response['ContentType']
+
 def get_s3_object_as_text(bucket_name: str, key: str) -> str:
     """
     Fetches an object from S3 and returns its content as a string.
     Handles potential UnicodeDecodeError by attempting to decode with 'utf-8' and 'latin-1'.
     """
-    body = get_s3_object(bucket_name, key)
+    return decode_text(get_s3_object(bucket_name, key))
+
+def decode_text(body: bytes) -> str:
     try:
         return body.decode('utf-8')
     except UnicodeDecodeError:
         return body.decode('latin-1')
 
-def put_s3_object(bucket_name: str, key: str, content: str) -> None:
+def get_cached_s3_object_as_text(bucket_name: str, key: str, etag: str = None) -> str:
+    """
+    Same as get_s3_object_as_text, but serves repeat reads of an unchanged object from the container-wide note
+    cache. Objects such as processed/{key} are rewritten when a note is re-uploaded, so a cached copy is only used
+    while its ETag still matches: etag, when the caller already has it from a HEAD, or else a conditional GET,
+    which S3 answers with a bodiless 304 while the object is unchanged.
+    """
+    cached = note_cache.get((bucket_name, key))
+    if cached is not None and etag is not None and cached[0] == etag:
+        return cached[1]
+    conditions = {'IfNoneMatch': cached[0]} if cached is not None and cached[0] else {}
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=key, **conditions)
+    except ClientError as e:
+        if conditions and is_not_modified_error(e):
+            return cached[1]
+        raise
+    content = decode_text(response['Body'].read())
+    note_cache.put((bucket_name, key), content, response.get('ETag'))
+    return content
+
+def get_s3_objects_as_text(bucket_name: str, keys: list, max_workers: int = MAX_PARALLEL_FETCHES,
+                           etags: list = None) -> list:
     """
-    Puts an object into S3.
+    Fetches many objects in parallel through the note cache, validating cached copies against etags if given.
+    Returns a list of (content, error) tuples in the same order as keys; error is None on success.
     """
-    s3_client.put_object(Bucket=bucket_name, Key=key, Body=content.encode('utf-8'), ContentType='application/json')
+    def fetch(item):
+        key, etag = item
+        with span('s3.get_cached_s3_object_as_text'):
+            return get_cached_s3_object_as_text(bucket_name, key, etag)
+    return map_concurrently(fetch, list(zip(keys, etags or [None] * len(keys))), max_workers)
+
+def copy_s3_object(source_bucket_name: str, source_key: str, bucket_name: str, key: str) -> None:
+    """
+    Copies an object, including its metadata, within S3 without downloading it.
+    """
+    s3_client.copy_object(
+        Bucket=bucket_name,
+        Key=key,
+        CopySource={'Bucket': source_bucket_name, 'Key': source_key},
+        MetadataDirective='COPY'
+    )
+
+def put_s3_object(bucket_name: str, key: str, content: str, metadata: dict = None) -> None:
+    """
+    Puts an object into S3, optionally with user metadata (string values only).
+    """
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=key,
+        Body=content.encode('utf-8'),
+        ContentType='application/json',
+        Metadata=metadata or {}
+    )
+
+def put_s3_object_if_absent(bucket_name: str, key: str, content: str) -> bool:
+    """
+    Puts an object into S3 only if the key does not exist yet (If-None-Match: *). Returns False, without writing,
+    when another writer got there first.
+    """
+    try:
+        s3_client.put_object(
+            Bucket=bucket_name,
+            Key=key,
+            Body=content.encode('utf-8'),
+            ContentType='application/json',
+            IfNoneMatch='*'
+        )
+        return True
+    except ClientError as e:
+        if is_precondition_failed_error(e):
+            return False
+        raise
 
 def head_s3_object(bucket_name: str, key: str) -> dict:
     """
     Retrieves metadata from an object in S3.
     """
     response = s3_client.head_object(Bucket=bucket_name, Key=key)
-    return response
\ No newline at end of file
+    return response
+
+def head_s3_object_if_exists(bucket_name: str, key: str):
+    """
+    Same as head_s3_object, but returns None for a missing key instead of raising, so a lookup that finds
+    nothing is not logged or traced as a failed request.
+    """
+    try:
+        return head_s3_object(bucket_name, key)
+    except ClientError as e:
+        if is_missing_key_error(e):
+            return None
+        raise
+
+def head_s3_objects(bucket_name: str, keys: list, max_workers: int = MAX_PARALLEL_FETCHES) -> list:
+    """
+    Retrieves metadata for many objects in parallel.
+    Returns a list of (response, error) tuples in the same order as keys; error is None on success.
+    """
+    def head(key):
+        with span('s3.head_s3_object'):
+            return head_s3_object(bucket_name, key)
+    return map_concurrently(head, keys, max_workers)
+
+def list_s3_keys(bucket_name: str, prefix: str) -> list:
+    """
+    Lists every key under a prefix, following continuation tokens past the 1000-key page size.
+    """
+    keys = []
+    kwargs = {'Bucket': bucket_name, 'Prefix': prefix}
+    while True:
+        response = s3_client.list_objects_v2(**kwargs)
+        keys.extend(item['Key'] for item in response.get('Contents', []))
+        if not response.get('IsTruncated'):
+            return keys
+        kwargs['ContinuationToken'] = response['NextContinuationToken']
@@ -0,0 +1,40 @@
+import json
+from .clients import get_boto3_client
+
+# SQS accepts at most 10 messages per SendMessageBatch request, and 256 KB per message and per batch.
+MAX_BATCH_SIZE = 10
+MAX_MESSAGE_BYTES = 256 * 1024
+
+def get_sqs_client():
+    # Built on first send, so functions that only import the batching helpers never create an SQS client.
+    return get_boto3_client('sqs')
+
+def send_message_batch(queue_url: str, bodies: list) -> None:
+    """
+    Sends up to MAX_BATCH_SIZE JSON messages in one request. Raises if SQS rejects any of them; retrying the whole
+    batch can deliver some messages twice, so consumers must be idempotent.
+    """
+    entries = [{'Id': str(index), 'MessageBody': json.dumps(body)} for index, body in enumerate(bodies)]
+    response = get_sqs_client().send_message_batch(QueueUrl=queue_url, Entries=entries)
+    failed = response.get('Failed', [])
+    if failed:
+        raise RuntimeError(f"SQS rejected {len(failed)} of {len(entries)} messages: {failed}")
+
+def split_batches(bodies: list) -> list:
+    """
+    Groups JSON messages into batches that respect both the message count and the 256 KB total payload limit of
+    SendMessageBatch. A single message over the limit still gets a batch of its own, for SQS to reject.
+    """
+    batches = []
+    current = []
+    current_bytes = 0
+    for body in bodies:
+        size = len(json.dumps(body).encode('utf-8'))
+        if current and (len(current) == MAX_BATCH_SIZE or current_bytes + size > MAX_MESSAGE_BYTES):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(body)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
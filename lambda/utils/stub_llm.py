@@ -0,0 +1,32 @@
+import re
+from collections import Counter
+from .llm_interface import LLMInterface
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r'[A-Za-z][A-Za-z-]{3,}')
+
+class StubLLM(LLMInterface):
+    """
+    Local provider that needs no network or API key: quiz questions are built from the notes' own sentences and
+    topics are their most frequent words. Meant for local runs and as a last-resort backend of the router.
+    """
+    PROVIDER = 'stub'
+    MODEL = 'stub'
+
+    def generate_quiz(self, notes: list, num_questions: int, topics: list, exclude: list = None) -> dict:
+        sentences = [s.strip() for note in notes for s in SENTENCE_BREAK.split(note) if s.strip()]
+        # A top-up continues with the sentences after those the excluded questions used.
+        offset = len(exclude or [])
+        questions = []
+        for i in range(offset, offset + num_questions):
+            sentence = sentences[i % len(sentences)] if sentences else 'No statement'
+            questions.append({
+                'question': f'Question {i + 1}: which of these statements is made in the material?',
+                'answers': [sentence, 'None of the above', 'All of the above', 'Not covered'],
+                'correctAnswerIndex': 0
+            })
+        return {'questions': questions}
+
+    def extract_topics(self, text: str) -> list:
+        counts = Counter(word.lower() for word in WORD.findall(text))
+        return [word for word, _ in counts.most_common(5)]
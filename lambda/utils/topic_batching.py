@@ -0,0 +1,80 @@
+import os
+from .concurrency import map_concurrently
+from .llm_interface import LLMInterface
+from .llm_parsing import clean_topics, load_json_object
+from .note_stats import estimate_tokens
+from .retry import retry_call
+
+# Input tokens per batched topic prompt; the reply adds roughly 30 tokens per document.
+TOPIC_BATCH_MAX_TOKENS = int(os.environ.get('TOPIC_BATCH_MAX_TOKENS', '3000'))
+TOPIC_BATCH_MAX_DOCUMENTS = int(os.environ.get('TOPIC_BATCH_MAX_DOCUMENTS', '10'))
+MAX_PARALLEL_TOPIC_BATCHES = int(os.environ.get('MAX_PARALLEL_TOPIC_BATCHES', '4'))
+
+def parse_topic_batch(content: str, count: int) -> list:
+    """
+    Returns the topics of each document in the batched response, aligned with the documents sent. Documents the
+    response leaves out or garbles are None, so the caller can ask for them one at a time.
+    """
+    results = [None] * count
+    documents = load_json_object(content).get('documents')
+    for entry in documents if isinstance(documents, list) else []:
+        if not isinstance(entry, dict) or not isinstance(entry.get('topics'), list):
+            continue
+        try:
+            index = int(entry.get('id')) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and results[index] is None:
+            results[index] = clean_topics(entry['topics'])
+    return results
+
+def pack_documents(texts: list, max_tokens: int = TOPIC_BATCH_MAX_TOKENS,
+                   max_documents: int = TOPIC_BATCH_MAX_DOCUMENTS) -> list:
+    """
+    Greedily groups consecutive documents into batches of at most max_tokens and max_documents.
+    Returns lists of indexes into texts; a document over the budget gets a batch of its own.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) == max_documents or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def extract_topics_batched(llm: LLMInterface, texts: list, max_workers: int = MAX_PARALLEL_TOPIC_BATCHES) -> list:
+    """
+    Extracts the topics of many documents with one request per batch, running the batches in parallel.
+    Documents a batched response leaves out are retried on their own.
+    Returns a list of (topics, error) tuples in the same order as texts.
+    """
+    def extract_batch(batch):
+        batch_texts = [texts[index] for index in batch]
+        if len(batch) == 1:
+            return [retry_call('llm', llm.extract_topics, batch_texts[0])]
+        try:
+            results = retry_call('llm', llm.extract_topics_batch, batch_texts)
+        except ValueError as e:
+            # An unparseable batched response is not worth repeating; ask for each document instead.
+            print(f"Batched topic response was invalid. Error: {str(e)}")
+            results = [None] * len(batch)
+        missing = [i for i, topics in enumerate(results) if topics is None]
+        if missing:
+            print(f"Batched topic response left out {len(missing)} of {len(batch)} documents; asking for them separately.")
+        for i in missing:
+            results[i] = retry_call('llm', llm.extract_topics, batch_texts[i])
+        return results
+
+    batches = pack_documents(texts)
+    print(f"Packed {len(texts)} documents into {len(batches)} topic requests.")
+    outcomes = [(None, None)] * len(texts)
+    for batch, (results, error) in zip(batches, map_concurrently(extract_batch, batches, max_workers)):
+        for position, index in enumerate(batch):
+            outcomes[index] = (results[position], None) if error is None else (None, error)
+    return outcomes
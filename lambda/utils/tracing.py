@@ -0,0 +1,286 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+# With tracing off, span() hands out a shared no-op and handlers skip the per-invocation bookkeeping entirely.
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'Spellbook')
+# Appends every finished trace, spans included, to this JSON Lines file; meant for local and benchmark runs.
+TRACE_EXPORT_FILE = os.environ.get('TRACE_EXPORT_FILE')
+
+_current_trace = contextvars.ContextVar('trace', default=None)
+_current_span = contextvars.ContextVar('span', default=None)
+_exporters = []
+
+class NullSpan:
+    """
+    Stands in for a span when tracing is off or no invocation is being traced.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def add(self, **counts) -> None:
+        pass
+
+NULL_SPAN = NullSpan()
+
+class Span:
+    """
+    Times one downstream call. Attributes set while it is open (retries, token counts) are kept with it.
+    """
+    __slots__ = ('trace', 'name', 'attributes', 'start', 'duration', 'error', '_token')
+
+    def __init__(self, trace, name: str, attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.start = None
+        self.duration = None
+        self.error = None
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        _current_span.reset(self._token)
+        self.trace.add(self)
+        return False
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, **counts) -> None:
+        for name, value in counts.items():
+            self.attributes[name] = self.attributes.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        entry = {'name': self.name, 'start': self.start - self.trace.start, 'durationMs': self.duration * 1000}
+        if self.error is not None:
+            entry['error'] = self.error
+        entry.update(self.attributes)
+        return entry
+
+class Trace:
+    """
+    Every span of one handler invocation, including those finished on worker threads.
+    """
+    def __init__(self, function_name: str):
+        self.function_name = function_name
+        self.start = time.perf_counter()
+        self.duration = None
+        self.failed = False
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self, failed: bool = False) -> None:
+        self.duration = time.perf_counter() - self.start
+        self.failed = failed
+
+    def metrics(self) -> dict:
+        """
+        Sums the spans by name: {name}.Calls, {name}.Time (ms), {name}.Errors and {name}.Retries, plus the
+        token counts recorded on LLM spans and the duration of the invocation.
+        """
+        values = {'InvocationTime': self.duration * 1000, 'InvocationErrors': int(self.failed)}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            for suffix, value in (('Calls', 1), ('Time', span.duration * 1000), ('Errors', int(span.error is not None)),
+                                  ('Retries', span.attributes.get('retries', 0))):
+                name = f'{span.name}.{suffix}'
+                values[name] = values.get(name, 0) + value
+            for attribute in ('promptTokens', 'completionTokens', 'cachedPromptTokens'):
+                if attribute in span.attributes:
+                    values[f'LLM.{attribute}'] = values.get(f'LLM.{attribute}', 0) + span.attributes[attribute]
+        return values
+
+    def to_emf(self) -> dict:
+        """
+        Formats the metrics as a CloudWatch Embedded Metric Format record, dimensioned by function name.
+        """
+        values = self.metrics()
+        units = [{'Name': name, 'Unit': 'Milliseconds' if name.endswith('Time') else 'Count'} for name in values]
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['FunctionName']],
+                    'Metrics': units
+                }]
+            },
+            'FunctionName': self.function_name
+        }
+        record.update(values)
+        return record
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {
+            'functionName': self.function_name,
+            'durationMs': self.duration * 1000,
+            'failed': self.failed,
+            'spans': sorted(spans, key=lambda span: span['start'])
+        }
+
+def span(name: str, **attributes):
+    """
+    Context manager timing a block as one span of the current invocation's trace:
+        with span('documentai.process_document') as current:
+            current.set(pages=3)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name, attributes)
+
+def current_span():
+    """
+    Returns the innermost open span of this thread's context, or a no-op when there is none.
+    """
+    return _current_span.get() or NULL_SPAN
+
+def get_usage(response):
+    """
+    Returns (prompt tokens, completion tokens, cached prompt tokens) from an OpenAI-style response or final stream
+    chunk, if it has them. Groq reports the usage of a stream on its last chunk under x_groq.
+    """
+    usage = getattr(response, 'usage', None) or getattr(getattr(response, 'x_groq', None), 'usage', None)
+    if usage is None:
+        return None
+    cached = getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', 0) or 0
+    return getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0, cached
+
+def record_llm_usage(response) -> None:
+    """
+    Adds the token counts of an LLM response to the open span, which retry_call opened around the request.
+    """
+    usage = get_usage(response)
+    if usage is not None:
+        current_span().add(promptTokens=usage[0], completionTokens=usage[1], cachedPromptTokens=usage[2])
+
+def add_exporter(exporter) -> None:
+    """
+    Registers a callable that receives every finished Trace, in addition to the EMF line printed to the logs.
+    """
+    _exporters.append(exporter)
+
+def remove_exporter(exporter) -> None:
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+
+class JsonLinesExporter:
+    """
+    Appends each trace, spans included, to a local JSON Lines file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_dict())
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+class InMemoryExporter:
+    """
+    Keeps finished traces in memory and summarizes their spans, for benchmarks.
+    """
+    def __init__(self):
+        self.traces = []
+        self._lock = threading.Lock()
+
+    def __call__(self, trace: Trace) -> None:
+        with self._lock:
+            self.traces.append(trace)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.traces = []
+
+    def summary(self) -> dict:
+        """
+        Returns {span name: {'calls', 'errors', 'retries', 'totalMs', 'p50Ms', 'p99Ms'}} over every collected trace.
+        """
+        durations = {}
+        summary = {}
+        with self._lock:
+            traces = list(self.traces)
+        for trace in traces:
+            with trace._lock:
+                spans = list(trace.spans)
+            for span in spans:
+                entry = summary.setdefault(span.name, {'calls': 0, 'errors': 0, 'retries': 0, 'totalMs': 0.0})
+                entry['calls'] += 1
+                entry['errors'] += int(span.error is not None)
+                entry['retries'] += span.attributes.get('retries', 0)
+                entry['totalMs'] += span.duration * 1000
+                durations.setdefault(span.name, []).append(span.duration * 1000)
+        for name, values in durations.items():
+            values.sort()
+            summary[name]['p50Ms'] = values[min(len(values) - 1, int(0.5 * len(values)))]
+            summary[name]['p99Ms'] = values[min(len(values) - 1, int(0.99 * len(values)))]
+        return summary
+
+if TRACE_EXPORT_FILE:
+    add_exporter(JsonLinesExporter(TRACE_EXPORT_FILE))
+
+def emit(trace: Trace) -> None:
+    # Lambda ships stdout to CloudWatch Logs, which turns an EMF line into metrics without any API call.
+    print(json.dumps(trace.to_emf()))
+    for exporter in list(_exporters):
+        try:
+            exporter(trace)
+        except Exception as e:
+            print(f"Error: trace exporter failed. Error: {str(e)}")
+
+def traced_handler(function_name: str):
+    """
+    Decorates a lambda_handler so each invocation collects its spans and emits one EMF metrics line at the end.
+    """
+    def decorator(handler):
+        if not TRACING_ENABLED:
+            return handler
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            trace = Trace(function_name)
+            token = _current_trace.set(trace)
+            failed = True
+            try:
+                result = handler(event, context)
+                failed = False
+                return result
+            finally:
+                _current_trace.reset(token)
+                trace.finish(failed)
+                emit(trace)
+        return wrapper
+    return decorator
+
+def submit_in_context(executor, func, *args):
+    """
+    Submits func to a thread pool with a copy of the caller's context, so its spans join the caller's trace.
+    """
+    return executor.submit(contextvars.copy_context().run, func, *args)